@@ -2,6 +2,8 @@
 Downloader module for extracting audio from YouTube videos.
 """
 
-from .downloader import download_audio
+from .downloader import download_audio, trim_audio, DownloadResult
+from .cache import DownloadCache
+from .batch import download_batch, BatchReport
 
-__all__ = ["download_audio"]
+__all__ = ["download_audio", "trim_audio", "DownloadResult", "DownloadCache", "download_batch", "BatchReport"]
@@ -0,0 +1,228 @@
+"""
+Batch downloader for lists of videos, playlists and channels.
+"""
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .downloader import download_audio
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class BatchItem:
+    """Class to represent the outcome of one episode in a batch download."""
+    def __init__(self, url, video_id=None, title=None, status="pending", path=None,
+                 size=0, seconds=0.0, error=None):
+        self.url = url
+        self.video_id = video_id
+        self.title = title
+        self.status = status
+        self.path = path
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def throughput(self):
+        """Download throughput in bytes per second."""
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        """Convert item to dictionary."""
+        return {
+            "url": self.url,
+            "video_id": self.video_id,
+            "title": self.title,
+            "status": self.status,
+            "path": self.path,
+            "bytes": self.size,
+            "seconds": self.seconds,
+            "throughput": self.throughput,
+            "error": self.error
+        }
+
+
+class BatchReport:
+    """Class to collect the outcome of a batch download."""
+    def __init__(self, items=None):
+        self.items = items or []
+
+    def _with_status(self, status):
+        return [item for item in self.items if item.status == status]
+
+    @property
+    def downloaded(self):
+        return self._with_status("downloaded")
+
+    @property
+    def skipped(self):
+        return self._with_status("skipped")
+
+    @property
+    def failed(self):
+        return self._with_status("failed")
+
+    def to_dict(self):
+        """Convert report to dictionary."""
+        return {
+            "downloaded": len(self.downloaded),
+            "skipped": len(self.skipped),
+            "failed": len(self.failed),
+            "items": [item.to_dict() for item in self.items]
+        }
+
+
+class DownloadArchive:
+    """
+    Append-only record of video IDs that were downloaded successfully.
+
+    The file holds one video ID per line, so re-running a batch over the same
+    playlist or channel only fetches episodes that are not listed yet.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._ids = {line.strip() for line in f if line.strip()}
+
+    def __contains__(self, video_id):
+        return video_id in self._ids
+
+    def add(self, video_id):
+        """Record a video ID, flushing it to disk immediately."""
+        with self._lock:
+            if video_id in self._ids:
+                return
+            self._ids.add(video_id)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(f"{video_id}\n")
+
+
+def expand_source(source):
+    """
+    Expand a video, playlist or channel URL into its individual videos.
+
+    Playlists are listed with ``--flat-playlist`` so no per-video pages are
+    resolved until the video is actually downloaded.
+
+    Args:
+        source (str): Video, playlist or channel URL
+
+    Returns:
+        list: (video_id, url) tuples in playlist order
+    """
+    list_cmd = [
+        "yt-dlp",
+        "--flat-playlist",
+        "--print", "%(id)s\t%(webpage_url,url)s",
+        source
+    ]
+    output = subprocess.run(list_cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+
+    entries = []
+    for line in output.splitlines():
+        video_id, _, url = line.strip().partition("\t")
+        if video_id and url and url != "NA":
+            entries.append((video_id, url))
+    return entries
+
+
+def _download_item(video_id, url, output_dir, archive, download_kwargs):
+    item = BatchItem(url, video_id=video_id)
+    started = time.perf_counter()
+    try:
+        result = download_audio(
+            url,
+            duration=None,
+            output_dir=os.path.join(output_dir, video_id),
+            **download_kwargs
+        )
+    except Exception as e:
+        item.status = "failed"
+        item.error = str(e)
+        item.seconds = time.perf_counter() - started
+        logger.error(f"Failed to download {url}: {e}")
+        return item
+
+    item.seconds = time.perf_counter() - started
+    item.status = "downloaded"
+    item.path = result.path
+    item.title = result.title
+    item.size = os.path.getsize(result.path) if os.path.exists(result.path) else 0
+    if archive is not None:
+        archive.add(video_id)
+    logger.info(
+        f"Downloaded {video_id} ({item.size / 1024 ** 2:.1f} MB in {item.seconds:.1f}s, "
+        f"{item.throughput / 1024 ** 2:.2f} MB/s)"
+    )
+    return item
+
+
+def download_batch(sources, output_dir="output/batch", max_workers=4, archive_path=None, **download_kwargs):
+    """
+    Download full episodes for a list of videos, playlists or channels.
+
+    Every source is expanded into individual videos, episodes already listed
+    in the archive are skipped, and the rest are downloaded through a bounded
+    pool of workers. A failed episode is recorded in the report and does not
+    stop the batch.
+
+    Args:
+        sources (list): Video, playlist or channel URLs
+        output_dir (str): Directory to save episodes in, one subdirectory per video
+        max_workers (int): Maximum number of concurrent downloads
+        archive_path (str): Optional archive file of already downloaded video IDs
+        **download_kwargs: Extra arguments passed to ``download_audio``
+
+    Returns:
+        BatchReport: Outcome of every episode in the batch
+    """
+    archive = DownloadArchive(archive_path) if archive_path else None
+    report = BatchReport()
+
+    pending = []
+    seen = set()
+    for source in sources:
+        try:
+            entries = expand_source(source)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to list videos for {source}: {e}")
+            report.items.append(BatchItem(source, status="failed", error=str(e)))
+            continue
+
+        for video_id, url in entries:
+            if video_id in seen:
+                continue
+            seen.add(video_id)
+            if archive is not None and video_id in archive:
+                report.items.append(BatchItem(url, video_id=video_id, status="skipped"))
+            else:
+                pending.append((video_id, url))
+
+    logger.info(f"Downloading {len(pending)} episodes ({len(report.skipped)} already archived)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_download_item, video_id, url, output_dir, archive, download_kwargs)
+            for video_id, url in pending
+        ]
+        for future in as_completed(futures):
+            report.items.append(future.result())
+
+    logger.info(
+        f"Batch finished: {len(report.downloaded)} downloaded, "
+        f"{len(report.skipped)} skipped, {len(report.failed)} failed"
+    )
+    return report
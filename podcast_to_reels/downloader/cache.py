@@ -0,0 +1,94 @@
+"""
+Persistent cache of downloaded source audio keyed by video ID and format.
+"""
+
+import os
+import json
+import logging
+
+from podcast_to_reels.utils.cache import FileCache, make_key, DEFAULT_MAX_BYTES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class DownloadCache:
+    """
+    Cache of full-length source audio shared across runs and workers.
+
+    Each source is stored once under a key derived from its video ID and audio
+    format, next to the yt-dlp metadata it was downloaded with. A small alias
+    record maps the requested URL to that key, so repeat requests are served
+    without contacting the source at all.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.files = FileCache(cache_dir, max_bytes=max_bytes)
+
+    @staticmethod
+    def source_key(video_id, audio_format):
+        return make_key("source", video_id, audio_format)
+
+    @staticmethod
+    def url_key(url, audio_format):
+        return make_key("url", url, audio_format)
+
+    def lookup(self, url, audio_format):
+        """
+        Find the cached source for a URL.
+
+        Args:
+            url (str): URL the audio was requested from
+            audio_format (str): Audio format of the cached source
+
+        Returns:
+            tuple or None: (path to the cached audio, metadata dict) on a hit
+        """
+        alias_path = self.files.path_for(self.url_key(url, audio_format), ".json")
+        try:
+            with open(alias_path) as f:
+                alias = json.load(f)
+            with open(self.files.path_for(alias["key"], ".json")) as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError, KeyError):
+            self.files.record_miss()
+            return None
+
+        path = self.files.get(alias["key"], alias["suffix"])
+        if path is None:
+            return None
+        logger.info(f"Download cache hit for {url}: {path}")
+        return path, metadata
+
+    def store(self, url, audio_format, source_path, metadata):
+        """
+        Move a freshly downloaded source into the cache.
+
+        Args:
+            url (str): URL the audio was requested from
+            audio_format (str): Audio format of the source
+            source_path (str): Downloaded file, moved into the cache
+            metadata (dict): yt-dlp info dict for the source
+
+        Returns:
+            str: Path to the cached audio
+        """
+        key = self.source_key(metadata.get("id") or url, audio_format)
+        suffix = os.path.splitext(source_path)[1]
+        path = self.files.put(key, source_path, suffix, move=True)
+        self.files.put_bytes(key, json.dumps(metadata).encode("utf-8"), ".json")
+        alias = {"key": key, "suffix": suffix}
+        self.files.put_bytes(self.url_key(url, audio_format), json.dumps(alias).encode("utf-8"), ".json")
+        return path
+
+    @property
+    def hits(self):
+        return self.files.hits
+
+    @property
+    def misses(self):
+        return self.files.misses
+
+    def stats(self):
+        """Return hit/miss counters and current size of the cache."""
+        return self.files.stats()
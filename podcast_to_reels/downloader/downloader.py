@@ -3,6 +3,8 @@ Downloader module for extracting audio from YouTube videos.
 """
 
 import os
+import json
+import shutil
 import subprocess
 import logging
 from pathlib import Path
@@ -12,90 +14,283 @@ import tempfile
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def download_audio(url, duration=60, start_time=0, output_dir="output", filename="audio.mp3"):
+# Seconds of extra audio fetched on each side of a section download so the
+# final ffmpeg trim has room to land on exact cut points
+SECTION_PAD = 2
+
+# Container used for stream-copied output of each native source codec. Raw
+# .opus files are remuxed into Ogg, which the transcription API accepts.
+NATIVE_CONTAINERS = {".opus": ".ogg", ".webm": ".ogg"}
+
+# Encoder settings for exact (re-encoded) cuts, keyed by output extension
+EXACT_CUT_CODECS = {
+    ".mp3": ["-c:a", "libmp3lame", "-q:a", "0"],
+    ".ogg": ["-c:a", "libopus", "-b:a", "128k"],
+    ".m4a": ["-c:a", "aac", "-b:a", "192k"],
+}
+
+
+class DownloadResult:
+    """Class to represent a downloaded audio file and the metadata of its source."""
+    def __init__(self, path, video_id=None, title=None, duration=None, formats=None, metadata=None):
+        self.path = path
+        self.video_id = video_id
+        self.title = title
+        self.duration = duration
+        self.formats = formats or []
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_metadata(cls, path, metadata):
+        """Build a result from the info dict printed by yt-dlp."""
+        return cls(
+            path=path,
+            video_id=metadata.get("id"),
+            title=metadata.get("title"),
+            duration=metadata.get("duration"),
+            formats=metadata.get("formats"),
+            metadata=metadata
+        )
+
+    def __fspath__(self):
+        return self.path
+
+    def to_dict(self):
+        """Convert result to dictionary."""
+        return {
+            "path": self.path,
+            "video_id": self.video_id,
+            "title": self.title,
+            "duration": self.duration,
+            "formats": self.formats
+        }
+
+
+def _run_yt_dlp(url, output_template, extra_args=(), audio_format="mp3"):
+    """
+    Download audio with yt-dlp and return the info dict of the downloaded file.
+
+    The info dict is printed as JSON once the file is in its final place, so
+    metadata and download come from the same extractor run.
+
+    Args:
+        url (str): YouTube URL to download from
+        output_template (str): yt-dlp output template
+        extra_args (tuple): Additional yt-dlp arguments
+        audio_format (str): "mp3" to transcode, or "native" to keep the source codec
+
+    Returns:
+        dict: yt-dlp info dict including the final ``filepath``
+    """
+    if audio_format == "native":
+        # Prefer opus/m4a streams and extract them without re-encoding
+        format_args = ["-f", "bestaudio[acodec=opus]/bestaudio[ext=m4a]/bestaudio", "--audio-format", "best"]
+    else:
+        format_args = ["--audio-format", "mp3", "--audio-quality", "0"]  # Best quality
+
+    download_cmd = [
+        "yt-dlp",
+        "-x",  # Extract audio
+        *format_args,
+        "--print", "after_move:%()j",  # Metadata as JSON after the download
+        "-o", output_template,
+        *extra_args,
+        url
+    ]
+    result = subprocess.run(download_cmd, check=True, stdout=subprocess.PIPE, text=True)
+
+    # The info dict is the last JSON line on stdout
+    for line in reversed(result.stdout.splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"yt-dlp returned no metadata for {url}")
+
+
+def _source_path(metadata, output_template):
+    """Return the path yt-dlp wrote the audio to."""
+    return metadata.get("filepath") or output_template.replace("%(ext)s", "mp3")
+
+
+def trim_audio(source_path, output_path, offset=0, duration=None, exact=False):
+    """
+    Cut a window out of an audio file with ffmpeg.
+
+    Seeking happens on the input side (``-ss`` before ``-i``) so ffmpeg skips
+    straight to the window instead of decoding everything before it. By default
+    the audio stream is copied, which cuts on packet boundaries (a few tens of
+    milliseconds for mp3, opus and aac) without a second lossy encode.
+
+    Args:
+        source_path (str): File to cut from
+        output_path (str): File to write
+        offset (float): Start of the window in seconds
+        duration (float): Length of the window in seconds, or None for the rest
+        exact (bool): Re-encode to land on exact cut points
+    """
+    trim_cmd = ["ffmpeg", "-ss", str(offset), "-i", source_path]
+    if duration is not None:
+        trim_cmd += ["-t", str(duration)]
+    trim_cmd += ["-vn"]
+    if exact:
+        ext = os.path.splitext(output_path)[1].lower()
+        trim_cmd += EXACT_CUT_CODECS.get(ext, EXACT_CUT_CODECS[".mp3"])
+    else:
+        trim_cmd += ["-c:a", "copy"]
+    trim_cmd += ["-y", output_path]  # Overwrite output file
+    subprocess.run(trim_cmd, check=True)
+
+
+def _download_section(url, output_template, start_time, duration, pad=SECTION_PAD, audio_format="mp3"):
+    """
+    Download only a time window of the audio using yt-dlp's section support.
+
+    Args:
+        url (str): YouTube URL to download from
+        output_template (str): yt-dlp output template
+        start_time (int): Starting point of the window in seconds
+        duration (int): Length of the window in seconds
+        pad (int): Extra seconds to fetch before and after the window
+        audio_format (str): "mp3" or "native"
+
+    Returns:
+        tuple or None: (info dict, start of the downloaded section in the source
+        timeline), or None if the source does not support section downloads
+    """
+    section_start = max(0, start_time - pad)
+    section_end = start_time + duration + pad
+    try:
+        metadata = _run_yt_dlp(
+            url,
+            output_template,
+            ("--download-sections", f"*{section_start}-{section_end}"),
+            audio_format=audio_format
+        )
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"Section download not supported for {url}, falling back to full download: {e}")
+        return None
+    return metadata, section_start
+
+
+def _cached_download(url, cache, temp_dir, audio_format="mp3"):
+    """
+    Fetch the full source audio through the download cache.
+
+    Args:
+        url (str): YouTube URL to download from
+        cache (DownloadCache): Cache to read from and populate
+        temp_dir (str): Scratch directory for a fresh download
+        audio_format (str): "mp3" or "native"
+
+    Returns:
+        tuple: (info dict, path to the cached source audio)
+    """
+    cached = cache.lookup(url, audio_format)
+    if cached is not None:
+        path, metadata = cached
+        return metadata, path
+
+    output_template = os.path.join(temp_dir, "source.%(ext)s")
+    metadata = _run_yt_dlp(url, output_template, audio_format=audio_format)
+    path = cache.store(url, audio_format, _source_path(metadata, output_template), metadata)
+    return metadata, path
+
+
+def download_audio(url, duration=60, start_time=0, output_dir="output", filename="audio.mp3",
+                   section_download=True, section_pad=SECTION_PAD, cache=None,
+                   audio_format="mp3", exact_cuts=False):
     """
     Download audio from a YouTube URL and optionally trim it to a specified duration.
-    
+
+    yt-dlp is invoked once and prints the source metadata alongside the
+    download; the trim decision is made from that metadata. When
+    ``section_download`` is enabled only the requested window (plus
+    ``section_pad`` seconds on each side) is fetched. Sources that cannot
+    serve sections fall back to a full download.
+
+    With a ``cache`` the full source is downloaded once per video and format,
+    and every cut window is taken from the cached copy.
+
+    Trimming seeks on the input side and stream-copies the audio. With
+    ``audio_format="native"`` the source codec (opus or aac) is kept end to
+    end, and the output extension follows the source container. Pass
+    ``exact_cuts=True`` to re-encode the window for sample-accurate cut points.
+
     Args:
         url (str): YouTube URL to download from
-        duration (int): Maximum duration in seconds (default: 60)
+        duration (int): Maximum duration in seconds (default: 60), or None for the whole episode
         start_time (int): Starting point in seconds (default: 0)
         output_dir (str): Directory to save the audio file
         filename (str): Name of the output audio file
-        
+        section_download (bool): Fetch only the requested window
+        section_pad (int): Extra seconds fetched around the window
+        cache (DownloadCache): Optional persistent cache of source audio
+        audio_format (str): "mp3" (default) or "native" to keep the source codec
+        exact_cuts (bool): Re-encode the trimmed window for exact cut points
+
     Returns:
-        str: Path to the downloaded audio file
+        DownloadResult: Path to the downloaded audio file and source metadata
     """
+    if audio_format not in ("mp3", "native"):
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, filename)
-    
+
     logger.info(f"Downloading audio from {url}")
-    
+
     try:
-        # First, get video duration using yt-dlp
-        duration_cmd = [
-            "yt-dlp", 
-            "--skip-download", 
-            "--print", "duration", 
-            url
-        ]
-        video_duration = int(subprocess.check_output(duration_cmd, text=True).strip())
-        logger.info(f"Video duration: {video_duration} seconds")
-        
-        # Determine if we need to trim based on duration or start time
-        needs_trimming = video_duration > duration or start_time > 0
-        
-        if needs_trimming:
-            # Download to a temporary file first
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            temp_file.close()
-            temp_path = temp_file.name
-            
-            # Download audio using yt-dlp
-            download_cmd = [
-                "yt-dlp",
-                "-x",  # Extract audio
-                "--audio-format", "mp3",
-                "--audio-quality", "0",  # Best quality
-                "-o", temp_path,
-                url
-            ]
-            subprocess.run(download_cmd, check=True)
-            
-            # Trim the audio using ffmpeg
-            logger.info(f"Trimming audio: start at {start_time}s for {duration} seconds")
-            trim_cmd = [
-                "ffmpeg",
-                "-i", temp_path,
-                "-ss", str(start_time),
-                "-t", str(duration),
-                "-c:a", "libmp3lame",
-                "-q:a", "0",  # Best quality
-                "-y",  # Overwrite output file
-                output_path
-            ]
-            subprocess.run(trim_cmd, check=True)
-
-            # Clean up temporary file if it still exists
-
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-        else:
-            # Download directly to output path
-            download_cmd = [
-                "yt-dlp",
-                "-x",  # Extract audio
-                "--audio-format", "mp3",
-                "--audio-quality", "0",  # Best quality
-                "-o", output_path,
-                url
-            ]
-            subprocess.run(download_cmd, check=True)
-        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_template = os.path.join(temp_dir, "source.%(ext)s")
+
+            if cache is not None:
+                metadata, source_path = _cached_download(url, cache, temp_dir, audio_format)
+                section_start = 0
+            else:
+                downloaded = None
+                if section_download and duration is not None:
+                    downloaded = _download_section(
+                        url, output_template, start_time, duration, section_pad, audio_format
+                    )
+
+                if downloaded is None:
+                    # Download the full audio
+                    downloaded = (_run_yt_dlp(url, output_template, audio_format=audio_format), 0)
+                metadata, section_start = downloaded
+                source_path = _source_path(metadata, output_template)
+
+            if audio_format == "native":
+                # Name the output after the container the source codec is kept in
+                source_ext = os.path.splitext(source_path)[1].lower()
+                output_ext = NATIVE_CONTAINERS.get(source_ext, source_ext)
+                output_path = os.path.splitext(output_path)[0] + output_ext
+            remux = os.path.splitext(source_path)[1].lower() != os.path.splitext(output_path)[1].lower()
+
+            # Direct media links often have no known duration
+            video_duration = metadata.get("duration")
+            logger.info(f"Video duration: {video_duration} seconds")
+
+            # Determine if we need to trim based on duration or start time
+            needs_trimming = start_time > 0 or (
+                duration is not None and (video_duration is None or video_duration > duration)
+            )
+
+            if needs_trimming:
+                # Trim the audio using ffmpeg, relative to the start of what was downloaded
+                logger.info(f"Trimming audio: start at {start_time}s for {duration or 'remaining'} seconds")
+                trim_audio(source_path, output_path, start_time - section_start, duration, exact_cuts)
+            elif remux:
+                trim_audio(source_path, output_path)
+            elif cache is not None:
+                # Keep the cached source intact
+                shutil.copyfile(source_path, output_path)
+            else:
+                shutil.move(source_path, output_path)
+
         logger.info(f"Audio downloaded and saved to {output_path}")
-        return output_path
-        
+        return DownloadResult.from_metadata(output_path, metadata)
+
     except subprocess.CalledProcessError as e:
         logger.error(f"Error downloading audio: {e}")
         raise RuntimeError(f"Failed to download audio from {url}: {e}")
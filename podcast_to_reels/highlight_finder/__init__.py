@@ -0,0 +1,7 @@
+"""
+Highlight finder module for picking the most engaging windows of an episode.
+"""
+
+from .highlight_finder import find_highlights, window_features, slice_transcript, extract_highlight, Highlight
+
+__all__ = ["find_highlights", "window_features", "slice_transcript", "extract_highlight", "Highlight"]
@@ -0,0 +1,304 @@
+"""
+Highlight finder module for scoring transcript windows and picking the best ones.
+"""
+
+import os
+import math
+import logging
+from collections import Counter
+import numpy as np
+
+from podcast_to_reels.utils.audio import decode_pcm, frame_energy
+from podcast_to_reels.downloader import trim_audio
+from podcast_to_reels.scene_splitter.scene_splitter import iter_timed_words, load_segments
+from podcast_to_reels.scene_splitter.semantic import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Weight of each standardised feature in the window score
+DEFAULT_WEIGHTS = {"keywords": 1.0, "speech_rate": 1.0, "turns": 0.5, "energy": 0.5}
+
+# Number of the episode's most frequent terms used as keywords when none are given
+KEYWORD_COUNT = 25
+
+# Pause between segments counted as a change of speaker when segments carry no speaker labels
+TURN_PAUSE_SECONDS = 1.0
+
+# The energy envelope only needs a coarse signal, so decode at a low rate
+ENERGY_SAMPLE_RATE = 2000
+
+
+class Highlight:
+    """Class to represent a scored window of an episode."""
+    def __init__(self, start_time, end_time, score, features=None):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.score = score
+        self.features = features or {}
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    def to_dict(self):
+        """Convert highlight to dictionary."""
+        return {
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "score": self.score,
+            "features": self.features
+        }
+
+
+def _window_sums(values, window):
+    """Sum of every run of ``window`` consecutive values, from one cumulative sum."""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return cumulative[window:] - cumulative[:-window]
+
+
+def _standardize(values):
+    """Scale values to zero mean and unit variance; constant values become zeros."""
+    std = values.std()
+    if std == 0:
+        return np.zeros_like(values)
+    return (values - values.mean()) / std
+
+
+def _pick_keywords(words, count=KEYWORD_COUNT):
+    """The most frequent content words of the episode."""
+    counts = Counter(token for word in words for token in tokenize(word) if len(token) > 3)
+    return {token for token, _ in counts.most_common(count)}
+
+
+def _speaker_turns(segments):
+    """
+    Start times of segments that begin a new speaker turn.
+    
+    Uses the ``speaker`` labels of diarised transcripts. Without labels, a
+    pause of ``TURN_PAUSE_SECONDS`` between segments stands in for a turn.
+    """
+    turns = []
+    previous = None
+    for segment in segments:
+        if previous is not None:
+            if "speaker" in segment or "speaker" in previous:
+                changed = segment.get("speaker") != previous.get("speaker")
+            else:
+                changed = segment.get("start", 0) - previous.get("end", 0) >= TURN_PAUSE_SECONDS
+            if changed:
+                turns.append(segment.get("start", 0))
+        previous = segment
+    return turns
+
+
+def audio_energy(audio_path, resolution=1.0, sample_rate=ENERGY_SAMPLE_RATE):
+    """
+    Loudness of an audio file in dB for each ``resolution``-second bin.
+    
+    Args:
+        audio_path (str): Path to the audio file
+        resolution (float): Bin length in seconds
+        sample_rate (int): Rate the audio is decoded at
+        
+    Returns:
+        numpy.ndarray: One RMS level in dB per bin
+    """
+    energy = frame_energy(decode_pcm(audio_path, sample_rate), sample_rate, frame_seconds=resolution)
+    return 20 * np.log10(np.maximum(energy, 1e-5))
+
+
+def window_features(transcript, window_seconds=60.0, resolution=1.0, keywords=None, energy=None):
+    """
+    Compute the features of every window of an episode.
+    
+    The timeline is cut into ``resolution``-second bins holding word,
+    keyword and speaker turn counts. A window starts at every bin, and its
+    sums come from one cumulative sum per feature, so the whole pass is
+    linear in the episode length.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        window_seconds (float): Length of each window
+        resolution (float): Step between window starts in seconds
+        keywords (iterable): Words that mark interesting content
+            (default: the episode's most frequent terms)
+        energy (numpy.ndarray): Optional loudness in dB per bin, see ``audio_energy``
+        
+    Returns:
+        tuple: (window start times, window end times, dict of feature name to one value per window)
+    """
+    words = list(iter_timed_words(transcript))
+    segments = list(load_segments(transcript))
+    end = max([word_end for _, _, word_end in words] + [segment.get("end", 0) for segment in segments] + [0])
+    bin_count = max(1, math.ceil(end / resolution))
+    window = min(max(1, int(round(window_seconds / resolution))), bin_count)
+    
+    if keywords is None:
+        keywords = _pick_keywords(word for word, _, _ in words)
+    keywords = {keyword.lower() for keyword in keywords}
+    
+    def counts(times, weights=None):
+        bins = np.minimum((np.asarray(times, dtype=np.float64) / resolution).astype(np.intp), bin_count - 1)
+        return np.bincount(bins, weights=weights, minlength=bin_count)
+    
+    word_times = [start for _, start, _ in words]
+    keyword_hits = [sum(token in keywords for token in tokenize(word)) for word, _, _ in words]
+    word_counts = _window_sums(counts(word_times), window)
+    keyword_counts = _window_sums(counts(word_times, keyword_hits), window)
+    
+    features = {
+        "keywords": keyword_counts / np.maximum(word_counts, 1),
+        "speech_rate": word_counts / (window * resolution),
+        "turns": _window_sums(counts(_speaker_turns(segments)), window)
+    }
+    if energy is not None:
+        # Bins past the end of the decoded audio count as the quietest level
+        energy = np.asarray(energy, dtype=np.float64)[:bin_count]
+        levels = np.full(bin_count, energy.min() if len(energy) else 0.0)
+        levels[:len(energy)] = energy
+        features["energy"] = _window_sums(levels, window) / window
+    
+    starts = np.arange(len(word_counts)) * resolution
+    return starts, starts + window * resolution, features
+
+
+def _top_windows(scores, window, k):
+    """
+    Pick the ``k`` non-overlapping windows with the highest total score.
+    
+    Dynamic programming over window starts: row ``j`` holds the best total of
+    ``j`` windows that end before each start. Every row is a running maximum
+    over the previous one, so the cost is O(k * n) without a Python loop over n.
+    
+    Returns:
+        list: Start indices of the chosen windows
+    """
+    count = len(scores)
+    positions = np.arange(count)
+    best = np.zeros(count)
+    choices = []
+    for row in range(k):
+        if row == 0:
+            candidates = scores.astype(np.float64)
+        else:
+            # Best total of the previous windows that end before each start
+            previous = np.full(count, -np.inf)
+            previous[window:] = best[:count - window]
+            candidates = scores + previous
+        best = np.maximum.accumulate(candidates)
+        if not np.isfinite(best[-1]):
+            break
+        # Index where each running maximum was reached
+        choices.append(np.maximum.accumulate(np.where(candidates >= best, positions, 0)))
+    
+    picked = []
+    position = count - 1
+    for choice in reversed(choices):
+        start = int(choice[position])
+        picked.append(start)
+        position = start - window
+    return sorted(picked)
+
+
+def find_highlights(transcript, k=1, window_seconds=60.0, resolution=1.0, keywords=None, audio_path=None,
+                    weights=None):
+    """
+    Find the ``k`` best non-overlapping windows of an episode.
+    
+    Each feature is standardised across all windows and combined with
+    ``weights``; the set of ``k`` windows with the highest total score is then
+    chosen in one pass over the window scores.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        k (int): Number of highlights
+        window_seconds (float): Length of each highlight
+        resolution (float): Step between candidate start times in seconds
+        keywords (iterable): Words that mark interesting content (default: the episode's most frequent terms)
+        audio_path (str): Optional audio of the episode whose loudness is scored too
+        weights (dict): Weight per feature (default: ``DEFAULT_WEIGHTS``)
+        
+    Returns:
+        list: Highlight objects, best first
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    energy = audio_energy(audio_path, resolution) if audio_path else None
+    
+    starts, ends, features = window_features(transcript, window_seconds, resolution, keywords, energy)
+    scores = sum(weights.get(name, 0.0) * _standardize(values) for name, values in features.items())
+    window = int(round((ends[0] - starts[0]) / resolution))
+    
+    highlights = []
+    for index in _top_windows(scores, window, k):
+        highlights.append(Highlight(
+            start_time=float(starts[index]),
+            end_time=float(ends[index]),
+            score=float(scores[index]),
+            features={name: float(values[index]) for name, values in features.items()}
+        ))
+    highlights.sort(key=lambda highlight: highlight.score, reverse=True)
+    
+    logger.info(f"Found {len(highlights)} highlights among {len(starts)} candidate windows")
+    return highlights
+
+
+def slice_transcript(transcript_data, start_time, end_time):
+    """
+    Cut the part of a transcript between two times, shifted to start at zero.
+    
+    Segments and words that overlap the window are kept and clipped to it.
+    
+    Args:
+        transcript_data (dict): Parsed transcript JSON
+        start_time (float): Start of the window in seconds
+        end_time (float): End of the window in seconds
+        
+    Returns:
+        dict: Transcript of the window
+    """
+    def clip(items):
+        clipped = []
+        for item in items:
+            if item.get("end", 0) <= start_time or item.get("start", 0) >= end_time:
+                continue
+            item = dict(item)
+            item["start"] = max(item.get("start", 0), start_time) - start_time
+            item["end"] = min(item.get("end", 0), end_time) - start_time
+            clipped.append(item)
+        return clipped
+    
+    segments = clip(transcript_data.get("segments", []))
+    for segment_id, segment in enumerate(segments):
+        segment["id"] = segment_id
+    sliced = dict(transcript_data)
+    sliced.update(
+        text=" ".join(segment.get("text", "").strip() for segment in segments),
+        segments=segments,
+        duration=end_time - start_time
+    )
+    if "words" in transcript_data:
+        sliced["words"] = clip(transcript_data["words"])
+    return sliced
+
+
+def extract_highlight(audio_path, highlight, output_dir, exact=True):
+    """
+    Cut the audio of a highlight out of an episode.
+    
+    Args:
+        audio_path (str): Audio of the full episode
+        highlight (Highlight): Window to cut
+        output_dir (str): Directory for the clip
+        exact (bool): Re-encode to land on exact cut points
+        
+    Returns:
+        str: Path to the clip, in the container of the source
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, "audio" + os.path.splitext(audio_path)[1])
+    trim_audio(audio_path, output_path, highlight.start_time, highlight.duration, exact)
+    return output_path
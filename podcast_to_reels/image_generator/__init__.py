@@ -2,6 +2,17 @@
 Image Generator module for creating images from text prompts.
 """
 
-from .image_generator import generate_images
+from .image_generator import generate_images, generate_images_stream
+from .postprocess import prefit_images, fit_image
+from .backends import ImageBackend, StabilityBackend, ProceduralBackend, get_backend
 
-__all__ = ["generate_images"]
+__all__ = [
+    "generate_images",
+    "generate_images_stream",
+    "prefit_images",
+    "fit_image",
+    "ImageBackend",
+    "StabilityBackend",
+    "ProceduralBackend",
+    "get_backend"
+]
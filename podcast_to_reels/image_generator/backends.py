@@ -0,0 +1,456 @@
+"""
+Image backends that all render a prompt to a PNG file.
+"""
+
+import os
+import time
+import uuid
+import random
+import base64
+import hashlib
+import logging
+import textwrap
+import threading
+import email.utils
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageDraw, ImageFont
+
+from podcast_to_reels.utils.cache import make_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Requests in flight at once
+DEFAULT_MAX_WORKERS = 4
+
+# Retries after the first attempt of an image
+MAX_RETRIES = 2
+
+# Rate-limited (429) attempts of an image before it is given up
+MAX_RATE_LIMIT_RETRIES = 8
+
+# Status codes worth retrying besides server errors
+RETRYABLE_STATUS = (408, 429)
+
+# Bytes written to disk at a time when streaming a binary image response
+STREAM_CHUNK = 64 * 1024
+
+# "draft" renders at a fraction of the output size with fewer steps and is upscaled locally
+QUALITIES = ("full", "draft")
+DRAFT_SCALE = 0.5
+DRAFT_STEPS = 12
+
+
+def image_cache_key(api_endpoint, payload, quality="full"):
+    """
+    Build the cache key of a generated image.
+
+    The key covers the endpoint and the whole request payload: prompt,
+    style, model, size, steps, guidance and the seed when one is set.
+    Upscaled drafts get keys of their own, so they never stand in for a
+    full-quality image of the same size.
+    """
+    if quality == "full":
+        return make_key("image", api_endpoint, payload)
+    return make_key("image", api_endpoint, payload, quality)
+
+
+def temp_path(directory):
+    """Return an unused temporary file path in ``directory``."""
+    return os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+
+
+def _stream_to_file(response, path):
+    """Stream a response body to ``path``, holding only one chunk in memory at a time."""
+    with open(path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK):
+            f.write(chunk)
+
+
+def make_session(max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Build a session whose keep-alive pool holds one connection per worker.
+
+    Args:
+        max_workers (int): Number of threads sharing the session
+
+    Returns:
+        requests.Session: Session with a sized connection pool
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _retry_after(response):
+    """Seconds requested by a ``Retry-After`` header, or None if it is missing or invalid."""
+    value = response.headers.get("Retry-After")
+    if not isinstance(value, str):
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Throttle:
+    """
+    Cooldown shared by the workers of one run.
+
+    A rate-limited response pauses every worker, not only the one that got
+    it, for the ``Retry-After`` time or, without one, for a delay that
+    doubles with each consecutive 429 and resets after a success.
+    """
+    def __init__(self, backoff_base=1.0, backoff_max=30.0):
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.strikes = 0
+
+    def wait(self):
+        """Block until the cooldown is over."""
+        while True:
+            with self.lock:
+                delay = self.resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def rate_limited(self, retry_after=None):
+        """Start or extend the cooldown after a 429."""
+        with self.lock:
+            if retry_after is None:
+                retry_after = min(self.backoff_max, self.backoff_base * 2 ** self.strikes)
+            self.strikes += 1
+            self.resume_at = max(self.resume_at, time.monotonic() + min(self.backoff_max, retry_after))
+
+    def succeeded(self):
+        with self.lock:
+            self.strikes = 0
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry ``attempt + 1`` (0 for the first), with jitter."""
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class ImageBackend:
+    """
+    Base class for image engines.
+
+    Subclasses implement ``generate``, which renders one prompt to a PNG
+    file of ``render_size``. It is called from several worker threads at
+    once, so per-image state must stay local to the call. At ``draft``
+    quality ``render_size`` is smaller than the ``width`` x ``height``
+    output, and the image is upscaled locally afterwards.
+    """
+    name = "base"
+    width = 1080
+    height = 1920
+    quality = "full"
+
+    @property
+    def render_size(self):
+        """(width, height) of the images the backend itself produces."""
+        if self.quality == "draft":
+            return max(1, round(self.width * DRAFT_SCALE)), max(1, round(self.height * DRAFT_SCALE))
+        return self.width, self.height
+
+    def generate(self, prompt, output_path, seed=None, label=""):
+        """
+        Render one prompt.
+
+        Args:
+            prompt (str): Full prompt, style included
+            output_path (str): File to write the PNG to
+            seed (int): Optional generation seed
+            label (str): Short description of the image for log messages
+
+        Returns:
+            bool: True if the image was written
+        """
+        raise NotImplementedError
+
+    def prepare(self):
+        """Check configuration before the first image is generated."""
+
+    def close(self):
+        """Release connections and other resources."""
+
+    def cache_identity(self):
+        """Return everything about this backend that changes its output."""
+        return {"backend": self.name, "quality": self.quality}
+
+    def cache_key(self, prompt, seed=None):
+        """Build the cache key of the image of ``prompt``."""
+        return make_key("image", self.cache_identity(), prompt, seed)
+
+
+class StabilityBackend(ImageBackend):
+    """
+    Text-to-image through the Stability AI v2beta API.
+
+    Worker threads share one keep-alive session. Server errors are retried
+    with exponential backoff, and a ``429`` pauses all workers for its
+    ``Retry-After`` time. With ``binary`` the raw image bytes are requested
+    (``Accept: image/*``) and streamed to disk in chunks instead of arriving
+    base64-encoded in a JSON body. At ``draft`` quality images are requested
+    at half size with ``DRAFT_STEPS`` steps.
+    """
+    name = "stability"
+
+    def __init__(self, api_key=None, api_host=None, model="sd3.5-medium", width=1080, height=1920, steps=30,
+                 cfg_scale=7.0, binary=False, max_workers=DEFAULT_MAX_WORKERS, session=None, backoff_base=1.0,
+                 backoff_max=30.0, max_retries=MAX_RETRIES, quality="full"):
+        if quality not in QUALITIES:
+            raise ValueError(f"Unknown image quality: {quality}")
+        self.api_key = api_key
+        api_host = api_host or os.getenv("STABILITY_API_HOST", "https://api.stability.ai")
+        self.api_endpoint = f"{api_host}/v2beta/stable-diffusion/text-to-image"
+        self.model = model
+        self.width = width
+        self.height = height
+        self.steps = steps
+        self.cfg_scale = cfg_scale
+        self.binary = binary
+        self.quality = quality
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.throttle = _Throttle(backoff_base, backoff_max)
+        self._session = session
+        self._owns_session = session is None
+        self._headers = None
+        self._lock = threading.Lock()
+
+    @property
+    def headers(self):
+        """Request headers, built on first use so cache hits need no API key."""
+        with self._lock:
+            if self._headers is None:
+                api_key = self.api_key or os.getenv("STABILITY_API_KEY")
+                if not api_key:
+                    logger.error("STABILITY_API_KEY environment variable not set")
+                    raise ValueError("STABILITY_API_KEY environment variable not set")
+                self._headers = {
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "Accept": "image/*" if self.binary else "application/json"
+                }
+            return self._headers
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = make_session(self.max_workers)
+            return self._session
+
+    def prepare(self):
+        self.headers
+
+    def close(self):
+        with self._lock:
+            if self._owns_session and self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def payload(self, prompt, seed=None):
+        """Build the request body for ``prompt``."""
+        width, height = self.render_size
+        payload = {
+            "model_id": self.model,
+            "width": width,
+            "height": height,
+            "samples": 1,
+            "steps": min(self.steps, DRAFT_STEPS) if self.quality == "draft" else self.steps,
+            "prompt": prompt,
+            "cfg_scale": self.cfg_scale
+        }
+        if seed is not None:
+            payload["seed"] = seed
+        return payload
+
+    def cache_key(self, prompt, seed=None):
+        return image_cache_key(self.api_endpoint, self.payload(prompt, seed), self.quality)
+
+    def generate(self, prompt, output_path, seed=None, label=""):
+        headers = self.headers
+        payload = self.payload(prompt, seed)
+        retry_count = 0
+        rate_limited = 0
+
+        while retry_count <= self.max_retries:
+            self.throttle.wait()
+            try:
+                logger.info(f"Generating image {label}: {prompt[:50]}...")
+
+                # Make API request
+                if self.binary:
+                    response = self.session.post(self.api_endpoint, headers=headers, json=payload,
+                                                 stream=True)
+                else:
+                    response = self.session.post(self.api_endpoint, headers=headers, json=payload)
+
+                if response.status_code >= 400:
+                    # Release the connection of a streamed error response
+                    response.close()
+
+                if response.status_code == 429 and rate_limited < MAX_RATE_LIMIT_RETRIES:
+                    rate_limited += 1
+                    retry_after = _retry_after(response)
+                    logger.warning(f"Rate limited on image {label}, backing off"
+                                   + (f" {retry_after:.1f}s" if retry_after is not None else ""))
+                    self.throttle.rate_limited(retry_after)
+                    continue
+
+                # Check for errors
+                if response.status_code >= 500 or response.status_code in RETRYABLE_STATUS:
+                    logger.warning(f"Server error: {response.status_code}. Retrying...")
+                    retry_count += 1
+                    self._pause_before_retry(retry_count)
+                    continue
+
+                # Other client errors will not succeed on a retry
+                response.raise_for_status()
+
+                if self.binary:
+                    finish_reason = response.headers.get("finish-reason", "SUCCESS")
+                    content_type = response.headers.get("content-type", "image/png")
+                    if finish_reason == "SUCCESS" and content_type.startswith("image/"):
+                        _stream_to_file(response, output_path)
+                        self.throttle.succeeded()
+                        return True
+                    response.close()
+                    logger.error(f"Failed to generate image: finish reason {finish_reason}, "
+                                 f"content type {content_type}")
+                    retry_count += 1
+                    continue
+
+                # Parse response
+                data = response.json()
+
+                # Save image
+                for artifact in data.get("artifacts", []):
+                    if artifact["finishReason"] == "SUCCESS":
+                        # Decode base64 image
+                        with open(output_path, "wb") as f:
+                            f.write(base64.b64decode(artifact["base64"]))
+                        self.throttle.succeeded()
+                        return True
+
+                logger.error(f"Failed to generate image: {data.get('message', 'Unknown error')}")
+                retry_count += 1
+
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"Request rejected: {e}")
+                return False
+
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Request error: {e}")
+                retry_count += 1
+                self._pause_before_retry(retry_count)
+
+            except Exception as e:
+                logger.error(f"Error generating image: {e}")
+                retry_count += 1
+                self._pause_before_retry(retry_count)
+
+        return False
+
+    def _pause_before_retry(self, retry_count):
+        """Back off before retry number ``retry_count``; no wait once the retries are used up."""
+        if retry_count <= self.max_retries:
+            time.sleep(self.throttle.backoff(retry_count - 1))
+
+
+class ProceduralBackend(ImageBackend):
+    """
+    Deterministic offline backend for tests, benchmarks and draft renders.
+
+    Draws a two-colour gradient card with the prompt written on it. Colours
+    and gradient angle come from a hash of the prompt and seed, so the same
+    request always yields the same image. ``latency`` simulates a network
+    round trip per image.
+    """
+    name = "procedural"
+
+    def __init__(self, width=1080, height=1920, latency=0.0, text=True, quality="full"):
+        if quality not in QUALITIES:
+            raise ValueError(f"Unknown image quality: {quality}")
+        self.width = width
+        self.height = height
+        self.latency = latency
+        self.text = text
+        self.quality = quality
+
+    def render(self, prompt, seed=None):
+        """Render the card of ``prompt`` as a PIL image."""
+        width, height = self.render_size
+        digest = hashlib.sha256(f"{prompt}\0{seed}".encode("utf-8")).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+        start, end = rng.integers(0, 256, size=(2, 3)).astype(np.float32)
+        angle = rng.uniform(0, np.pi)
+
+        # Position of every pixel along the gradient direction, scaled to [0, 1]
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        position = x * np.cos(angle) + y * np.sin(angle)
+        position -= position.min()
+        position /= max(float(position.max()), 1.0)
+        pixels = start + position[..., None] * (end - start)
+        image = Image.fromarray(pixels.astype(np.uint8))
+
+        if self.text and prompt:
+            draw = ImageDraw.Draw(image)
+            try:
+                font = ImageFont.load_default(size=max(12, width // 18))
+            except TypeError:
+                # Pillow without FreeType only has the fixed-size bitmap font
+                font = ImageFont.load_default()
+            colour = (0, 0, 0) if (start + end).mean() > 255 else (255, 255, 255)
+            draw.multiline_text((width / 2, height / 2), "\n".join(textwrap.wrap(prompt, 24)),
+                                fill=colour, font=font, anchor="mm", align="center")
+        return image
+
+    def generate(self, prompt, output_path, seed=None, label=""):
+        if self.latency:
+            time.sleep(self.latency)
+        # Favour speed over size; these files only feed the video encoder
+        self.render(prompt, seed).save(output_path, format="PNG", compress_level=1)
+        return True
+
+    def cache_identity(self):
+        return {"backend": self.name, "width": self.width, "height": self.height, "text": self.text,
+                "quality": self.quality}
+
+
+BACKENDS = {
+    "stability": StabilityBackend,
+    "procedural": ProceduralBackend
+}
+
+
+def get_backend(name, **kwargs):
+    """
+    Create an image backend by name.
+
+    Args:
+        name (str): One of ``BACKENDS``
+        **kwargs: Arguments for the backend constructor
+
+    Returns:
+        ImageBackend: The backend instance
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown image backend: {name}")
+    return backend_class(**kwargs)
@@ -3,16 +3,16 @@ Image Generator module for creating images from text prompts using Stability AI
 """
 
 import os
-import time
 import logging
-import requests
-from pathlib import Path
-import base64
-from PIL import Image
-import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+from podcast_to_reels.utils.cache import link_or_copy
+from .backends import StabilityBackend, DEFAULT_MAX_WORKERS, temp_path
+from .postprocess import upscale_image
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -20,132 +20,232 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def generate_images(scenes, output_dir="output/images", style="modern flat illustration, bright colours"):
+# Images submitted but unfinished per worker: one running and one queued behind it
+PENDING_PER_WORKER = 2
+
+
+def _place_image(temp_file, image_path, cache=None, cache_key=None):
+    """
+    Move a finished temporary file to its final path in one atomic rename.
+
+    With a ``cache`` the file is moved into the cache and linked into place.
+    """
+    try:
+        if cache is not None:
+            link_or_copy(cache.put(cache_key, temp_file, ".png", move=True), image_path)
+        else:
+            os.replace(temp_file, image_path)
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+    return image_path
+
+
+def _generate_image(backend, prompt, image_path, label, seed=None, cache=None, cache_key=None):
+    """
+    Render one image to a temporary file and move it into place.
+
+    Drafts rendered below the output size are upscaled first.
+
+    Returns:
+        str: Path of the saved image, or None if the backend failed
+    """
+    temp_file = temp_path(os.path.dirname(image_path))
+    try:
+        if not backend.generate(prompt, temp_file, seed=seed, label=label):
+            return None
+        if backend.render_size != (backend.width, backend.height):
+            upscale_image(temp_file, temp_file, (backend.width, backend.height))
+        _place_image(temp_file, image_path, cache, cache_key)
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+    logger.info(f"Image saved to {image_path}")
+    return image_path
+
+
+def generate_images(scenes, output_dir="output/images", style="modern flat illustration, bright colours",
+                    max_workers=DEFAULT_MAX_WORKERS, session=None, backoff_base=1.0, backoff_max=30.0, cache=None,
+                    seed=None, binary=False, backend=None, quality="full"):
     """
-    Generate images for each scene using Stability AI API.
-    
+    Generate images for each scene using Stability AI API or another image backend.
+
+    Requests run concurrently on a thread pool. Scene ``i`` is always saved
+    as ``scene_{i+1:03d}.png`` and the returned paths keep the order of the
+    scenes, however the requests finish. Each image is written to a
+    temporary file and renamed into place.
+
+    Without a ``backend`` the Stability API is used through a
+    ``StabilityBackend`` built from ``session``, ``backoff_base``,
+    ``backoff_max``, ``binary`` and ``quality``; see there for retries,
+    rate limiting and binary responses.
+
+    At ``draft`` quality the backend renders smaller images with fewer steps,
+    which are upscaled locally to the output size. Drafts are cached under
+    keys of their own; a later full-quality run of the same scenes only
+    generates the images that are not cached at full quality yet.
+
+    With a ``cache`` every image is stored under a hash of its request. A
+    scene whose exact request was made before is hard-linked (or copied)
+    from the cache without calling the backend, and no API key is needed
+    when every image is cached.
+
+    A scene with ``duplicate_of`` set reuses the image of that earlier scene
+    instead of generating its own. A scene without an image, because its
+    prompt or its request failed, shows the image of the scene before it (or
+    of the first later scene), so the returned list stays aligned with the
+    scenes for ``compose_video``.
+
     Args:
         scenes (list): List of Scene objects with prompts
         output_dir (str): Directory to save the generated images
         style (str): Style description to append to prompts
-        
+        max_workers (int): Number of images generated at once
+        session (requests.Session): Optional session to reuse (default: a new pooled session)
+        backoff_base (float): First retry delay in seconds, doubled on each retry
+        backoff_max (float): Longest retry delay in seconds
+        cache (FileCache): Optional persistent image cache
+        seed (int): Optional generation seed, part of the request and cache key
+        binary (bool): Request raw image bytes and stream them to disk
+        backend (ImageBackend): Image engine (default: Stability API)
+        quality (str): "full" or "draft" for the default backend; a given backend keeps its own
+
     Returns:
-        list: Paths to the generated images
+        list: One image path per scene, or an empty list if no image could be generated
+    """
+    return generate_images_stream(
+        enumerate(scenes), output_dir=output_dir, style=style, max_workers=max_workers, session=session,
+        backoff_base=backoff_base, backoff_max=backoff_max, cache=cache, seed=seed, binary=binary, backend=backend,
+        quality=quality, total=len(scenes)
+    )
+
+
+def generate_images_stream(scene_items, output_dir="output/images", style="modern flat illustration, bright colours",
+                           max_workers=DEFAULT_MAX_WORKERS, session=None, backoff_base=1.0, backoff_max=30.0,
+                           cache=None, seed=None, binary=False, backend=None, quality="full", total=None):
+    """
+    Generate images for scenes as they arrive, e.g. from ``iter_split_scenes``.
+
+    Each ``(index, scene)`` pair is submitted to the thread pool as soon as
+    it is read, so images are generated while later scenes are still being
+    produced. Scenes may arrive in any order: scene ``index`` is saved as
+    ``scene_{index+1:03d}.png`` and the returned paths are sorted by index
+    once the input is exhausted. A duplicate scene only needs to arrive
+    after it is read; its image is resolved at the end. Otherwise this
+    behaves like ``generate_images``.
+
+    At most ``PENDING_PER_WORKER`` images per worker are submitted and not
+    yet finished. Once that many are pending, no more scenes are read, so a
+    producer feeding ``scene_items`` through a bounded queue is held back
+    instead of the backlog piling up in the thread pool.
+
+    Args:
+        scene_items (iterable): ``(index, scene)`` pairs
+        total (int): Number of scenes, if known, for progress and log output
+        (other arguments as for ``generate_images``)
+
+    Returns:
+        list: One image path per scene in scene order, or an empty list if no image could be generated
     """
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Get API key from environment variable
-    api_key = os.getenv("STABILITY_API_KEY")
-    if not api_key:
-        logger.error("STABILITY_API_KEY environment variable not set")
-        raise ValueError("STABILITY_API_KEY environment variable not set")
-    
-    # API endpoint for Stability AI
-    api_host = os.getenv("STABILITY_API_HOST", "https://api.stability.ai")
-    api_endpoint = f"{api_host}/v2beta/stable-diffusion/text-to-image"
-    
-    # Headers for API request
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    
-    image_paths = []
-    
-    logger.info(f"Generating {len(scenes)} images")
-    
-    for i, scene in enumerate(tqdm(scenes, desc="Generating images")):
+
+    owns_backend = backend is None
+    if owns_backend:
+        backend = StabilityBackend(max_workers=max_workers, session=session, backoff_base=backoff_base,
+                                   backoff_max=backoff_max, binary=binary, quality=quality)
+    # Fail early on missing credentials unless cache hits may make them unnecessary
+    if cache is None:
+        backend.prepare()
+    scenes = {}
+    scene_images = {}
+    futures = {}
+    pending = threading.BoundedSemaphore(PENDING_PER_WORKER * max_workers)
+
+    def submit(i, scene, executor, progress):
         # Skip if no prompt
         if not scene.prompt:
             logger.warning(f"No prompt for scene {i+1}, skipping")
-            continue
-        
+            progress.update()
+            return
+
         # Enhance prompt with style
-        enhanced_prompt = f"{scene.prompt} {style}"
-        
-        # Prepare payload for API request
-        payload = {
-            "model_id": "sd3.5-medium",
-            "width": 1080,
-            "height": 1920,  # Vertical format for reels
-            "samples": 1,
-            "steps": 30,
-            "prompt": enhanced_prompt,
-            "cfg_scale": 7.0
-        }
-        
-        # File path for the image
-        image_filename = f"scene_{i+1:03d}.png"
-        image_path = os.path.join(output_dir, image_filename)
-        
-        # Try up to 3 times (initial attempt + 2 retries)
-        max_retries = 2
-        retry_count = 0
-        success = False
-        
-        while not success and retry_count <= max_retries:
-            try:
-                logger.info(f"Generating image {i+1}/{len(scenes)}: {enhanced_prompt[:50]}...")
-                
-                # Make API request
-                response = requests.post(
-                    api_endpoint,
-                    headers=headers,
-                    json=payload
-                )
-                
-                # Check for errors
-                if response.status_code >= 500:
-                    logger.warning(f"Server error (5xx): {response.status_code}. Retrying...")
-                    retry_count += 1
-                    time.sleep(2)  # Wait before retrying
-                    continue
-                
-                # Raise exception for other errors
-                response.raise_for_status()
-                
-                # Parse response
-                data = response.json()
-                
-                # Save image
-                if "artifacts" in data and len(data["artifacts"]) > 0:
-                    for j, artifact in enumerate(data["artifacts"]):
-                        if artifact["finishReason"] == "SUCCESS":
-                            # Decode base64 image
-                            image_data = base64.b64decode(artifact["base64"])
-                            
-                            # Save image
-                            with open(image_path, "wb") as f:
-                                f.write(image_data)
-                            
-                            logger.info(f"Image saved to {image_path}")
-                            image_paths.append(image_path)
-                            success = True
-                            break
-                
-                # If we got here without success, log an error
-                if not success:
-                    logger.error(f"Failed to generate image: {data.get('message', 'Unknown error')}")
-                    retry_count += 1
-                
-                # Rate limiting - don't exceed 1 request per second
-                time.sleep(1)
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error: {e}")
-                retry_count += 1
-                time.sleep(2)  # Wait before retrying
-            
-            except Exception as e:
-                logger.error(f"Error generating image: {e}")
-                retry_count += 1
-                time.sleep(2)  # Wait before retrying
-        
-        # If all retries failed, log error but continue with next scene
-        if not success:
-            logger.error(f"Failed to generate image for scene {i+1} after {max_retries + 1} attempts")
-    
+        prompt = f"{scene.prompt} {style}"
+        image_path = os.path.join(output_dir, f"scene_{i+1:03d}.png")
+
+        cache_key = None
+        if cache is not None:
+            cache_key = backend.cache_key(prompt, seed)
+            cached_path = cache.get(cache_key, ".png")
+            if cached_path is not None:
+                logger.info(f"Image cache hit for scene {i+1}")
+                scene_images[i] = link_or_copy(cached_path, image_path)
+                progress.update()
+                return
+            backend.prepare()
+
+        label = f"{i+1}/{total}" if total is not None else f"{i+1}"
+        pending.acquire()
+        future = executor.submit(_generate_image, backend, prompt, image_path, label, seed, cache, cache_key)
+        future.add_done_callback(lambda _: pending.release())
+        futures[future] = i
+
+    def collect(progress):
+        for future in as_completed(list(futures)):
+            i = futures.pop(future)
+            image_path = future.result()
+            if image_path is None:
+                logger.error(f"Failed to generate image for scene {i+1}")
+            else:
+                scene_images[i] = image_path
+            progress.update()
+
+    logger.info(f"Generating {total if total is not None else 'streamed'} {backend.quality} quality images "
+                f"with the {backend.name} backend and {max_workers} workers")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                tqdm(total=total, desc="Generating images") as progress:
+            duplicates = []
+            for i, scene in scene_items:
+                scenes[i] = scene
+                if getattr(scene, "duplicate_of", None) is None:
+                    submit(i, scene, executor, progress)
+                else:
+                    duplicates.append(i)
+            collect(progress)
+
+            # Duplicates whose earlier scene failed get an image of their own
+            orphans = [i for i in duplicates if scenes[i].duplicate_of not in scene_images]
+            progress.update(len(duplicates) - len(orphans))
+            for i in orphans:
+                submit(i, scenes[i], executor, progress)
+            collect(progress)
+    finally:
+        if owns_backend:
+            backend.close()
+
+    image_paths = {}
+    for i in sorted(scenes):
+        duplicate_of = getattr(scenes[i], "duplicate_of", None)
+        if i in scene_images:
+            image_paths[i] = scene_images[i]
+        elif duplicate_of is not None and duplicate_of in scene_images:
+            # Reuse the image of an earlier near-duplicate scene
+            logger.info(f"Scene {i+1} reuses the image of scene {duplicate_of+1}")
+            image_paths[i] = scene_images[duplicate_of]
+    if not image_paths:
+        logger.info("Generated 0 images")
+        return []
+
+    # Keep the list aligned with the scenes: a scene without an image shows its neighbour's
+    previous = image_paths[min(image_paths)]
+    for i in sorted(scenes):
+        if i not in image_paths:
+            logger.warning(f"Scene {i+1} has no image, showing the image of a neighbouring scene")
+            image_paths[i] = previous
+        previous = image_paths[i]
+    image_paths = [image_paths[i] for i in sorted(scenes)]
+
     logger.info(f"Generated {len(image_paths)} images")
     return image_paths
@@ -0,0 +1,191 @@
+"""
+Post-processing that fits generated images to the exact video resolution.
+"""
+
+import os
+import uuid
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image, ImageOps
+
+from podcast_to_reels.utils.cache import make_key, hash_file, link_or_copy
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Output size of the reels (width, height)
+VIDEO_RESOLUTION = (1080, 1920)
+
+# crop: fill the frame and cut the overflow; letterbox: fit inside and pad; stretch: ignore the aspect ratio
+FIT_MODES = ("crop", "letterbox", "stretch")
+
+# Bump when the fitting code changes so cached outputs are not reused
+PREFIT_VERSION = 1
+
+
+def fit_image(image_path, output_path, size=VIDEO_RESOLUTION, mode="letterbox", background=(0, 0, 0)):
+    """
+    Resize an image to exactly ``size`` and save it as PNG.
+
+    The result is written to a temporary file and renamed into place.
+
+    Args:
+        image_path (str): Image to fit
+        output_path (str): Where to save the fitted image
+        size (tuple): Target (width, height)
+        mode (str): One of ``FIT_MODES``
+        background (tuple): RGB colour of letterbox bars
+
+    Returns:
+        str: Path to the fitted image
+    """
+    if mode not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {mode}")
+    size = tuple(size)
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        if image.size == size:
+            fitted = image
+        elif mode == "crop":
+            fitted = ImageOps.fit(image, size, method=Image.Resampling.LANCZOS)
+        elif mode == "letterbox":
+            fitted = ImageOps.pad(image, size, method=Image.Resampling.LANCZOS, color=tuple(background))
+        else:
+            fitted = image.resize(size, Image.Resampling.LANCZOS)
+
+        temp_path = os.path.join(os.path.dirname(output_path) or ".", f".{uuid.uuid4().hex}.tmp")
+        try:
+            # Favour speed over size; these files only feed the video encoder
+            fitted.save(temp_path, format="PNG", compress_level=1)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+    return output_path
+
+
+def _bilinear_taps(output_length, input_length):
+    """Source indices and weights of every output pixel along one axis, sampling at pixel centres."""
+    position = (np.arange(output_length, dtype=np.float32) + 0.5) * (input_length / output_length) - 0.5
+    position = np.clip(position, 0, input_length - 1)
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, input_length - 1)
+    return low, high, position - low
+
+
+def upscale_bilinear(pixels, size):
+    """
+    Resize an image array with bilinear interpolation.
+
+    Both axes are interpolated as whole-array gathers, one axis after the
+    other, so there is no Python loop over pixels.
+
+    Args:
+        pixels (numpy.ndarray): ``(height, width, channels)`` uint8 array
+        size (tuple): Target (width, height)
+
+    Returns:
+        numpy.ndarray: ``(size[1], size[0], channels)`` uint8 array
+    """
+    width, height = size
+    rows_low, rows_high, row_weights = _bilinear_taps(height, pixels.shape[0])
+    cols_low, cols_high, col_weights = _bilinear_taps(width, pixels.shape[1])
+
+    data = pixels.astype(np.float32)
+    row_weights = row_weights[:, None, None]
+    rows = data[rows_low] * (1 - row_weights) + data[rows_high] * row_weights
+    col_weights = col_weights[None, :, None]
+    result = rows[:, cols_low] * (1 - col_weights) + rows[:, cols_high] * col_weights
+    return np.clip(result + 0.5, 0, 255).astype(np.uint8)
+
+
+def upscale_image(image_path, output_path, size):
+    """
+    Upscale a draft image to ``size`` with ``upscale_bilinear`` and save it as PNG.
+
+    ``output_path`` may be ``image_path``.
+
+    Returns:
+        str: Path to the upscaled image
+    """
+    with Image.open(image_path) as image:
+        pixels = np.asarray(image.convert("RGB"))
+    if pixels.shape[1::-1] != tuple(size):
+        pixels = upscale_bilinear(pixels, size)
+    Image.fromarray(pixels).save(output_path, format="PNG", compress_level=1)
+    return output_path
+
+
+def prefit_cache_key(image_path, size, mode, background):
+    """Build the cache key of a fitted image from the source content and fit settings."""
+    return make_key("prefit", PREFIT_VERSION, hash_file(image_path), list(size), mode, list(background))
+
+
+def prefit_images(image_paths, size=VIDEO_RESOLUTION, mode="letterbox", background=(0, 0, 0), output_dir=None,
+                  cache=None, max_workers=None):
+    """
+    Fit every image to the video resolution once, before composition.
+
+    Images are processed in parallel on a process pool. Outputs are named by
+    a hash of the source image and the fit settings, so an image that was
+    already fitted, in this run directory or in the ``cache``, is not
+    processed again, and repeated paths are fitted once.
+
+    Args:
+        image_paths (list): Images to fit
+        size (tuple): Target (width, height)
+        mode (str): One of ``FIT_MODES``
+        background (tuple): RGB colour of letterbox bars
+        output_dir (str): Directory for fitted images (default: ``fitted`` next to the first image)
+        cache (FileCache): Optional persistent cache of fitted images
+        max_workers (int): Number of worker processes (default: one per CPU)
+
+    Returns:
+        list: Paths to the fitted images, aligned with ``image_paths``
+    """
+    if mode not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {mode}")
+    if not image_paths:
+        return []
+    if output_dir is None:
+        output_dir = os.path.join(os.path.dirname(image_paths[0]), "fitted")
+    os.makedirs(output_dir, exist_ok=True)
+
+    keys = {}
+    for image_path in image_paths:
+        if image_path not in keys:
+            keys[image_path] = prefit_cache_key(image_path, size, mode, background)
+
+    jobs = {}
+    for image_path, key in keys.items():
+        output_path = os.path.join(output_dir, f"{key[:24]}.png")
+        if os.path.exists(output_path) or key in jobs:
+            continue
+        cached_path = cache.get(key, ".png") if cache is not None else None
+        if cached_path is not None:
+            link_or_copy(cached_path, output_path)
+            continue
+        jobs[key] = (image_path, output_path)
+
+    if jobs:
+        logger.info(f"Fitting {len(jobs)} images to {size[0]}x{size[1]} ({mode})")
+        if len(jobs) == 1 or max_workers == 1:
+            for image_path, output_path in jobs.values():
+                fit_image(image_path, output_path, size, mode, background)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(fit_image, image_path, output_path, size, mode, background)
+                    for image_path, output_path in jobs.values()
+                ]
+                for future in futures:
+                    future.result()
+        if cache is not None:
+            for key, (_, output_path) in jobs.items():
+                cache.put(key, output_path, ".png")
+
+    return [os.path.join(output_dir, f"{keys[image_path][:24]}.png") for image_path in image_paths]
+
@@ -2,6 +2,14 @@
 Scene Splitter module for chunking transcripts and generating image prompts.
 """
 
-from .scene_splitter import split_scenes
+from .scene_splitter import split_scenes, iter_split_scenes, chunk_transcript, iter_scenes, Scene
+from .prompt_engine import AsyncPromptEngine, PromptResults, PromptFailure
+from .prompt_cache import PromptCache
+from .dedupe import PromptIndex
+from .scene_table import SceneTable, read_scenes, write_scenes
 
-__all__ = ["split_scenes"]
+__all__ = [
+    "split_scenes", "iter_split_scenes", "chunk_transcript", "iter_scenes", "Scene",
+    "AsyncPromptEngine", "PromptResults", "PromptFailure", "PromptCache", "PromptIndex",
+    "SceneTable", "read_scenes", "write_scenes"
+]
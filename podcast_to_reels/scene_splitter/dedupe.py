@@ -0,0 +1,254 @@
+"""
+Near-duplicate detection for scenes using cosine similarity of hashed n-grams.
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+import numpy as np
+
+from .semantic import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NGRAM_FEATURES = 4096
+DEFAULT_THRESHOLD = 0.85
+
+# Scenes kept per show; the least recently matched are dropped beyond this
+DEFAULT_INDEX_ENTRIES = 20_000
+
+# Milliseconds a writer waits for another process to release the database
+BUSY_TIMEOUT_MS = 10_000
+
+
+def _grams(text):
+    tokens = tokenize(text)
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def ngram_vectors(texts, n_features=NGRAM_FEATURES):
+    """
+    Build L2-normalised vectors of hashed word unigrams and bigrams.
+
+    Args:
+        texts (list): Texts to vectorise
+        n_features (int): Number of hashed features
+
+    Returns:
+        numpy.ndarray: ``(len(texts), n_features)`` float32 matrix
+    """
+    rows = []
+    cols = []
+    for row, text in enumerate(texts):
+        grams = _grams(text)
+        rows.extend([row] * len(grams))
+        cols.extend(zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams)
+
+    vectors = np.zeros((len(texts), n_features), dtype=np.float32)
+    np.add.at(vectors, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def ngram_features(text, n_features=NGRAM_FEATURES):
+    """
+    Sparse form of ``ngram_vectors`` for a single text.
+
+    Returns:
+        dict: L2-normalised weight of each non-zero hashed feature
+    """
+    counts = defaultdict(int)
+    for gram in _grams(text):
+        counts[zlib.crc32(gram.encode("utf-8")) % n_features] += 1
+    norm = sum(count * count for count in counts.values()) ** 0.5
+    return {feature: count / norm for feature, count in counts.items()}
+
+
+class SimilarityIndex:
+    """
+    Growable matrix of unit vectors with a payload per row.
+
+    A query is a single matrix-vector product against every stored row.
+    """
+    def __init__(self, n_features=NGRAM_FEATURES):
+        self.n_features = n_features
+        self.payloads = []
+        self._vectors = np.zeros((16, n_features), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.payloads)
+
+    @property
+    def vectors(self):
+        return self._vectors[:len(self.payloads)]
+
+    def add(self, vector, payload):
+        """Store a vector with its payload."""
+        if len(self.payloads) == len(self._vectors):
+            grown = np.zeros((2 * len(self._vectors), self.n_features), dtype=np.float32)
+            grown[:len(self.payloads)] = self._vectors
+            self._vectors = grown
+        self._vectors[len(self.payloads)] = vector
+        self.payloads.append(payload)
+
+    def best_match(self, vector):
+        """
+        Find the stored vector most similar to ``vector``.
+
+        Returns:
+            tuple: (payload, cosine similarity), or (None, 0.0) if the index is empty
+        """
+        if not self.payloads:
+            return None, 0.0
+        similarities = self.vectors @ vector
+        best = int(np.argmax(similarities))
+        return self.payloads[best], float(similarities[best])
+
+
+def find_duplicates(texts, threshold=DEFAULT_THRESHOLD):
+    """
+    Map each text to an earlier near-duplicate.
+
+    Args:
+        texts (list): Texts in order
+        threshold (float): Cosine similarity at which two texts are duplicates
+
+    Returns:
+        list: Index of the first similar earlier text, or None, for each text
+    """
+    index = SimilarityIndex()
+    duplicates = []
+    for position, vector in enumerate(ngram_vectors(texts)):
+        match, similarity = index.best_match(vector)
+        if match is not None and similarity >= threshold and vector.any():
+            duplicates.append(match)
+        else:
+            duplicates.append(None)
+            index.add(vector, position)
+    return duplicates
+
+
+class PromptIndex:
+    """
+    Persistent index of scene texts and the prompts generated for them.
+
+    Lets later runs of the same show reuse the prompt of a scene that is
+    similar, not only identical, to one seen before. Scenes are stored in
+    SQLite as their sparse hashed n-gram features, one row per non-zero
+    feature, so a lookup only reads the scenes that share a feature with the
+    query. Like ``PromptCache`` the database runs in WAL mode with a busy
+    timeout, so concurrent runs add to the same index instead of replacing
+    each other's entries. Once there are more than ``max_entries`` scenes,
+    the least recently matched are removed.
+    """
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_INDEX_ENTRIES,
+                 n_features=NGRAM_FEATURES):
+        self.path = str(path)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.n_features = n_features
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                "id INTEGER PRIMARY KEY, prompt TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scenes_accessed ON scenes (accessed)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS features (feature INTEGER NOT NULL, scene INTEGER NOT NULL, "
+                "weight REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS features_feature ON features (feature)")
+            conn.execute("CREATE INDEX IF NOT EXISTS features_scene ON features (scene)")
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM scenes").fetchone()[0]
+
+    def lookup(self, texts):
+        """
+        Find prompts of earlier scenes similar to ``texts`` and mark them as recently used.
+
+        Returns:
+            list: Prompt or None for each text
+        """
+        prompts = []
+        matched = set()
+        with self._connection() as conn:
+            for text in texts:
+                query = ngram_features(text, self.n_features)
+                scores = defaultdict(float)
+                if query:
+                    rows = conn.execute(
+                        f"SELECT scene, feature, weight FROM features WHERE feature IN ({', '.join('?' * len(query))})",
+                        list(query)
+                    )
+                    for scene, feature, weight in rows:
+                        scores[scene] += weight * query[feature]
+                best = max(scores, key=scores.get, default=None)
+                if best is None or scores[best] < self.threshold:
+                    prompts.append(None)
+                    continue
+                prompts.append(conn.execute("SELECT prompt FROM scenes WHERE id = ?", (best,)).fetchone()[0])
+                matched.add(best)
+            conn.executemany("UPDATE scenes SET accessed = ? WHERE id = ?", [(time.time(), scene) for scene in matched])
+        return prompts
+
+    def add(self, texts, prompts):
+        """Add scenes and their prompts to the index in one transaction."""
+        now = time.time()
+        with self._connection() as conn:
+            for text, prompt in zip(texts, prompts):
+                features = ngram_features(text, self.n_features)
+                if not features:
+                    continue
+                scene = conn.execute(
+                    "INSERT INTO scenes (prompt, accessed) VALUES (?, ?)", (prompt, now)
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO features (feature, scene, weight) VALUES (?, ?, ?)",
+                    [(feature, scene, weight) for feature, weight in features.items()]
+                )
+        self.evict()
+
+    def evict(self):
+        """
+        Trim the index to ``max_entries`` scenes.
+
+        Returns:
+            int: Number of scenes removed
+        """
+        with self._connection() as conn:
+            stale = "SELECT id FROM scenes ORDER BY accessed DESC LIMIT -1 OFFSET ?"
+            conn.execute(f"DELETE FROM features WHERE scene IN ({stale})", (self.max_entries,))
+            removed = conn.execute(f"DELETE FROM scenes WHERE id IN ({stale})", (self.max_entries,)).rowcount
+        if removed:
+            logger.info(f"Evicted {removed} scenes from prompt index {self.path}")
+        return removed
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,190 @@
+"""
+Persistent cache of generated image prompts backed by SQLite.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from podcast_to_reels.utils.cache import make_key
+from .prompts import SYSTEM_PROMPT, PROMPT_MODEL, PROMPT_MAX_TOKENS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Prompts older than this are regenerated (30 days)
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Milliseconds a writer waits for another process to release the database
+BUSY_TIMEOUT_MS = 10_000
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different scene texts share a prompt."""
+    return " ".join(text.split()).lower()
+
+
+def prompt_cache_key(text, system_prompt=SYSTEM_PROMPT, model=PROMPT_MODEL, max_tokens=PROMPT_MAX_TOKENS):
+    """
+    Build the cache key of the prompt for one scene.
+
+    Args:
+        text (str): Scene text
+        system_prompt (str): System prompt the prompt is generated with
+        model (str): Chat model
+        max_tokens (int): Token limit of the reply
+
+    Returns:
+        str: Cache key
+    """
+    return make_key("prompt", normalize_text(text), system_prompt, model, max_tokens)
+
+
+class PromptCache:
+    """
+    SQLite table of image prompts keyed by scene text and generation settings.
+
+    The database runs in WAL mode with a busy timeout, so several worker
+    processes can read and write the same file. Each thread gets its own
+    connection. Entries expire after ``ttl_seconds``, and the least recently
+    used entries are removed once there are more than ``max_entries``.
+    """
+    def __init__(self, path, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 system_prompt=SYSTEM_PROMPT, model=PROMPT_MODEL, max_tokens=PROMPT_MAX_TOKENS):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.system_prompt = system_prompt
+        self.model = model
+        self.max_tokens = max_tokens
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompts ("
+                "key TEXT PRIMARY KEY, prompt TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS prompts_accessed ON prompts (accessed)")
+
+    def key(self, text):
+        """Return the cache key of a scene text under this cache's settings."""
+        return prompt_cache_key(text, self.system_prompt, self.model, self.max_tokens)
+
+    def get(self, text):
+        """Return the cached prompt for a scene text, or None on a miss."""
+        return self.get_many([text]).get(text)
+
+    def get_many(self, texts):
+        """
+        Look up the prompts of several scene texts and mark them as recently used.
+
+        Args:
+            texts (list): Scene texts
+
+        Returns:
+            dict: Cached prompt for each text that was found
+        """
+        keys = {text: self.key(text) for text in texts}
+        now = time.time()
+        found = {}
+        with self._connection() as conn:
+            for text, key in keys.items():
+                row = conn.execute(
+                    "SELECT prompt FROM prompts WHERE key = ? AND created > ?", (key, now - self.ttl_seconds)
+                ).fetchone()
+                if row is not None:
+                    found[text] = row[0]
+            conn.executemany(
+                "UPDATE prompts SET accessed = ? WHERE key = ?", [(now, keys[text]) for text in found]
+            )
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, text, prompt):
+        """Store the prompt generated for a scene text."""
+        self.put_many({text: prompt})
+
+    def put_many(self, prompts):
+        """
+        Store several prompts in one transaction.
+
+        Args:
+            prompts (dict): Prompt for each scene text
+        """
+        if not prompts:
+            return
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO prompts (key, prompt, created, accessed) VALUES (?, ?, ?, ?)",
+                [(self.key(text), prompt, now, now) for text, prompt in prompts.items()]
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Remove expired entries and trim the table to ``max_entries``.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM prompts WHERE created <= ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            removed += conn.execute(
+                "DELETE FROM prompts WHERE key IN ("
+                "SELECT key FROM prompts ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+
+        if removed:
+            with self._lock:
+                self.evictions += removed
+            logger.info(f"Evicted {removed} entries from prompt cache {self.path}")
+        return removed
+
+    def stats(self):
+        """Return hit/miss counters and current size of the cache."""
+        with self._connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,222 @@
+"""
+Asynchronous image prompt generation with bounded concurrency and rate limits.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import openai
+
+from .prompts import build_prompt_request, parse_prompt_response
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Errors worth another attempt; anything else fails the scene straight away
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError
+)
+
+# Rough characters per token, used to charge the tokens-per-minute budget
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(request):
+    """Estimate the tokens a chat completion request will consume."""
+    prompt_chars = sum(len(message["content"]) for message in request["messages"])
+    return prompt_chars // CHARS_PER_TOKEN + request["max_tokens"]
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` tokens per minute.
+
+    Waiters are served in arrival order. A request larger than the bucket is
+    charged the full bucket so it can still go through.
+    """
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        """Wait until ``amount`` tokens are available and take them."""
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class PromptFailure:
+    """Class to represent a scene whose prompt could not be generated."""
+    def __init__(self, index, text, error):
+        self.index = index
+        self.text = text
+        self.error = error
+
+    def __repr__(self):
+        return f"PromptFailure(index={self.index}, error={self.error!r})"
+
+
+class PromptResults:
+    """Prompts generated by ``AsyncPromptEngine``, with ``None`` for failed scenes."""
+    def __init__(self, prompts, failures):
+        self.prompts = prompts
+        self.failures = failures
+
+    @property
+    def ok(self):
+        return not self.failures
+
+
+class AsyncPromptEngine:
+    """
+    Generate image prompts concurrently with the async OpenAI client.
+
+    At most ``max_concurrency`` requests are in flight, and token buckets
+    keep the run under the requests-per-minute and tokens-per-minute limits
+    of the account. Rate limit, timeout, connection and server errors are
+    retried with exponential backoff (honouring ``Retry-After``); a scene
+    that still fails is reported in ``PromptResults.failures`` without
+    affecting the others.
+    """
+    def __init__(self, api_key=None, client=None, max_concurrency=8, requests_per_minute=500,
+                 tokens_per_minute=200_000, max_retries=3, backoff_base=1.0, backoff_max=30.0):
+        self.api_key = api_key
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def generate(self, texts, batch_size=1, on_batch=None):
+        """
+        Generate prompts for ``texts`` from synchronous code.
+
+        Args:
+            texts (list): Scene texts
+            batch_size (int): Number of scenes per request
+            on_batch (callable): Called with the ``(index, prompt, error)``
+                tuples of each batch as soon as it finishes. Calls run one at
+                a time on a worker thread, so a callback that blocks holds up
+                later callbacks but not the requests in flight
+
+        Returns:
+            PromptResults: Prompts in input order and the failures
+        """
+        return asyncio.run(self.run(texts, batch_size, on_batch))
+
+    async def run(self, texts, batch_size=1, on_batch=None):
+        """Generate prompts for ``texts``; see ``generate``."""
+        client = self.client
+        if client is None:
+            api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                logger.error("OPENAI_API_KEY environment variable not set")
+                raise ValueError("OPENAI_API_KEY environment variable not set")
+            # Retries are handled here so they share the rate limiters
+            client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+
+        # Created per run because asyncio primitives belong to one event loop
+        limits = _RunLimits(self.max_concurrency, self.requests_per_minute, self.tokens_per_minute)
+
+        callbacks = asyncio.Lock()
+
+        async def generate_batch(indices):
+            outcome = await self._generate_batch(client, limits, indices, texts)
+            if on_batch is not None:
+                async with callbacks:
+                    await asyncio.to_thread(on_batch, outcome)
+            return outcome
+
+        try:
+            batches = [list(range(first, min(first + batch_size, len(texts))))
+                       for first in range(0, len(texts), batch_size)]
+            outcomes = await asyncio.gather(*(generate_batch(indices) for indices in batches))
+        finally:
+            if self.client is None:
+                await client.close()
+
+        prompts = [None] * len(texts)
+        failures = []
+        for outcome in outcomes:
+            for index, prompt, error in outcome:
+                if error is None:
+                    prompts[index] = prompt
+                else:
+                    failures.append(PromptFailure(index, texts[index], error))
+        failures.sort(key=lambda failure: failure.index)
+        logger.info(f"Generated {len(texts) - len(failures)}/{len(texts)} prompts")
+        return PromptResults(prompts, failures)
+
+    async def _generate_batch(self, client, limits, indices, texts):
+        """Return ``(index, prompt, error)`` for every scene of a batch."""
+        batch_texts = [texts[index] for index in indices]
+        try:
+            response = await self._request(client, limits, build_prompt_request(batch_texts))
+            prompts = parse_prompt_response(response, len(indices))
+        except (ValueError, TypeError) as e:
+            if len(indices) == 1:
+                return [(indices[0], None, e)]
+            middle = len(indices) // 2
+            logger.warning(f"Malformed response for a batch of {len(indices)} scenes ({e}), retrying as two batches")
+            halves = await asyncio.gather(
+                self._generate_batch(client, limits, indices[:middle], texts),
+                self._generate_batch(client, limits, indices[middle:], texts)
+            )
+            return halves[0] + halves[1]
+        except Exception as e:
+            logger.error(f"Error generating prompts for scenes {[index + 1 for index in indices]}: {e}")
+            return [(index, None, e) for index in indices]
+        return [(index, prompt, None) for index, prompt in zip(indices, prompts)]
+
+    async def _request(self, client, limits, request):
+        """Send one request within the limits, retrying transient errors."""
+        tokens = estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            await limits.requests.acquire(1)
+            await limits.tokens.acquire(tokens)
+            async with limits.concurrency:
+                try:
+                    return await client.chat.completions.create(**request)
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+                    logger.warning(f"Prompt request failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt, error):
+        """Seconds to wait before retry ``attempt + 1``."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(self.backoff_max, float(retry_after))
+        except (TypeError, ValueError):
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+            return delay * random.uniform(0.5, 1.0)
+
+
+class _RunLimits:
+    """Concurrency and rate limiters shared by the requests of one run."""
+    def __init__(self, max_concurrency, requests_per_minute, tokens_per_minute):
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
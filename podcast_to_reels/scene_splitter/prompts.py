@@ -0,0 +1,74 @@
+"""
+Chat requests that turn scene text into image prompts.
+"""
+
+import json
+
+# Prompt generation settings
+PROMPT_MODEL = "gpt-4o-mini"
+PROMPT_MAX_TOKENS = 100
+SYSTEM_PROMPT = "You are a creative visual director. Create a vivid, detailed image prompt based on the provided text from a science podcast. The prompt should be suitable for image generation and capture the essence of the scientific concept being discussed. Focus on creating a visually engaging representation that would work well in a short video reel. Use modern flat illustration style with bright colors."
+
+# Extra instructions when several scenes share one request
+BATCH_INSTRUCTIONS = "You will receive a JSON array of texts. Reply with a JSON object whose \"prompts\" key holds an array with exactly one image prompt per text, in the same order."
+
+
+def build_prompt_request(texts):
+    """
+    Build the chat completion arguments for one scene or a batch of scenes.
+    
+    Args:
+        texts (list): Scene texts
+        
+    Returns:
+        dict: Keyword arguments for ``chat.completions.create``
+    """
+    if len(texts) == 1:
+        return {
+            "model": PROMPT_MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Create an image prompt based on this text from a science podcast: '{texts[0]}'"}
+            ],
+            "max_tokens": PROMPT_MAX_TOKENS
+        }
+    return {
+        "model": PROMPT_MODEL,
+        "messages": [
+            {"role": "system", "content": f"{SYSTEM_PROMPT} {BATCH_INSTRUCTIONS}"},
+            {"role": "user", "content": f"Create an image prompt for each of these texts from a science podcast: {json.dumps(texts)}"}
+        ],
+        "max_tokens": PROMPT_MAX_TOKENS * len(texts),
+        "response_format": {"type": "json_object"}
+    }
+
+
+def parse_prompt_response(response, count):
+    """
+    Extract the prompts from a chat completion.
+    
+    Args:
+        response: Chat completion returned for ``build_prompt_request``
+        count (int): Number of scenes in the request
+        
+    Returns:
+        list: One image prompt per scene
+        
+    Raises:
+        ValueError: If a batch response is malformed
+    """
+    content = response.choices[0].message.content
+    if count == 1:
+        return [content.strip()]
+    return _parse_prompt_batch(content, count)
+
+
+def _parse_prompt_batch(content, expected):
+    """Return the prompts of a batch response, or raise ValueError if it is malformed."""
+    data = json.loads(content)
+    prompts = data.get("prompts") if isinstance(data, dict) else data
+    if not isinstance(prompts, list) or len(prompts) != expected:
+        raise ValueError(f"Expected {expected} prompts in batch response")
+    if not all(isinstance(prompt, str) and prompt.strip() for prompt in prompts):
+        raise ValueError("Batch response contains an empty or non-text prompt")
+    return [prompt.strip() for prompt in prompts]
@@ -0,0 +1,31 @@
+"""
+Scene model shared by the scene splitter, image generator and video composer.
+"""
+
+
+class Scene:
+    """
+    Class to represent a scene with text, timestamp, and image prompt.
+    
+    ``duplicate_of`` is the index of an earlier scene whose prompt and image
+    this scene reuses, or None. Instances use ``__slots__`` so long episodes
+    with thousands of scenes carry no per-instance dict.
+    """
+    __slots__ = ("text", "start_time", "end_time", "prompt", "duplicate_of")
+    
+    def __init__(self, text, start_time, end_time, prompt=None, duplicate_of=None):
+        self.text = text
+        self.start_time = start_time
+        self.end_time = end_time
+        self.prompt = prompt
+        self.duplicate_of = duplicate_of
+        
+    def to_dict(self):
+        """Convert scene to dictionary."""
+        return {
+            "text": self.text,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "prompt": self.prompt,
+            "duplicate_of": self.duplicate_of
+        }
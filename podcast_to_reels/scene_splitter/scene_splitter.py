@@ -3,12 +3,21 @@ Scene Splitter module for chunking transcripts and generating image prompts.
 """
 
 import os
-import json
 import logging
+import itertools
 from pathlib import Path
 import openai
 from dotenv import load_dotenv
 
+from .prompts import build_prompt_request, parse_prompt_response
+from .prompt_engine import AsyncPromptEngine
+from .semantic import segment_by_topic
+from .dedupe import find_duplicates, ngram_vectors, SimilarityIndex
+from .scene import Scene
+from .scene_table import write_scenes
+from podcast_to_reels.utils.jsonstream import iter_json_array, read_json_value
+from podcast_to_reels.utils.stage import iter_stage, DEFAULT_QUEUE_SIZE
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,147 +25,466 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class Scene:
-    """Class to represent a scene with text, timestamp, and image prompt."""
-    def __init__(self, text, start_time, end_time, prompt=None):
-        self.text = text
-        self.start_time = start_time
-        self.end_time = end_time
-        self.prompt = prompt
-        
-    def to_dict(self):
-        """Convert scene to dictionary."""
-        return {
-            "text": self.text,
-            "start_time": self.start_time,
-            "end_time": self.end_time,
-            "prompt": self.prompt
-        }
-
-def split_scenes(transcript_path, max_words_per_scene=20, output_dir="output", filename="scenes.json"):
+# Seconds assumed for a segment without an end time
+DEFAULT_SEGMENT_SECONDS = 5
+
+# Ways of cutting a transcript into scenes
+SCENE_MODES = ("words", "semantic")
+
+def _transcript_items(transcript, key):
+    """
+    Iterate over a top-level array of a transcript dict or transcript file.
+    
+    Files are parsed one element at a time. Raises KeyError if the key is
+    missing; for files the first element is read here so that the error is
+    raised by this call rather than on iteration.
+    """
+    if isinstance(transcript, dict):
+        return iter(transcript[key])
+    items = iter_json_array(transcript, key)
+    try:
+        first = next(items)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], items)
+
+
+def _transcript_value(transcript, key):
+    """Read a top-level value of a transcript dict or file; raises KeyError if missing."""
+    if isinstance(transcript, dict):
+        return transcript[key]
+    return read_json_value(transcript, key)
+
+
+def load_segments(transcript):
+    """
+    Iterate over the transcript segments, falling back to the full text.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        
+    Returns:
+        iterator: Segment dicts with ``text``, ``start`` and ``end``
+    """
+    try:
+        return _transcript_items(transcript, "segments")
+    except KeyError:
+        pass
+    
+    logger.warning("No segments found in transcript, falling back to text")
+    # If no segments, try to use the full text
+    try:
+        text = _transcript_value(transcript, "text")
+    except KeyError:
+        raise ValueError("Invalid transcript format: no segments or text found")
+    return iter([{"text": text, "start": 0, "end": 60}])
+
+
+def iter_timed_words(transcript):
+    """
+    Yield ``(word, start, end)`` for every word of a transcript.
+    
+    Word-level timestamps are used when the transcript has them. Otherwise
+    each segment's time span is shared evenly between its words, which keeps
+    boundaries inside a segment instead of snapping them to its end.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        
+    Yields:
+        tuple: (word, start, end)
+    """
+    try:
+        words = _transcript_items(transcript, "words")
+        first = next(words, None)
+    except KeyError:
+        first = None
+    if first is not None:
+        for word in itertools.chain([first], words):
+            text = word.get("word", "").strip()
+            if text:
+                yield text, word.get("start", 0), word.get("end", word.get("start", 0))
+        return
+    
+    for segment in load_segments(transcript):
+        segment_words = segment.get("text", "").split()
+        # Skip empty segments
+        if not segment_words:
+            continue
+        segment_start = segment.get("start", 0)
+        segment_end = segment.get("end", segment_start + DEFAULT_SEGMENT_SECONDS)
+        step = (segment_end - segment_start) / len(segment_words)
+        for i, word in enumerate(segment_words):
+            yield word, segment_start + i * step, segment_start + (i + 1) * step
+
+
+def iter_scenes(transcript, max_words_per_scene=20):
+    """
+    Split a transcript into scenes of at most ``max_words_per_scene`` words.
+    
+    Runs in a single pass over the words and yields each scene as soon as it
+    is complete, so memory and time stay linear in transcript length. Given
+    a path, the transcript file itself is streamed too.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        max_words_per_scene (int): Maximum number of words per scene
+        
+    Yields:
+        Scene: Scenes without prompts, in transcript order
+    """
+    scene_words = []
+    scene_start = None
+    scene_end = None
+    
+    for word, start, end in iter_timed_words(transcript):
+        if len(scene_words) >= max_words_per_scene:
+            yield Scene(text=" ".join(scene_words), start_time=scene_start, end_time=scene_end)
+            scene_words = []
+        if not scene_words:
+            scene_start = start
+        scene_words.append(word)
+        scene_end = end
+    
+    # Add the last scene if there's any text left
+    if scene_words:
+        yield Scene(text=" ".join(scene_words), start_time=scene_start, end_time=scene_end)
+
+
+def chunk_transcript(transcript, max_words_per_scene=20):
+    """Return the scenes of a transcript as a list; see ``iter_scenes``."""
+    return list(iter_scenes(transcript, max_words_per_scene))
+
+
+def generate_prompt(client, text):
+    """
+    Generate an image prompt for one scene.
+    
+    Args:
+        client (openai.OpenAI): OpenAI client
+        text (str): Scene text
+        
+    Returns:
+        str: Image prompt
+    """
+    # Use GPT-4o-mini to generate image prompts
+    response = client.chat.completions.create(**build_prompt_request([text]))
+    return parse_prompt_response(response, 1)[0]
+
+
+def generate_prompt_batch(client, texts):
+    """
+    Generate image prompts for several scenes in one request.
+    
+    The model answers with a JSON array of prompts. A malformed answer, such
+    as the wrong number of prompts or truncated JSON, is retried as two
+    smaller batches until single scenes fall back to ``generate_prompt``.
+    
+    Args:
+        client (openai.OpenAI): OpenAI client
+        texts (list): Scene texts
+        
+    Returns:
+        list: One image prompt per text, in order
+    """
+    if len(texts) == 1:
+        return [generate_prompt(client, texts[0])]
+    
+    response = client.chat.completions.create(**build_prompt_request(texts))
+    try:
+        return parse_prompt_response(response, len(texts))
+    except (ValueError, TypeError) as e:
+        middle = len(texts) // 2
+        logger.warning(f"Malformed response for a batch of {len(texts)} scenes ({e}), retrying as two batches")
+        return generate_prompt_batch(client, texts[:middle]) + generate_prompt_batch(client, texts[middle:])
+
+
+def iter_topic_scenes(transcript, min_scene_seconds=5.0, max_scene_seconds=20.0):
+    """
+    Split a transcript into scenes by topic instead of word count.
+    
+    Adjacent segments are merged while their hashed TF-IDF vectors stay
+    similar; see ``semantic.segment_by_topic``. Runs fully offline.
+    
+    Args:
+        transcript (dict or str): Parsed transcript JSON, or a path to stream it from
+        min_scene_seconds (float): Shortest scene cut on a topic change
+        max_scene_seconds (float): Longest scene built from several segments
+        
+    Yields:
+        Scene: Scenes without prompts, in transcript order
+    """
+    segments = []
+    for segment in load_segments(transcript):
+        text = segment.get("text", "").strip()
+        # Skip empty segments
+        if not text:
+            continue
+        start = segment.get("start", 0)
+        segments.append({"text": text, "start": start, "end": segment.get("end", start + DEFAULT_SEGMENT_SECONDS)})
+    
+    for first, last in segment_by_topic(segments, min_scene_seconds, max_scene_seconds):
+        yield Scene(
+            text=" ".join(segment["text"] for segment in segments[first:last]),
+            start_time=segments[first]["start"],
+            end_time=segments[last - 1]["end"]
+        )
+
+
+def _generate_prompts_serially(client, scenes, batch_size, on_batch=None):
+    """
+    Fill in scene prompts one request at a time, raising on the first failure.
+    
+    ``on_batch`` is called with the scenes of each batch once their prompts are set.
+    """
+    for first in range(0, len(scenes), batch_size):
+        batch = scenes[first:first + batch_size]
+        last = first + len(batch)
+        logger.info(f"Generating prompts for scenes {first+1}-{last}/{len(scenes)}")
+        
+        try:
+            prompts = generate_prompt_batch(client, [scene.text for scene in batch])
+        except Exception as e:
+            logger.error(f"Error generating prompts for scenes {first+1}-{last}: {e}")
+            raise
+        
+        for scene, prompt in zip(batch, prompts):
+            scene.prompt = prompt
+            logger.info(f"Generated prompt: {prompt}")
+        if on_batch is not None:
+            on_batch(batch)
+
+
+def _mark_duplicates(candidates, texts, threshold, scenes=None):
+    """
+    Point near-duplicate scenes at the first similar scene and share its prompt.
+    
+    Args:
+        candidates (list): Scenes to compare, in transcript order
+        texts (list): Text of each candidate to compare by
+        threshold (float): Cosine similarity at which scenes are shared
+        scenes (list): All scenes, which ``duplicate_of`` indexes
+            (default: ``candidates``)
+    """
+    scenes = candidates if scenes is None else scenes
+    positions = {id(scene): i for i, scene in enumerate(scenes)}
+    for scene, original in zip(candidates, find_duplicates(texts, threshold)):
+        if original is not None:
+            scene.duplicate_of = positions[id(candidates[original])]
+    
+    # Resolve chains so every duplicate points at a scene that is not one
+    for scene in scenes:
+        if scene.duplicate_of is not None:
+            original = scenes[scene.duplicate_of]
+            if original.duplicate_of is not None:
+                scene.duplicate_of = original.duplicate_of
+            scene.prompt = scenes[scene.duplicate_of].prompt
+
+
+class _SceneRelease:
+    """
+    Hand scenes to a callback as soon as their prompts are settled.
+    
+    Without a dedupe threshold scenes are released in whatever order their
+    prompts complete. With one they are released in transcript order, so
+    each released prompt can be compared with the prompts released before
+    it; this marks the same prompt duplicates as ``_mark_duplicates`` does
+    on the finished list.
+    """
+    def __init__(self, scenes, on_scene=None, dedupe_threshold=None):
+        self.scenes = scenes
+        self.on_scene = on_scene
+        self.threshold = dedupe_threshold
+        self.positions = {id(scene): i for i, scene in enumerate(scenes)}
+        # Duplicates by text are settled once the scene they repeat is released
+        self.settled = [scene.duplicate_of is not None for scene in scenes]
+        self.released = 0
+        self.prompts = SimilarityIndex() if dedupe_threshold is not None else None
+    
+    def settle(self, scenes):
+        """Mark ``scenes`` as final and release every scene that can go."""
+        for scene in scenes:
+            position = self.positions[id(scene)]
+            self.settled[position] = True
+            if self.prompts is None:
+                self._emit(position)
+        if self.prompts is not None:
+            while self.released < len(self.scenes) and self.settled[self.released]:
+                self._release_in_order(self.released)
+                self.released += 1
+    
+    def _release_in_order(self, position):
+        scene = self.scenes[position]
+        if scene.duplicate_of is not None:
+            # The repeated scene was released first and may itself share a prompt now
+            original = self.scenes[scene.duplicate_of]
+            if original.duplicate_of is not None:
+                scene.duplicate_of = original.duplicate_of
+            scene.prompt = self.scenes[scene.duplicate_of].prompt
+        elif scene.prompt:
+            vector = ngram_vectors([scene.prompt])[0]
+            match, similarity = self.prompts.best_match(vector)
+            if match is not None and similarity >= self.threshold and vector.any():
+                scene.duplicate_of = match
+                scene.prompt = self.scenes[match].prompt
+            else:
+                self.prompts.add(vector, position)
+        self._emit(position)
+    
+    def _emit(self, position):
+        if self.on_scene is not None:
+            self.on_scene(position, self.scenes[position])
+
+
+def _generate_prompts(scenes, batch_size, max_concurrency, on_batch=None):
+    """
+    Fill in the prompts of ``scenes`` through the serial or concurrent path.
+    
+    ``on_batch`` is called with the scenes of each batch as soon as it finishes.
+    """
+    # Get API key from environment variable
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("OPENAI_API_KEY environment variable not set")
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    
+    if max_concurrency > 1:
+        engine = AsyncPromptEngine(api_key=api_key, max_concurrency=max_concurrency)
+        
+        def settle(outcome):
+            batch = [scenes[index] for index, _, _ in outcome]
+            for scene, (_, prompt, _) in zip(batch, outcome):
+                scene.prompt = prompt
+            if on_batch is not None:
+                on_batch(batch)
+        
+        results = engine.generate([scene.text for scene in scenes], batch_size=batch_size, on_batch=settle)
+        if len(results.failures) == len(scenes):
+            raise RuntimeError(f"Failed to generate any prompt: {results.failures[0].error}")
+        for failure in results.failures:
+            logger.warning(f"No prompt for scene {failure.index+1}: {failure.error}")
+    else:
+        # Initialize OpenAI client
+        client = openai.OpenAI(api_key=api_key)
+        _generate_prompts_serially(client, scenes, batch_size, on_batch)
+
+
+def split_scenes(transcript_path, max_words_per_scene=20, output_dir="output", filename="scenes.json",
+                 batch_size=1, max_concurrency=1, cache=None, mode="words", min_scene_seconds=5.0,
+                 max_scene_seconds=20.0, dedupe_threshold=None, prompt_index=None, on_scene=None):
     """
     Split transcript into scenes and generate image prompts.
     
+    In ``"words"`` mode scenes hold at most ``max_words_per_scene`` words and
+    their boundaries fall on word timestamps when the transcript includes
+    them (``timestamp_granularities=["segment", "word"]``) and are
+    interpolated within segments otherwise. In ``"semantic"`` mode adjacent
+    segments are merged by topic similarity into scenes of
+    ``min_scene_seconds`` to ``max_scene_seconds``, which usually means
+    fewer, more distinct scenes and fewer prompt and image requests.
+    
+    With ``batch_size`` above 1, prompts for that many scenes are requested
+    in a single call, which cuts round trips for long transcripts.
+    
+    With ``max_concurrency`` above 1, requests run concurrently through
+    ``AsyncPromptEngine`` under rate limits. A scene whose prompt still fails
+    after retries is kept with ``prompt=None`` instead of failing the run.
+    
+    With a ``cache`` (``PromptCache``) prompts are looked up by the scene
+    text and generation settings first, and only the misses are generated.
+    
+    With a ``dedupe_threshold`` scenes whose texts, or generated prompts,
+    are near-duplicates of an earlier scene share that scene's prompt and
+    image through ``Scene.duplicate_of``. A ``PromptIndex`` extends this
+    across runs: prompts of similar scenes from earlier episodes are reused.
+    
+    With ``on_scene`` every scene is handed over as ``on_scene(index, scene)``
+    as soon as its prompt is final, so a later stage can start on it while
+    the remaining prompts are generated. Scenes arrive as their prompt
+    batches complete, or in transcript order with a ``dedupe_threshold``;
+    a scene whose prompt failed arrives with ``prompt=None``. With
+    ``max_concurrency`` above 1 the callback runs on a worker thread, one
+    call at a time; if it blocks, later scenes wait for it but the prompt
+    requests in flight continue.
+    
     Args:
         transcript_path (str): Path to the transcript JSON file
         max_words_per_scene (int): Maximum number of words per scene
         output_dir (str): Directory to save the scenes
         filename (str): Name of the output scenes file
+        batch_size (int): Number of scenes per prompt request
+        max_concurrency (int): Maximum number of prompt requests in flight
+        cache (PromptCache): Optional persistent prompt cache
+        mode (str): "words" or "semantic"
+        min_scene_seconds (float): Shortest semantic scene
+        max_scene_seconds (float): Longest semantic scene
+        dedupe_threshold (float): Cosine similarity at which scenes are shared
+            (default: no deduplication)
+        prompt_index (PromptIndex): Optional index of prompts from earlier runs
+        on_scene (callable): Optional callback for each scene whose prompt is final
         
     Returns:
         list: List of Scene objects
     """
+    if mode not in SCENE_MODES:
+        raise ValueError(f"Unknown scene mode: {mode}")
+    
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, filename)
     
-    # Get API key from environment variable
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY environment variable not set")
-        raise ValueError("OPENAI_API_KEY environment variable not set")
-    
-    # Initialize OpenAI client
-    client = openai.OpenAI(api_key=api_key)
-    
     logger.info(f"Processing transcript: {transcript_path}")
     
     try:
-        # Load transcript JSON
-        with open(transcript_path, "r") as f:
-            transcript_data = json.load(f)
-        
-        # Extract segments from transcript
-        segments = []
-        if "segments" in transcript_data:
-            segments = transcript_data["segments"]
+        # Stream the transcript JSON into scenes
+        if mode == "semantic":
+            scenes = list(iter_topic_scenes(transcript_path, min_scene_seconds, max_scene_seconds))
         else:
-            logger.warning("No segments found in transcript, falling back to text")
-            # If no segments, try to use the full text
-            if "text" in transcript_data:
-                text = transcript_data["text"]
-                segments = [{"text": text, "start": 0, "end": 60}]
-            else:
-                raise ValueError("Invalid transcript format: no segments or text found")
-        
-        # Process segments into scenes
-        scenes = []
-        current_scene_text = ""
-        current_scene_start = None
-        
-        for segment in segments:
-            segment_text = segment.get("text", "").strip()
-            segment_start = segment.get("start", 0)
-            segment_end = segment.get("end", segment_start + 5)
-            
-            # Skip empty segments
-            if not segment_text:
-                continue
-            
-            # Initialize current scene if this is the first segment
-            if current_scene_start is None:
-                current_scene_start = segment_start
-            
-            # Split segment into words
-            words = segment_text.split()
-            
-            # Add words to current scene until max_words_per_scene is reached
-            for word in words:
-                if len(current_scene_text.split()) >= max_words_per_scene:
-                    # Create a new scene
-                    scene = Scene(
-                        text=current_scene_text.strip(),
-                        start_time=current_scene_start,
-                        end_time=segment_end
-                    )
-                    scenes.append(scene)
-                    
-                    # Reset current scene
-                    current_scene_text = word + " "
-                    current_scene_start = segment_start
-                else:
-                    # Add word to current scene
-                    current_scene_text += word + " "
-        
-        # Add the last scene if there's any text left
-        if current_scene_text.strip():
-            scene = Scene(
-                text=current_scene_text.strip(),
-                start_time=current_scene_start,
-                end_time=segments[-1].get("end", current_scene_start + 5)
-            )
-            scenes.append(scene)
+            scenes = chunk_transcript(transcript_path, max_words_per_scene)
         
         logger.info(f"Split transcript into {len(scenes)} scenes")
         
-        # Generate image prompts for each scene
-        for i, scene in enumerate(scenes):
-            logger.info(f"Generating prompt for scene {i+1}/{len(scenes)}")
-            
-            try:
-                # Use GPT-4o-mini to generate image prompts
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a creative visual director. Create a vivid, detailed image prompt based on the provided text from a science podcast. The prompt should be suitable for image generation and capture the essence of the scientific concept being discussed. Focus on creating a visually engaging representation that would work well in a short video reel. Use modern flat illustration style with bright colors."},
-                        {"role": "user", "content": f"Create an image prompt based on this text from a science podcast: '{scene.text}'"}
-                    ],
-                    max_tokens=100
-                )
-                
-                # Extract prompt from response
-                prompt = response.choices[0].message.content.strip()
+        if dedupe_threshold is not None:
+            _mark_duplicates(scenes, [scene.text for scene in scenes], dedupe_threshold)
+        canonical = [scene for scene in scenes if scene.duplicate_of is None]
+        release = _SceneRelease(scenes, on_scene, dedupe_threshold)
+        
+        pending = canonical
+        if cache is not None:
+            cached = cache.get_many([scene.text for scene in pending])
+            for scene in pending:
+                scene.prompt = cached.get(scene.text)
+            pending = [scene for scene in pending if scene.prompt is None]
+            logger.info(f"Prompt cache: {len(canonical) - len(pending)} hits, {len(pending)} prompts to generate")
+        
+        if prompt_index is not None and pending:
+            for scene, prompt in zip(pending, prompt_index.lookup([scene.text for scene in pending])):
                 scene.prompt = prompt
-                
-                logger.info(f"Generated prompt: {prompt}")
-                
-            except Exception as e:
-                logger.error(f"Error generating prompt for scene {i+1}: {e}")
-                raise
+            reused = [scene for scene in pending if scene.prompt is not None]
+            pending = [scene for scene in pending if scene.prompt is None]
+            logger.info(f"Reused {len(reused)} prompts of similar scenes from earlier runs")
         
-        # Save scenes to JSON file
-        with open(output_path, "w") as f:
-            json.dump([scene.to_dict() for scene in scenes], f, indent=2)
+        # Scenes answered by a cache can go to the next stage right away
+        release.settle([scene for scene in canonical if scene.prompt is not None])
+        
+        # Generate image prompts for each scene
+        try:
+            if pending:
+                _generate_prompts(pending, batch_size, max_concurrency, on_batch=release.settle)
+        finally:
+            generated = [scene for scene in pending if scene.prompt]
+            if cache is not None:
+                cache.put_many({scene.text: scene.prompt for scene in generated})
+            if prompt_index is not None and generated:
+                prompt_index.add([scene.text for scene in generated], [scene.prompt for scene in generated])
+        
+        if dedupe_threshold is not None:
+            # Scenes with the same prompt were marked as they were released
+            duplicates = sum(scene.duplicate_of is not None for scene in scenes)
+            logger.info(f"{duplicates} of {len(scenes)} scenes reuse the prompt and image of an earlier scene")
+        
+        # Save scenes to JSON file, or the binary format for a ".scenes" filename
+        write_scenes(scenes, output_path)
         
         logger.info(f"Scenes saved to {output_path}")
         return scenes
@@ -164,3 +492,26 @@ def split_scenes(transcript_path, max_words_per_scene=20, output_dir="output", f
     except Exception as e:
         logger.error(f"Error processing transcript: {e}")
         raise
+
+
+def iter_split_scenes(transcript_path, queue_size=DEFAULT_QUEUE_SIZE, **kwargs):
+    """
+    Run ``split_scenes`` on a background thread and yield scenes as their prompts complete.
+    
+    Scenes pass through a queue of ``queue_size`` entries; when the consumer
+    falls behind, scenes wait for it off the prompt event loop. The
+    scenes file is still written once every prompt is done, and errors of
+    ``split_scenes`` are raised to the consumer.
+    
+    Args:
+        transcript_path (str): Path to the transcript JSON file
+        queue_size (int): Largest number of scenes waiting for the consumer
+        **kwargs: Further arguments of ``split_scenes``
+        
+    Yields:
+        tuple: ``(index, scene)`` for every scene, in release order
+    """
+    def produce(emit):
+        split_scenes(transcript_path, on_scene=lambda index, scene: emit((index, scene)), **kwargs)
+    
+    return iter_stage(produce, queue_size)
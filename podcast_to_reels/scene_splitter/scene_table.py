@@ -0,0 +1,232 @@
+"""
+Columnar scene storage with a compact, memory-mappable binary format.
+"""
+
+import os
+import uuid
+import struct
+import logging
+import numpy as np
+
+from podcast_to_reels.utils.jsonstream import iter_json_array, write_json_array
+from .scene import Scene
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAGIC = b"P2RSCN\x00\x01"
+# Magic, scene count, text bytes, prompt bytes
+HEADER = struct.Struct("<8sQQQ")
+
+# duplicate_of value stored for scenes that are not duplicates
+NO_DUPLICATE = -1
+
+
+class SceneTable:
+    """
+    Scenes stored as parallel NumPy arrays instead of one object per scene.
+
+    Start and end times, ``duplicate_of`` and the offsets of each scene's
+    text and prompt live in fixed-width arrays; the texts and prompts
+    themselves are two UTF-8 byte blobs. Rows are turned into ``Scene``
+    objects only when indexed. A table loaded with ``load(mmap=True)``
+    reads the arrays straight from the page cache.
+    """
+    def __init__(self, start_times, end_times, duplicate_of, text_offsets, text_blob, prompt_offsets,
+                 prompt_blob, has_prompt):
+        self.start_times = start_times
+        self.end_times = end_times
+        self.duplicate_of = duplicate_of
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.prompt_offsets = prompt_offsets
+        self.prompt_blob = prompt_blob
+        self.has_prompt = has_prompt
+
+    @classmethod
+    def from_scenes(cls, scenes):
+        """Build a table from an iterable of ``Scene`` objects."""
+        starts = []
+        ends = []
+        duplicates = []
+        texts = []
+        prompts = []
+        flags = []
+        for scene in scenes:
+            starts.append(scene.start_time)
+            ends.append(scene.end_time)
+            duplicates.append(NO_DUPLICATE if scene.duplicate_of is None else scene.duplicate_of)
+            texts.append(scene.text.encode("utf-8"))
+            prompts.append((scene.prompt or "").encode("utf-8"))
+            flags.append(scene.prompt is not None)
+
+        return cls(
+            np.asarray(starts, dtype=np.float64),
+            np.asarray(ends, dtype=np.float64),
+            np.asarray(duplicates, dtype=np.int64),
+            _offsets(texts),
+            b"".join(texts),
+            _offsets(prompts),
+            b"".join(prompts),
+            np.asarray(flags, dtype=np.bool_)
+        )
+
+    def __len__(self):
+        return len(self.start_times)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("scene index out of range")
+        duplicate_of = int(self.duplicate_of[index])
+        return Scene(
+            text=self.text(index),
+            start_time=float(self.start_times[index]),
+            end_time=float(self.end_times[index]),
+            prompt=self.prompt(index),
+            duplicate_of=None if duplicate_of == NO_DUPLICATE else duplicate_of
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def text(self, index):
+        """Decode the text of one scene."""
+        return bytes(self.text_blob[self.text_offsets[index]:self.text_offsets[index + 1]]).decode("utf-8")
+
+    def prompt(self, index):
+        """Decode the prompt of one scene, or None if it has none."""
+        if not self.has_prompt[index]:
+            return None
+        return bytes(self.prompt_blob[self.prompt_offsets[index]:self.prompt_offsets[index + 1]]).decode("utf-8")
+
+    @property
+    def durations(self):
+        return self.end_times - self.start_times
+
+    def save(self, path):
+        """
+        Write the table in the binary scene format.
+
+        Layout: header, then the start, end, duplicate, text offset, prompt
+        offset and prompt flag arrays, then the text and prompt blobs. Every
+        array starts on an 8-byte boundary so it can be memory-mapped.
+        """
+        temp_path = os.path.join(os.path.dirname(path) or ".", f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, len(self), len(self.text_blob), len(self.prompt_blob)))
+                for array in self._arrays():
+                    f.write(np.ascontiguousarray(array).tobytes())
+                    f.write(b"\0" * (-array.nbytes % 8))
+                f.write(bytes(self.text_blob))
+                f.write(bytes(self.prompt_blob))
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Read a table written by ``save``.
+
+        Args:
+            path (str): Binary scene file
+            mmap (bool): Map the file instead of reading it into memory
+
+        Returns:
+            SceneTable: The scenes
+        """
+        with open(path, "rb") as f:
+            magic, count, text_bytes, prompt_bytes = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a scene table file: {path}")
+
+        data = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+        offset = HEADER.size
+        arrays = []
+        for dtype, length in cls._layout(count):
+            nbytes = np.dtype(dtype).itemsize * length
+            arrays.append(data[offset:offset + nbytes].view(dtype))
+            offset += nbytes + (-nbytes % 8)
+        text_blob = data[offset:offset + text_bytes]
+        prompt_blob = data[offset + text_bytes:offset + text_bytes + prompt_bytes]
+
+        start_times, end_times, duplicate_of, text_offsets, prompt_offsets, has_prompt = arrays
+        return cls(start_times, end_times, duplicate_of, text_offsets, text_blob, prompt_offsets, prompt_blob,
+                   has_prompt)
+
+    def _arrays(self):
+        return (self.start_times, self.end_times, self.duplicate_of, self.text_offsets, self.prompt_offsets,
+                self.has_prompt)
+
+    @staticmethod
+    def _layout(count):
+        """dtype and length of each array, in file order."""
+        return (
+            (np.float64, count),
+            (np.float64, count),
+            (np.int64, count),
+            (np.int64, count + 1),
+            (np.int64, count + 1),
+            (np.bool_, count)
+        )
+
+
+def _offsets(chunks):
+    """Start offsets of byte strings laid end to end, plus the total length."""
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+    return offsets
+
+
+def write_scenes(scenes, path):
+    """
+    Write scenes as a JSON array, or in the binary format if ``path`` ends in ``.scenes``.
+
+    Args:
+        scenes (iterable): Scene objects or a SceneTable
+        path (str): Output path
+
+    Returns:
+        str: Path written
+    """
+    if path.endswith(".scenes"):
+        table = scenes if isinstance(scenes, SceneTable) else SceneTable.from_scenes(scenes)
+        table.save(path)
+    else:
+        write_json_array(path, (scene.to_dict() for scene in scenes))
+    return path
+
+
+def read_scenes(path, mmap=True):
+    """
+    Read a scenes file in either format.
+
+    JSON files are parsed one scene at a time; binary files are mapped.
+
+    Args:
+        path (str): Scenes file written by ``split_scenes`` or ``write_scenes``
+        mmap (bool): Memory-map binary files
+
+    Returns:
+        SceneTable: The scenes
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return SceneTable.load(path, mmap=mmap)
+    return SceneTable.from_scenes(
+        Scene(
+            text=item["text"],
+            start_time=item["start_time"],
+            end_time=item["end_time"],
+            prompt=item.get("prompt"),
+            duplicate_of=item.get("duplicate_of")
+        )
+        for item in iter_json_array(path)
+    )
@@ -0,0 +1,144 @@
+"""
+Offline topic-based scene segmentation using hashed TF-IDF vectors.
+"""
+
+import re
+import zlib
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Size of the hashed vocabulary; collisions only blur similarity slightly
+HASH_FEATURES = 2048
+
+# Segments on each side of a gap compared when scoring it
+CONTEXT_SEGMENTS = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset(
+    "a about after all also an and any are as at be because been but by can could did do does "
+    "for from get got had has have he her here him his how i if in into is it its just know like "
+    "me more my no not now of on one or our out really right she so some than that the their them "
+    "then there these they this to too um uh up us very was we well were what when where which "
+    "who will with would yeah yes you your".split()
+)
+
+
+def tokenize(text):
+    """Lower-case word tokens of ``text`` without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def hashed_tfidf(texts, n_features=HASH_FEATURES):
+    """
+    Build L2-normalised TF-IDF vectors with the hashing trick.
+
+    Tokens are hashed with CRC32 so vectors are stable across processes and
+    no vocabulary has to be fitted or stored.
+
+    Args:
+        texts (list): Documents to vectorise
+        n_features (int): Number of hashed features
+
+    Returns:
+        numpy.ndarray: ``(len(texts), n_features)`` float32 matrix
+    """
+    rows = []
+    cols = []
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        rows.extend([row] * len(tokens))
+        cols.extend(zlib.crc32(token.encode("utf-8")) % n_features for token in tokens)
+
+    counts = np.zeros((len(texts), n_features), dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    vectors = np.log1p(counts) * idf.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def gap_similarities(vectors, context=CONTEXT_SEGMENTS):
+    """
+    Cosine similarity across every gap between consecutive segments.
+
+    The gap after segment ``i`` compares the summed vectors of up to
+    ``context`` segments before it with up to ``context`` segments after it,
+    which smooths over short asides. Block sums come from one cumulative sum,
+    so the whole pass is vectorised.
+
+    Args:
+        vectors (numpy.ndarray): Row vectors from ``hashed_tfidf``
+        context (int): Segments on each side of a gap
+
+    Returns:
+        numpy.ndarray: ``len(vectors) - 1`` similarities in [0, 1]
+    """
+    count = len(vectors)
+    if count < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    cumulative = np.concatenate((np.zeros((1, vectors.shape[1]), dtype=vectors.dtype), np.cumsum(vectors, axis=0)))
+    gaps = np.arange(1, count)
+    left = cumulative[gaps] - cumulative[np.maximum(gaps - context, 0)]
+    right = cumulative[np.minimum(gaps + context, count)] - cumulative[gaps]
+
+    dot = np.einsum("ij,ij->i", left, right)
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    return np.where(norms == 0, 0, dot / np.where(norms == 0, 1, norms))
+
+
+def segment_by_topic(segments, min_seconds=5.0, max_seconds=20.0, threshold=None, context=CONTEXT_SEGMENTS):
+    """
+    Merge adjacent transcript segments into scenes that each cover one topic.
+
+    A scene is cut at a gap whose similarity is below ``threshold`` once it
+    is at least ``min_seconds`` long, and always before it would grow past
+    ``max_seconds``. A segment longer than ``max_seconds`` becomes a scene of
+    its own. A short final scene is merged into the one before it when
+    the result stays within ``max_seconds``.
+
+    Args:
+        segments (list): Transcript segments with ``text``, ``start`` and ``end``
+        min_seconds (float): Shortest scene cut on a topic change
+        max_seconds (float): Longest scene built from several segments
+        threshold (float): Similarity below which a gap is a topic change
+            (default: mean minus half a standard deviation of all gaps)
+        context (int): Segments on each side of a gap
+
+    Returns:
+        list: ``(start_index, end_index)`` ranges of segments, end exclusive
+    """
+    if not segments:
+        return []
+
+    similarities = gap_similarities(hashed_tfidf([segment["text"] for segment in segments]), context)
+    if threshold is None:
+        threshold = float(similarities.mean() - similarities.std() / 2) if len(similarities) else 0.0
+
+    starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+    ends = np.array([segment["end"] for segment in segments], dtype=np.float64)
+
+    ranges = []
+    first = 0
+    for gap, similarity in enumerate(similarities):
+        following = gap + 1
+        duration = ends[gap] - starts[first]
+        if ends[following] - starts[first] > max_seconds or (duration >= min_seconds and similarity < threshold):
+            ranges.append((first, following))
+            first = following
+    ranges.append((first, len(segments)))
+
+    if (len(ranges) > 1 and ends[-1] - starts[ranges[-1][0]] < min_seconds
+            and ends[-1] - starts[ranges[-2][0]] <= max_seconds):
+        tail = ranges.pop()
+        ranges[-1] = (ranges[-1][0], tail[1])
+
+    logger.info(f"Merged {len(segments)} segments into {len(ranges)} topic scenes (threshold {threshold:.2f})")
+    return ranges
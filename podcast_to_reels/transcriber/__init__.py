@@ -3,5 +3,22 @@ Transcriber module for converting audio to text using OpenAI Whisper API.
 """
 
 from .transcriber import transcribe_audio
+from .preprocess import preprocess_audio, PreprocessResult
+from .backends import (
+    TranscriptionBackend,
+    OpenAIBackend,
+    LocalWhisperBackend,
+    FakeBackend,
+    get_backend
+)
 
-__all__ = ["transcribe_audio"]
+__all__ = [
+    "transcribe_audio",
+    "preprocess_audio",
+    "PreprocessResult",
+    "TranscriptionBackend",
+    "OpenAIBackend",
+    "LocalWhisperBackend",
+    "FakeBackend",
+    "get_backend"
+]
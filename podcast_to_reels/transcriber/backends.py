@@ -0,0 +1,297 @@
+"""
+Transcription backends that all emit the same ``verbose_json``-shaped transcript.
+"""
+
+import os
+import time
+import random
+import hashlib
+import logging
+import threading
+import subprocess
+import openai
+
+from podcast_to_reels.utils.audio import audio_duration
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def make_segment(segment_id, start, end, text):
+    """Build a transcript segment in the shared schema."""
+    return {"id": segment_id, "start": float(start), "end": float(end), "text": text}
+
+
+def make_transcript(segments, words=None, language=None, duration=None):
+    """
+    Build a transcript in the shared schema.
+
+    Args:
+        segments (list): Segments built with ``make_segment``
+        words (list): Optional word dicts with ``word``, ``start`` and ``end``
+        language (str): Detected language
+        duration (float): Length of the audio in seconds
+
+    Returns:
+        dict: Transcript with ``text``, ``segments`` and optional metadata
+    """
+    transcript = {
+        "text": " ".join(segment["text"].strip() for segment in segments).strip(),
+        "segments": segments
+    }
+    if language:
+        transcript["language"] = language
+    if duration is not None:
+        transcript["duration"] = float(duration)
+    if words:
+        transcript["words"] = words
+    return transcript
+
+
+class TranscriptionBackend:
+    """
+    Base class for transcription engines.
+
+    Subclasses implement ``transcribe`` and return a transcript built with
+    ``make_transcript``, so the rest of the pipeline never depends on which
+    engine produced it.
+    """
+    name = "base"
+    # Largest file a single request may carry, or None for no limit
+    max_upload_mb = None
+
+    def transcribe(self, audio_path):
+        """
+        Transcribe one audio file.
+
+        Args:
+            audio_path (str): Path to the audio file
+
+        Returns:
+            dict: Transcript in the shared schema
+        """
+        raise NotImplementedError
+
+    def prepare(self):
+        """Check configuration before any audio is processed."""
+
+    def cache_identity(self):
+        """Return everything about this backend that changes its output."""
+        return {"backend": self.name}
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """Transcription through the OpenAI audio API."""
+    name = "openai"
+    max_upload_mb = 25
+
+    def __init__(self, api_key=None, model="gpt-4o-transcribe", timestamp_granularities=("segment",)):
+        self.api_key = api_key
+        self.model = model
+        self.timestamp_granularities = list(timestamp_granularities)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use so cache hits need no API key."""
+        with self._lock:
+            if self._client is None:
+                api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    logger.error("OPENAI_API_KEY environment variable not set")
+                    raise ValueError("OPENAI_API_KEY environment variable not set")
+                self._client = openai.OpenAI(api_key=api_key)
+            return self._client
+
+    def prepare(self):
+        self.client
+
+    def transcribe(self, audio_path):
+        with open(audio_path, "rb") as audio_file:
+            response = self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                response_format="verbose_json",
+                timestamp_granularities=self.timestamp_granularities
+            )
+
+        data = response.to_dict() if hasattr(response, 'to_dict') else response
+        segments = [
+            make_segment(i, segment.get("start", 0), segment.get("end", segment.get("start", 0)),
+                         segment.get("text", ""))
+            for i, segment in enumerate(data.get("segments") or [])
+        ]
+        if not segments and data.get("text"):
+            segments = [make_segment(0, 0, data.get("duration") or 0, data["text"])]
+        words = [
+            {"word": word.get("word", ""), "start": float(word.get("start", 0)), "end": float(word.get("end", 0))}
+            for word in data.get("words") or []
+        ]
+        return make_transcript(segments, words, data.get("language"), data.get("duration"))
+
+    def cache_identity(self):
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "response_format": "verbose_json",
+            "timestamp_granularities": self.timestamp_granularities
+        }
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Offline transcription on local CPU cores with faster-whisper.
+
+    The model runs through CTranslate2 with int8 weights by default, and
+    decoding uses all available cores unless ``cpu_threads`` says otherwise.
+    Requires the optional ``faster-whisper`` package.
+    """
+    name = "local"
+
+    def __init__(self, model_size="small", device="cpu", compute_type="int8", cpu_threads=None,
+                 num_workers=1, beam_size=1, word_timestamps=False, language=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "The local transcription backend requires faster-whisper: pip install faster-whisper"
+            ) from e
+
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.word_timestamps = word_timestamps
+        self.language = language
+        self.model = WhisperModel(
+            model_size,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads or os.cpu_count() or 1,
+            num_workers=num_workers
+        )
+
+    def transcribe(self, audio_path):
+        segments_iter, info = self.model.transcribe(
+            audio_path,
+            beam_size=self.beam_size,
+            word_timestamps=self.word_timestamps,
+            language=self.language
+        )
+
+        segments = []
+        words = []
+        for segment in segments_iter:
+            segments.append(make_segment(len(segments), segment.start, segment.end, segment.text.strip()))
+            for word in segment.words or []:
+                words.append({"word": word.word.strip(), "start": float(word.start), "end": float(word.end)})
+        return make_transcript(segments, words, info.language, info.duration)
+
+    def cache_identity(self):
+        return {
+            "backend": self.name,
+            "model": self.model_size,
+            "compute_type": self.compute_type,
+            "beam_size": self.beam_size,
+            "word_timestamps": self.word_timestamps,
+            "language": self.language
+        }
+
+
+class FakeBackend(TranscriptionBackend):
+    """
+    Deterministic offline backend for tests and benchmarks.
+
+    The transcript is generated from a hash of the audio bytes, so the same
+    file always yields the same text and timestamps. It spans ``duration``
+    seconds if given, otherwise the length of the audio as reported by
+    ffprobe, so scenes line up with the audio they are composed with. Only if
+    the file cannot be probed is the length estimated from its size at
+    ``bytes_per_second``. ``latency`` simulates a network round trip per
+    request.
+    """
+    name = "fake"
+
+    VOCABULARY = (
+        "the universe is expanding faster than we expected and dark energy may explain why "
+        "neurons fire in patterns that look like waves across the cortex while we sleep "
+        "quantum computers use superposition to explore many answers at once "
+        "coral reefs recover when water temperatures fall and fish return to graze"
+    ).split()
+
+    def __init__(self, seconds_per_segment=5.0, words_per_second=2.5, bytes_per_second=16000,
+                 latency=0.0, max_upload_mb=None, duration=None):
+        self.seconds_per_segment = seconds_per_segment
+        self.words_per_second = words_per_second
+        self.bytes_per_second = bytes_per_second
+        self.latency = latency
+        self.max_upload_mb = max_upload_mb
+        self.duration = duration
+
+    def _duration(self, audio_path):
+        """Seconds of audio the transcript should cover."""
+        if self.duration is not None:
+            return self.duration
+        try:
+            return audio_duration(audio_path)
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            logger.warning(f"Could not read the duration of {audio_path} ({e}), estimating it from the file size")
+            return os.path.getsize(audio_path) / self.bytes_per_second
+
+    def transcribe(self, audio_path):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with open(audio_path, "rb") as f:
+            seed = hashlib.file_digest(f, "sha256").digest()
+        rng = random.Random(seed)
+        duration = max(self.seconds_per_segment, self._duration(audio_path))
+
+        segments = []
+        words = []
+        start = 0.0
+        while start < duration:
+            end = min(duration, start + self.seconds_per_segment)
+            count = max(1, int((end - start) * self.words_per_second))
+            step = (end - start) / count
+            segment_words = [rng.choice(self.VOCABULARY) for _ in range(count)]
+            for i, word in enumerate(segment_words):
+                words.append({"word": word, "start": start + i * step, "end": start + (i + 1) * step})
+            segments.append(make_segment(len(segments), start, end, " ".join(segment_words)))
+            start = end
+        return make_transcript(segments, words, "english", duration)
+
+    def cache_identity(self):
+        return {
+            "backend": self.name,
+            "seconds_per_segment": self.seconds_per_segment,
+            "words_per_second": self.words_per_second,
+            "bytes_per_second": self.bytes_per_second,
+            "duration": self.duration
+        }
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalWhisperBackend,
+    "fake": FakeBackend
+}
+
+
+def get_backend(name, **kwargs):
+    """
+    Create a transcription backend by name.
+
+    Args:
+        name (str): One of ``BACKENDS``
+        **kwargs: Arguments for the backend constructor
+
+    Returns:
+        TranscriptionBackend: The backend instance
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return backend_class(**kwargs)
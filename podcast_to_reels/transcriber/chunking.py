@@ -0,0 +1,214 @@
+"""
+Chunked transcription helpers: split audio at quiet points and stitch the results.
+"""
+
+import os
+import re
+import subprocess
+import logging
+import numpy as np
+
+from podcast_to_reels.utils.audio import stream_frame_energy, ANALYSIS_SAMPLE_RATE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Length of the analysis frames used to find quiet split points
+FRAME_SECONDS = 0.02
+
+# Longest run of repeated words removed where two chunks overlap
+MAX_OVERLAP_WORDS = 30
+
+
+class AudioChunk:
+    """Class to represent one chunk of a longer audio file."""
+    def __init__(self, start, end, own_start, own_end, path=None):
+        # Span of audio sent for transcription, including the overlap
+        self.start = start
+        self.end = end
+        # Span this chunk is authoritative for when stitching
+        self.own_start = own_start
+        self.own_end = own_end
+        self.path = path
+
+
+def find_split_points(energy, total_seconds, target_seconds, search_seconds=10.0, frame_seconds=FRAME_SECONDS):
+    """
+    Choose split points at the quietest frame before each target length.
+
+    Args:
+        energy (numpy.ndarray): RMS energy per frame
+        total_seconds (float): Length of the audio in seconds
+        target_seconds (float): Maximum length of a chunk in seconds
+        search_seconds (float): How far before the target to look for a quiet frame
+        frame_seconds (float): Length of each energy frame in seconds
+
+    Returns:
+        list: Split points in seconds, excluding 0 and the end of the audio
+    """
+    splits = []
+    position = 0.0
+    search_seconds = min(search_seconds, target_seconds / 2)
+    while total_seconds - position > target_seconds:
+        window_end = position + target_seconds
+        first = int((window_end - search_seconds) / frame_seconds)
+        last = max(first + 1, int(round(window_end / frame_seconds)) + 1)
+        window = energy[first:last]
+        if len(window):
+            # Take the quietest frame closest to the target so chunks stay long
+            split = (first + len(window) - 1 - int(np.argmin(window[::-1]))) * frame_seconds
+        else:
+            split = window_end
+        splits.append(split)
+        position = split
+    return splits
+
+
+def plan_chunks(audio_path, max_chunk_bytes, overlap=2.0, max_chunk_seconds=None):
+    """
+    Plan overlapping chunks that each stay under a byte limit.
+
+    The chunk length is derived from the file's average bitrate, and every cut
+    is moved to the quietest point shortly before that length so words are
+    rarely split. The audio is decoded as a stream and only its frame
+    energies are kept, so long episodes are not held in memory.
+
+    Args:
+        audio_path (str): Path to the audio file
+        max_chunk_bytes (int): Maximum size of an extracted chunk
+        overlap (float): Seconds of audio shared by neighbouring chunks
+        max_chunk_seconds (float): Optional cap on chunk length
+
+    Returns:
+        list: AudioChunk objects in timeline order
+    """
+    energy, sample_count = stream_frame_energy(audio_path, frame_seconds=FRAME_SECONDS)
+    total_seconds = sample_count / ANALYSIS_SAMPLE_RATE
+    if total_seconds == 0:
+        raise ValueError(f"Audio file contains no samples: {audio_path}")
+
+    bytes_per_second = os.path.getsize(audio_path) / total_seconds
+    # Leave 10% headroom for container overhead and bitrate variation
+    target_seconds = 0.9 * max_chunk_bytes / bytes_per_second - 2 * overlap
+    if max_chunk_seconds is not None:
+        target_seconds = min(target_seconds, max_chunk_seconds)
+    if target_seconds <= 0:
+        raise ValueError("Chunk size limit is too small for the audio bitrate")
+
+    bounds = [0.0] + find_split_points(energy, total_seconds, target_seconds) + [total_seconds]
+
+    chunks = []
+    for own_start, own_end in zip(bounds, bounds[1:]):
+        chunks.append(AudioChunk(
+            start=max(0.0, own_start - overlap),
+            end=min(total_seconds, own_end + overlap),
+            own_start=own_start,
+            own_end=own_end
+        ))
+    logger.info(f"Planned {len(chunks)} chunks for {total_seconds:.1f}s of audio")
+    return chunks
+
+
+def extract_chunk(audio_path, chunk, output_dir):
+    """
+    Copy a chunk's span of audio into its own file without re-encoding.
+
+    Args:
+        audio_path (str): Path to the source audio file
+        chunk (AudioChunk): Chunk to extract; its ``path`` is set
+        output_dir (str): Directory to write the chunk to
+
+    Returns:
+        str: Path to the extracted chunk
+    """
+    ext = os.path.splitext(audio_path)[1]
+    chunk.path = os.path.join(output_dir, f"chunk_{chunk.start:010.3f}{ext}")
+    extract_cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-ss", str(chunk.start),
+        "-i", audio_path,
+        "-t", str(chunk.end - chunk.start),
+        "-vn", "-c:a", "copy",
+        "-y", chunk.path
+    ]
+    subprocess.run(extract_cmd, check=True)
+    return chunk.path
+
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _dedupe_overlap(previous_text, text):
+    """Drop the leading words of ``text`` that repeat the end of ``previous_text``."""
+    previous = [_normalize_word(w) for w in previous_text.split()][-MAX_OVERLAP_WORDS:]
+    words = text.split()
+    current = [_normalize_word(w) for w in words[:MAX_OVERLAP_WORDS]]
+    for size in range(min(len(previous), len(current)), 0, -1):
+        if previous[-size:] == current[:size]:
+            return " ".join(words[size:])
+    return text
+
+
+def _owned(item, chunk, last):
+    midpoint = (item["start"] + item["end"]) / 2
+    return chunk.own_start <= midpoint and (last or midpoint < chunk.own_end)
+
+
+def stitch_transcripts(chunks, transcripts):
+    """
+    Merge per-chunk transcripts into one ``verbose_json``-shaped transcript.
+
+    Segment and word timestamps are shifted back onto the source timeline.
+    Where chunks overlap, each segment is kept by the chunk whose own span
+    contains its midpoint, and words repeated across the cut are removed.
+
+    Args:
+        chunks (list): AudioChunk objects in timeline order
+        transcripts (list): Transcript dicts, one per chunk
+
+    Returns:
+        dict: Transcript with ``text``, ``segments``, ``duration`` and, when
+        available, ``language`` and ``words``
+    """
+    segments = []
+    words = []
+    language = None
+    for index, (chunk, transcript) in enumerate(zip(chunks, transcripts)):
+        last = index == len(chunks) - 1
+        language = language or transcript.get("language")
+
+        for segment in transcript.get("segments") or []:
+            shifted = dict(segment)
+            shifted["start"] = segment.get("start", 0) + chunk.start
+            shifted["end"] = segment.get("end", segment.get("start", 0)) + chunk.start
+            if not _owned(shifted, chunk, last):
+                continue
+            text = shifted.get("text", "").strip()
+            # Only segments that begin inside the overlap can repeat earlier text
+            if segments and shifted["start"] < 2 * chunk.own_start - chunk.start:
+                text = _dedupe_overlap(segments[-1]["text"], text)
+            if not text:
+                continue
+            shifted["text"] = text
+            shifted["id"] = len(segments)
+            segments.append(shifted)
+
+        for word in transcript.get("words") or []:
+            shifted = dict(word)
+            shifted["start"] = word.get("start", 0) + chunk.start
+            shifted["end"] = word.get("end", word.get("start", 0)) + chunk.start
+            if _owned(shifted, chunk, last):
+                words.append(shifted)
+
+    stitched = {
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "duration": chunks[-1].own_end if chunks else 0.0
+    }
+    if language:
+        stitched["language"] = language
+    if words:
+        stitched["words"] = words
+    return stitched
@@ -4,11 +4,19 @@ Transcriber module for converting audio to text using OpenAI Whisper API.
 
 import os
 import json
+import shutil
 import logging
+import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import openai
 from dotenv import load_dotenv
 
+from podcast_to_reels.utils.cache import make_key, hash_file
+from .backends import OpenAIBackend
+from .chunking import plan_chunks, extract_chunk, stitch_transcripts
+from .vad import strip_silence, remap_transcript
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -16,14 +24,82 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def transcribe_audio(audio_path, output_dir="output", filename="transcript.json"):
+def transcript_cache_key(audio_path, backend, options):
     """
-    Transcribe audio file using OpenAI Whisper API.
+    Build the cache key of a transcript.
+    
+    Args:
+        audio_path (str): Path to the audio file, hashed by content
+        backend (TranscriptionBackend): Backend that produces the transcript
+        options (dict): Everything else that changes the transcript
+        
+    Returns:
+        str: Cache key
+    """
+    return make_key("transcript", hash_file(audio_path), backend.cache_identity(), options)
+
+
+def _transcribe_chunked(backend, audio_path, max_chunk_mb, chunk_overlap, max_chunk_seconds, max_workers):
+    """
+    Transcribe an audio file as overlapping chunks sent concurrently.
+    
+    Returns:
+        dict: Stitched transcript on the timeline of the source file
+    """
+    chunks = plan_chunks(
+        audio_path,
+        max_chunk_bytes=int(max_chunk_mb * 1024 * 1024),
+        overlap=chunk_overlap,
+        max_chunk_seconds=max_chunk_seconds
+    )
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for chunk in chunks:
+            extract_chunk(audio_path, chunk, temp_dir)
+        
+        logger.info(f"Transcribing {len(chunks)} chunks with the {backend.name} backend")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            transcripts = list(executor.map(lambda chunk: backend.transcribe(chunk.path), chunks))
+    
+    return stitch_transcripts(chunks, transcripts)
+
+
+def transcribe_audio(audio_path, output_dir="output", filename="transcript.json", chunked=False,
+                     max_chunk_mb=24, chunk_overlap=2.0, max_chunk_seconds=300, max_workers=4, cache=None,
+                     backend=None, vad=False, vad_min_silence=0.6):
+    """
+    Transcribe audio file using OpenAI Whisper API or another transcription backend.
+    
+    Every backend emits the same transcript schema: ``text``, ``segments``
+    with ``id``/``start``/``end``/``text`` and, when available, ``language``,
+    ``duration`` and ``words``.
+    
+    In chunked mode the audio is split at low-energy points into overlapping
+    chunks that stay under the upload limit. The chunks are transcribed
+    concurrently and stitched back into a single transcript with timestamps on
+    the original timeline, so files over 25 MB can be transcribed too.
+    
+    With a ``cache`` the transcript is looked up by a hash of the audio
+    bytes, the backend and model, and the request options; a hit skips the
+    backend entirely.
+    
+    With ``vad`` enabled, spans without speech are cut out before upload
+    and the returned timestamps are mapped back onto the original audio, so
+    scenes and video stay in sync with the untouched file.
     
     Args:
         audio_path (str): Path to the audio file
         output_dir (str): Directory to save the transcript
         filename (str): Name of the output transcript file
+        chunked (bool): Split the audio and transcribe the chunks concurrently
+        max_chunk_mb (float): Maximum size of each chunk in megabytes
+        chunk_overlap (float): Seconds of audio shared by neighbouring chunks
+        max_chunk_seconds (float): Maximum length of each chunk in seconds
+        max_workers (int): Maximum number of concurrent API requests
+        cache (FileCache): Optional persistent transcript cache
+        backend (TranscriptionBackend): Engine to use (default: OpenAIBackend)
+        vad (bool): Strip silence before transcription
+        vad_min_silence (float): Shortest silence in seconds that VAD removes
         
     Returns:
         str: Path to the transcript file
@@ -32,14 +108,27 @@ def transcribe_audio(audio_path, output_dir="output", filename="transcript.json"
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, filename)
     
-    # Get API key from environment variable
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY environment variable not set")
-        raise ValueError("OPENAI_API_KEY environment variable not set")
+    if backend is None:
+        backend = OpenAIBackend()
+    
+    cache_key = None
+    if cache is not None:
+        if not os.path.isfile(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        options = {"chunked": chunked}
+        if chunked:
+            options.update(max_chunk_mb=max_chunk_mb, chunk_overlap=chunk_overlap, max_chunk_seconds=max_chunk_seconds)
+        if vad:
+            options.update(vad=True, vad_min_silence=vad_min_silence)
+        cache_key = transcript_cache_key(audio_path, backend, options)
+        cached_path = cache.get(cache_key, ".json")
+        if cached_path is not None:
+            shutil.copyfile(cached_path, output_path)
+            logger.info(f"Transcript cache hit for {audio_path}, saved to {output_path}")
+            return output_path
     
-    # Initialize OpenAI client
-    client = openai.OpenAI(api_key=api_key)
+    # Fail fast on missing configuration such as an API key
+    backend.prepare()
     
     logger.info(f"Transcribing audio file: {audio_path}")
     
@@ -48,33 +137,41 @@ def transcribe_audio(audio_path, output_dir="output", filename="transcript.json"
         if not os.path.isfile(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
-        # Check file size to ensure it's within Whisper API limits (25MB)
-        file_size_mb = os.path.getsize(audio_path) / (1024 * 1024)
-        if file_size_mb > 25:
-            logger.error(f"Audio file size ({file_size_mb:.2f} MB) exceeds Whisper API limit of 25 MB")
-            raise ValueError(f"Audio file size ({file_size_mb:.2f} MB) exceeds Whisper API limit of 25 MB")
-        
-        # Open the audio file
-        with open(audio_path, "rb") as audio_file:
-            # Call the Whisper API
-            logger.info("Sending audio to OpenAI Whisper API")
-            response = client.audio.transcriptions.create(
-                model="gpt-4o-transcribe",
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["segment"]
-            )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            offset_map = None
+            upload_path = audio_path
+            if vad:
+                upload_path, offset_map = strip_silence(audio_path, temp_dir, min_silence=vad_min_silence)
+            
+            # Check file size to ensure it's within the backend's upload limit (25MB for Whisper API)
+            file_size_mb = os.path.getsize(upload_path) / (1024 * 1024)
+            upload_limit = backend.max_upload_mb
+            if chunked:
+                chunk_mb = min(max_chunk_mb, upload_limit) if upload_limit else max_chunk_mb
+                transcript_data = _transcribe_chunked(
+                    backend, upload_path, chunk_mb, chunk_overlap, max_chunk_seconds, max_workers
+                )
+            else:
+                if upload_limit and file_size_mb > upload_limit:
+                    logger.error(f"Audio file size ({file_size_mb:.2f} MB) exceeds {backend.name} limit of {upload_limit} MB")
+                    raise ValueError(
+                        f"Audio file size ({file_size_mb:.2f} MB) exceeds {backend.name} limit of {upload_limit} MB; "
+                        "use chunked=True to split it"
+                    )
+                
+                logger.info(f"Transcribing with the {backend.name} backend")
+                transcript_data = backend.transcribe(upload_path)
         
-        # Process the response
-        if hasattr(response, 'to_dict'):
-            transcript_data = response.to_dict()
-        else:
-            transcript_data = response
+        if offset_map is not None:
+            transcript_data = remap_transcript(transcript_data, offset_map)
         
         # Save the transcript to a JSON file
         with open(output_path, "w") as f:
             json.dump(transcript_data, f, indent=2)
         
+        if cache_key is not None:
+            cache.put(cache_key, output_path, ".json")
+        
         logger.info(f"Transcription saved to {output_path}")
         return output_path
         
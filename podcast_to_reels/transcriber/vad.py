@@ -0,0 +1,257 @@
+"""
+Energy-based voice activity detection used to strip silence before transcription.
+"""
+
+import os
+import subprocess
+import logging
+import numpy as np
+
+from podcast_to_reels.utils.audio import frame_energy, stream_frame_energy, iter_pcm_blocks, ANALYSIS_SAMPLE_RATE
+from .preprocess import SPEECH_BITRATE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Length of the analysis frames that are classified as speech or silence
+VAD_FRAME_SECONDS = 0.03
+
+
+class OffsetMap:
+    """
+    Mapping from the timeline of silence-stripped audio back to the original.
+
+    Each kept span is stored as parallel arrays: where it starts in the
+    stripped audio, where it starts in the original audio, and its length.
+    """
+    def __init__(self, original_starts, lengths, original_duration=None):
+        self.original_duration = original_duration
+        self.original_starts = np.asarray(original_starts, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.stripped_starts = np.concatenate(([0.0], np.cumsum(self.lengths)[:-1])) if len(self.lengths) else \
+            np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def from_spans(cls, spans, original_duration=None):
+        """Build a map from (start, end) spans of kept audio in original seconds."""
+        spans = np.asarray(spans, dtype=np.float64).reshape(-1, 2)
+        return cls(spans[:, 0], spans[:, 1] - spans[:, 0], original_duration)
+
+    @property
+    def stripped_duration(self):
+        return float(self.lengths.sum())
+
+    def to_original(self, times, side="right"):
+        """
+        Map times on the stripped timeline to the original timeline.
+
+        A time that falls exactly on the join of two spans maps to the start
+        of the later span with ``side="right"`` and to the end of the earlier
+        one with ``side="left"``, which is what segment end times want.
+
+        Args:
+            times (float or array-like): Seconds in the stripped audio
+            side (str): Which span a time on a join belongs to
+
+        Returns:
+            float or numpy.ndarray: Seconds in the original audio
+        """
+        values = np.asarray(times, dtype=np.float64)
+        if not len(self.lengths):
+            return values if values.ndim else float(values)
+        index = np.clip(np.searchsorted(self.stripped_starts, values, side=side) - 1, 0, len(self.lengths) - 1)
+        offset = np.clip(values - self.stripped_starts[index], 0, self.lengths[index])
+        mapped = self.original_starts[index] + offset
+        return mapped if mapped.ndim else float(mapped)
+
+    def to_dict(self):
+        """Convert map to dictionary."""
+        return {
+            "spans": [[float(s), float(s + l)] for s, l in zip(self.original_starts, self.lengths)],
+            "original_duration": self.original_duration
+        }
+
+
+def _runs(mask):
+    """Return start and end indices of the runs of True in a boolean array."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[::2], edges[1::2]
+
+
+def speech_mask(samples, sample_rate=ANALYSIS_SAMPLE_RATE, frame_seconds=VAD_FRAME_SECONDS, **kwargs):
+    """
+    Classify frames of ``samples`` as speech; see ``energy_speech_mask``.
+
+    Returns:
+        numpy.ndarray: Boolean speech flag per frame
+    """
+    return energy_speech_mask(frame_energy(samples, sample_rate, frame_seconds), frame_seconds, **kwargs)
+
+
+def energy_speech_mask(energy, frame_seconds=VAD_FRAME_SECONDS, margin_db=12.0, min_level_db=-50.0,
+                       pad_seconds=0.2):
+    """
+    Classify frames as speech by comparing their energy to the noise floor.
+
+    The noise floor is the 10th percentile of frame energy; frames more than
+    ``margin_db`` above it (and above ``min_level_db``) count as speech, and
+    each speech frame is widened by ``pad_seconds`` so word onsets survive.
+
+    Args:
+        energy (numpy.ndarray): RMS energy per frame
+        frame_seconds (float): Length of each analysis frame
+        margin_db (float): Level above the noise floor that counts as speech
+        min_level_db (float): Absolute level below which nothing is speech
+        pad_seconds (float): Padding added around speech frames
+
+    Returns:
+        numpy.ndarray: Boolean speech flag per frame
+    """
+    if not len(energy):
+        return np.zeros(0, dtype=bool)
+    level_db = 20 * np.log10(energy + 1e-10)
+    threshold = max(np.percentile(level_db, 10) + margin_db, min_level_db)
+    mask = level_db > threshold
+
+    pad_frames = int(round(pad_seconds / frame_seconds))
+    if pad_frames:
+        mask = np.convolve(mask.astype(np.int32), np.ones(2 * pad_frames + 1, dtype=np.int32), "same") > 0
+    return mask
+
+
+def find_speech_spans(samples, sample_rate=ANALYSIS_SAMPLE_RATE, frame_seconds=VAD_FRAME_SECONDS, min_silence=0.6,
+                      **kwargs):
+    """
+    Find the spans of ``samples`` to keep; see ``energy_speech_spans``.
+
+    Returns:
+        list: (start, end) spans in seconds
+    """
+    return energy_speech_spans(frame_energy(samples, sample_rate, frame_seconds), len(samples) / sample_rate,
+                               frame_seconds, min_silence, **kwargs)
+
+
+def energy_speech_spans(energy, total_seconds, frame_seconds=VAD_FRAME_SECONDS, min_silence=0.6, **kwargs):
+    """
+    Find the spans of audio to keep from its frame energy.
+
+    Silences shorter than ``min_silence`` are kept as part of the speech
+    around them so natural pauses are not removed.
+
+    Args:
+        energy (numpy.ndarray): RMS energy per frame
+        total_seconds (float): Length of the audio
+        frame_seconds (float): Length of each analysis frame
+        min_silence (float): Shortest silence in seconds that is removed
+        **kwargs: Extra arguments for ``energy_speech_mask``
+
+    Returns:
+        list: (start, end) spans in seconds
+    """
+    mask = energy_speech_mask(energy, frame_seconds, **kwargs)
+    starts, ends = _runs(mask)
+    if not len(starts):
+        return []
+
+    gaps = starts[1:] - ends[:-1]
+    keep = gaps * frame_seconds >= min_silence
+    starts = np.concatenate((starts[:1], starts[1:][keep]))
+    ends = np.concatenate((ends[:-1][keep], ends[-1:]))
+
+    return [
+        (float(start * frame_seconds), float(min(total_seconds, end * frame_seconds)))
+        for start, end in zip(starts, ends)
+    ]
+
+
+def _kept_blocks(blocks, sample_spans):
+    """Yield the parts of consecutive PCM blocks that fall inside sorted (start, end) sample spans."""
+    position = 0
+    span = 0
+    for block in blocks:
+        block_end = position + len(block)
+        while span < len(sample_spans) and sample_spans[span][1] <= position:
+            span += 1
+        index = span
+        while index < len(sample_spans) and sample_spans[index][0] < block_end:
+            start, end = sample_spans[index]
+            yield block[max(start, position) - position:min(end, block_end) - position]
+            index += 1
+        position = block_end
+
+
+def strip_silence(audio_path, output_dir, bitrate=SPEECH_BITRATE, frame_seconds=VAD_FRAME_SECONDS, **kwargs):
+    """
+    Write a copy of the audio with non-speech spans removed.
+
+    The audio is decoded twice as a stream: once for the frame energies that
+    decide what is speech, and once to pipe the kept samples into the
+    encoder. Memory use therefore does not grow with the length of the audio.
+
+    Args:
+        audio_path (str): Path to the audio file
+        output_dir (str): Directory to write the stripped audio to
+        bitrate (str): Opus bitrate of the stripped audio
+        frame_seconds (float): Length of each analysis frame
+        **kwargs: Extra arguments for ``energy_speech_spans``
+
+    Returns:
+        tuple: (path to the stripped audio, OffsetMap back to the original)
+    """
+    energy, sample_count = stream_frame_energy(audio_path, frame_seconds=frame_seconds)
+    total = sample_count / ANALYSIS_SAMPLE_RATE
+    spans = energy_speech_spans(energy, total, frame_seconds, **kwargs)
+    if not spans:
+        logger.warning(f"No speech detected in {audio_path}, keeping the audio as is")
+        return audio_path, OffsetMap.from_spans([(0.0, total)], total)
+
+    offset_map = OffsetMap.from_spans(spans, total)
+    sample_spans = [(int(start * ANALYSIS_SAMPLE_RATE), int(end * ANALYSIS_SAMPLE_RATE)) for start, end in spans]
+
+    output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(audio_path))[0] + ".voiced.ogg")
+    encode_cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(ANALYSIS_SAMPLE_RATE), "-i", "-",
+        "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+        "-y", output_path
+    ]
+    with subprocess.Popen(encode_cmd, stdin=subprocess.PIPE) as encoder:
+        for kept in _kept_blocks(iter_pcm_blocks(audio_path), sample_spans):
+            encoder.stdin.write(kept.tobytes())
+        encoder.stdin.close()
+    if encoder.returncode:
+        raise subprocess.CalledProcessError(encoder.returncode, encode_cmd)
+
+    removed = total - offset_map.stripped_duration
+    logger.info(
+        f"Stripped {removed:.1f}s of silence from {total:.1f}s of audio "
+        f"({removed / total:.0%}) across {len(spans)} speech spans"
+    )
+    return output_path, offset_map
+
+
+def remap_transcript(transcript, offset_map):
+    """
+    Move segment and word timestamps from the stripped timeline to the original.
+
+    Args:
+        transcript (dict): Transcript of the stripped audio
+        offset_map (OffsetMap): Map returned by ``strip_silence``
+
+    Returns:
+        dict: The same transcript with timestamps on the original timeline
+    """
+    for key in ("segments", "words"):
+        items = transcript.get(key) or []
+        if not items:
+            continue
+        starts = offset_map.to_original([item.get("start", 0) for item in items])
+        ends = offset_map.to_original([item.get("end", item.get("start", 0)) for item in items], side="left")
+        for item, start, end in zip(items, starts, ends):
+            item["start"] = float(start)
+            item["end"] = float(end)
+    if "duration" in transcript and offset_map.original_duration is not None:
+        transcript["duration"] = float(offset_map.original_duration)
+    return transcript
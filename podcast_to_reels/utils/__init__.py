@@ -0,0 +1,12 @@
+"""
+Shared utilities used across pipeline modules.
+"""
+
+from .cache import FileCache, make_key, hash_file, link_or_copy
+from .jsonstream import iter_json_array, read_json_value, write_json_array
+from .stage import iter_stage, StageClosed
+
+__all__ = [
+    "FileCache", "make_key", "hash_file", "link_or_copy", "iter_json_array", "read_json_value", "write_json_array",
+    "iter_stage", "StageClosed"
+]
@@ -0,0 +1,147 @@
+"""
+Audio helpers shared by the pipeline modules.
+"""
+
+import subprocess
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Sample rate used for analysis; speech models work at 16 kHz
+ANALYSIS_SAMPLE_RATE = 16000
+
+# Seconds of audio decoded at a time when streaming a file
+ENERGY_BLOCK_SECONDS = 60
+
+
+def decode_pcm(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE, start=None, duration=None):
+    """
+    Decode an audio file to mono float32 PCM with ffmpeg.
+
+    Args:
+        audio_path (str): Path to the audio file
+        sample_rate (int): Output sample rate in Hz
+        start (float): Optional start offset in seconds
+        duration (float): Optional length to decode in seconds
+
+    Returns:
+        numpy.ndarray: Samples in the range [-1, 1]
+    """
+    decode_cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if start is not None:
+        decode_cmd += ["-ss", str(start)]
+    decode_cmd += ["-i", audio_path]
+    if duration is not None:
+        decode_cmd += ["-t", str(duration)]
+    decode_cmd += ["-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"]
+
+    result = subprocess.run(decode_cmd, check=True, stdout=subprocess.PIPE)
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def audio_duration(audio_path):
+    """
+    Read the duration of an audio file from its container with ffprobe.
+
+    Returns:
+        float: Duration in seconds
+
+    Raises:
+        subprocess.CalledProcessError: If ffprobe cannot read the file
+        ValueError: If the file reports no duration
+    """
+    probe_cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", audio_path
+    ]
+    result = subprocess.run(probe_cmd, check=True, stdout=subprocess.PIPE, text=True)
+    return float(result.stdout.strip())
+
+
+def frame_energy(samples, sample_rate=ANALYSIS_SAMPLE_RATE, frame_seconds=0.02):
+    """
+    Compute the RMS energy of consecutive non-overlapping frames.
+
+    Args:
+        samples (numpy.ndarray): Mono PCM samples
+        sample_rate (int): Sample rate of ``samples`` in Hz
+        frame_seconds (float): Length of each frame in seconds
+
+    Returns:
+        numpy.ndarray: One RMS value per frame
+    """
+    frame_length = max(1, int(round(sample_rate * frame_seconds)))
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    return np.sqrt(np.mean(np.square(frames), axis=1))
+
+
+def iter_pcm_blocks(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE, block_samples=None):
+    """
+    Decode an audio file to mono 16-bit PCM with ffmpeg and yield it block by block.
+
+    Only one block is held in memory at a time, whatever the length of the audio.
+
+    Args:
+        audio_path (str): Path to the audio file
+        sample_rate (int): Output sample rate in Hz
+        block_samples (int): Samples per block; only the last block is shorter
+            (default: ``ENERGY_BLOCK_SECONDS`` of audio)
+
+    Yields:
+        numpy.ndarray: int16 samples
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    if block_samples is None:
+        block_samples = ENERGY_BLOCK_SECONDS * sample_rate
+    decode_cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", audio_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"
+    ]
+    with subprocess.Popen(decode_cmd, stdout=subprocess.PIPE) as process:
+        while True:
+            block = process.stdout.read(2 * block_samples)
+            if not block:
+                break
+            # A short read only happens at the end; drop a trailing odd byte
+            yield np.frombuffer(block[:len(block) // 2 * 2], dtype=np.int16)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, decode_cmd)
+
+
+def stream_frame_energy(audio_path, sample_rate=ANALYSIS_SAMPLE_RATE, frame_seconds=0.02,
+                        block_seconds=ENERGY_BLOCK_SECONDS):
+    """
+    Compute ``frame_energy`` of a whole file without holding its samples in memory.
+
+    ffmpeg's output is read ``block_seconds`` at a time and reduced to frame
+    energies block by block, so memory use depends on the block length and
+    not on the length of the audio.
+
+    Args:
+        audio_path (str): Path to the audio file
+        sample_rate (int): Analysis sample rate in Hz
+        frame_seconds (float): Length of each frame in seconds
+        block_seconds (float): Seconds of audio decoded per read
+
+    Returns:
+        tuple: (RMS energy per frame, number of decoded samples)
+    """
+    frame_length = max(1, int(round(sample_rate * frame_seconds)))
+    # Whole frames per block, so frames never straddle two blocks
+    block_samples = frame_length * max(1, int(sample_rate * block_seconds) // frame_length)
+
+    energies = []
+    sample_count = 0
+    for block in iter_pcm_blocks(audio_path, sample_rate, block_samples):
+        sample_count += len(block)
+        energies.append(frame_energy(block.astype(np.float32) / 32768.0, sample_rate, frame_seconds))
+    energy = np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+    return energy, sample_count
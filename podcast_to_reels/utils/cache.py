@@ -0,0 +1,231 @@
+"""
+Shared on-disk cache for pipeline artifacts.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Default byte budget for a cache directory (5 GB)
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+TEMP_SUFFIX = ".tmp"
+
+
+def make_key(*parts):
+    """
+    Build a stable cache key from arbitrary JSON-serialisable parts.
+
+    Args:
+        *parts: Values that identify the cached artifact
+
+    Returns:
+        str: Hex SHA-256 digest of the parts
+    """
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def hash_file(path, algorithm="sha256"):
+    """
+    Hash a file's contents without loading it into memory.
+
+    Args:
+        path (str): File to hash
+        algorithm (str): hashlib algorithm name
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+def link_or_copy(src_path, dst_path):
+    """
+    Place a cached file at ``dst_path`` without duplicating its bytes if possible.
+
+    Hard-links the file, falling back to a copy across filesystems or where
+    links are not supported.
+
+    Returns:
+        str: ``dst_path``
+    """
+    if os.path.exists(dst_path):
+        os.unlink(dst_path)
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+    return dst_path
+
+
+class FileCache:
+    """
+    Directory of cached files with a byte budget and least-recently-used eviction.
+
+    Entries are written to a temporary file inside the cache directory and
+    renamed into place, so readers in other threads or processes never see a
+    partial file. Recency is tracked through file modification times, which
+    lets several workers share one directory without a separate index.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key, suffix=""):
+        """Return the path an entry is (or would be) stored at."""
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def get(self, key, suffix=""):
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key (str): Cache key
+            suffix (str): File suffix of the entry
+
+        Returns:
+            str or None: Path to the cached file, or None on a miss
+        """
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def record_miss(self):
+        """Count a miss found by a caller before reaching ``get``."""
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key, src_path, suffix="", move=False):
+        """
+        Atomically store a file in the cache.
+
+        Args:
+            key (str): Cache key
+            src_path (str): File to store
+            suffix (str): File suffix of the entry
+            move (bool): Move the source into the cache instead of copying it
+
+        Returns:
+            str: Path to the cached file
+        """
+        temp_path = self._temp_path(suffix)
+        try:
+            if move:
+                shutil.move(src_path, temp_path)
+            else:
+                shutil.copyfile(src_path, temp_path)
+            return self._commit(temp_path, key, suffix)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def put_bytes(self, key, data, suffix=""):
+        """Atomically store raw bytes in the cache and return the entry path."""
+        temp_path = self._temp_path(suffix)
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            return self._commit(temp_path, key, suffix)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def discard(self, key, suffix=""):
+        """Remove a single entry if it exists."""
+        try:
+            os.unlink(self.path_for(key, suffix))
+        except FileNotFoundError:
+            pass
+
+    def evict(self, keep=None):
+        """
+        Remove least-recently-used entries until the cache fits its byte budget.
+
+        Args:
+            keep (str): Path that must not be evicted, e.g. the entry just written
+
+        Returns:
+            int: Number of entries removed
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith(TEMP_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        if removed:
+            with self._lock:
+                self.evictions += removed
+            logger.info(f"Evicted {removed} entries from cache {self.cache_dir}")
+        return removed
+
+    def stats(self):
+        """Return hit/miss counters and current size of the cache."""
+        entries = 0
+        size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(TEMP_SUFFIX):
+                    entries += 1
+                    size += entry.stat().st_size
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def _temp_path(self, suffix):
+        return os.path.join(self.cache_dir, f".{uuid.uuid4().hex}{suffix}{TEMP_SUFFIX}")
+
+    def _commit(self, temp_path, key, suffix):
+        path = self.path_for(key, suffix)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
@@ -0,0 +1,185 @@
+"""
+Incremental reading and writing of large JSON arrays.
+"""
+
+import os
+import json
+import uuid
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Characters read from the file at a time
+READ_CHUNK = 64 * 1024
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]}"
+
+
+class _JsonReader:
+    """Buffered cursor over a JSON text file that decodes one value at a time."""
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read more text, dropping what has been consumed. Returns False at end of file."""
+        if self.eof:
+            return False
+        # Grow reads geometrically so a value spanning many chunks is decoded in linear time
+        chunk = self.f.read(max(READ_CHUNK, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it, or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expected {char!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode and consume the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut off by the end of the buffer, e.g. "12." of "12.5",
+            # decodes early; only accept it once a delimiter follows
+            truncated = end == len(self.buffer) or (
+                isinstance(value, (int, float)) and self.buffer[end] not in DELIMITERS
+            )
+            if truncated and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Yield the elements of the array starting at the cursor, one at a time."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise json.JSONDecodeError("Expected ',' or ']'", self.buffer, self.pos - 1)
+
+    def skip(self):
+        """Consume the next value; arrays are walked element by element to bound memory."""
+        if self.peek() == "[":
+            for _ in self.items():
+                pass
+        else:
+            self.value()
+
+    def find_key(self, key):
+        """Advance to the value of a top-level object key. Raises KeyError if it is missing."""
+        self.expect("{")
+        if self.peek() == "}":
+            raise KeyError(key)
+        while True:
+            name = self.value()
+            self.expect(":")
+            if name == key:
+                return
+            self.skip()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                raise KeyError(key)
+            if separator != ",":
+                raise json.JSONDecodeError("Expected ',' or '}'", self.buffer, self.pos - 1)
+
+
+def iter_json_array(path, key=None):
+    """
+    Yield the elements of a JSON array without loading the whole file.
+
+    Args:
+        path (str): JSON file holding an array, or an object with an array value
+        key (str): Top-level key of the array, or None if the file is the array
+
+    Yields:
+        object: Each element, decoded
+
+    Raises:
+        KeyError: If ``key`` is not in the top-level object
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _JsonReader(f)
+        if key is not None:
+            reader.find_key(key)
+        yield from reader.items()
+
+
+def read_json_value(path, key):
+    """
+    Read one top-level value of a JSON object, streaming past the others.
+
+    Raises:
+        KeyError: If ``key`` is not in the top-level object
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _JsonReader(f)
+        reader.find_key(key)
+        return reader.value()
+
+
+def write_json_array(path, items, indent=2):
+    """
+    Write an iterable as a JSON array, one element at a time.
+
+    The output matches ``json.dump(list(items), f, indent=indent)``. It is
+    written to a temporary file and renamed into place, so readers never see
+    a partial file.
+
+    Args:
+        path (str): Output path
+        items (iterable): JSON-serialisable elements
+        indent (int): Indentation, as for ``json.dump``
+
+    Returns:
+        int: Number of elements written
+    """
+    temp_path = os.path.join(os.path.dirname(path) or ".", f".{uuid.uuid4().hex}.tmp")
+    count = 0
+    prefix = " " * indent
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for item in items:
+                encoded = json.dumps(item, indent=indent)
+                f.write(("," if count else "") + "\n" + prefix + encoded.replace("\n", "\n" + prefix))
+                count += 1
+            f.write("\n]" if count else "]")
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+    return count
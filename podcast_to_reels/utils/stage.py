@@ -0,0 +1,84 @@
+"""
+Bounded hand-off between pipeline stages running on different threads.
+"""
+
+import queue
+import logging
+import threading
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Items a producer may run ahead of its consumer
+DEFAULT_QUEUE_SIZE = 8
+
+# Seconds between checks for a consumer that stopped listening
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+class StageClosed(Exception):
+    """Raised inside a producer whose consumer stopped reading."""
+
+
+def iter_stage(produce, maxsize=DEFAULT_QUEUE_SIZE):
+    """
+    Run a producer on a background thread and yield what it emits.
+
+    ``produce`` is called with an ``emit`` function and hands every item to
+    it. Items pass through a queue of at most ``maxsize`` entries, so a
+    producer that gets ahead blocks in ``emit`` until the consumer catches
+    up. An exception raised by the producer is re-raised here after the
+    items emitted before it. If the consumer stops early, the next ``emit``
+    raises ``StageClosed`` so the producer can unwind.
+
+    Args:
+        produce (callable): Called as ``produce(emit)`` on the producer thread
+        maxsize (int): Largest number of items waiting in the queue
+
+    Yields:
+        object: Each emitted item, in the order it was emitted
+    """
+    items = queue.Queue(maxsize=maxsize)
+    closed = threading.Event()
+    errors = []
+
+    def put(item):
+        while True:
+            if closed.is_set():
+                raise StageClosed()
+            try:
+                items.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def run():
+        try:
+            produce(put)
+        except StageClosed:
+            pass
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            try:
+                put(_DONE)
+            except StageClosed:
+                pass
+
+    thread = threading.Thread(target=run, name="stage-producer", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        closed.set()
+
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -22,10 +22,15 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def compose_video(audio_path, image_paths, scenes, output_path="output/reel.mp4", fps=30, resolution=(1080, 1920)):
+def compose_video(audio_path, image_paths, scenes, output_path="output/reel.mp4", fps=30, resolution=(1080, 1920),
+                  prefit=False):
     """
     Compose a video from images and audio.
     
+    Images are scaled to the video width unless ``prefit`` is set, in which
+    case they must already match ``resolution`` (see
+    ``image_generator.prefit_images``) and are used without any resampling.
+    
     Args:
         audio_path (str): Path to the audio file
         image_paths (list): List of paths to the image files
@@ -33,6 +38,7 @@ def compose_video(audio_path, image_paths, scenes, output_path="output/reel.mp4"
         output_path (str): Path to save the output video
         fps (int): Frames per second
         resolution (tuple): Video resolution (width, height)
+        prefit (bool): Images are already at the exact output resolution
         
     Returns:
         str: Path to the output video
@@ -72,7 +78,8 @@ def compose_video(audio_path, image_paths, scenes, output_path="output/reel.mp4"
             
             # Resize to fit the target resolution while maintaining aspect ratio
             # Use the resize method directly to avoid calling MoviePy's fx
-            img_clip = img_clip.resize(width=resolution[0])
+            if not prefit:
+                img_clip = img_clip.resize(width=resolution[0])
             
             # Center the image
             img_clip = img_clip.set_position("center")
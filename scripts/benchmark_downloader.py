@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-download-then-trim against section-only downloads.
+
+Serves a generated episode from a local HTTP server that supports range
+requests, runs ``download_audio`` with and without ``section_download`` and
+reports bytes transferred and wall time for each path.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the parent directory to sys.path to allow importing the package
+sys.path.append(str(Path(__file__).parent.parent))
+
+from podcast_to_reels.downloader import download_audio
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single-range support and byte accounting."""
+
+    bytes_sent = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].split(",")[0].partition("-")
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+            else:
+                start = size - int(last)
+            end = min(end, size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        remaining = end - start + 1
+        with open(path, "rb") as f:
+            f.seek(start)
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(64 * 1024, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+                    with RangeRequestHandler.lock:
+                        RangeRequestHandler.bytes_sent += len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+def make_episode(directory, minutes):
+    """Generate a seekable AAC episode of the given length with ffmpeg."""
+    path = os.path.join(directory, "episode.m4a")
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={minutes * 60}",
+        "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart",
+        "-y", path
+    ], check=True)
+    return path
+
+
+def run_case(url, section_download, duration, start_time, output_dir):
+    RangeRequestHandler.bytes_sent = 0
+    started = time.perf_counter()
+    download_audio(
+        url,
+        duration=duration,
+        start_time=start_time,
+        output_dir=output_dir,
+        filename=f"{'section' if section_download else 'full'}.mp3",
+        section_download=section_download
+    )
+    return RangeRequestHandler.bytes_sent, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--episode-minutes", type=int, default=120, help="Length of the served episode")
+    parser.add_argument("--duration", type=int, default=60, help="Length of the cut window in seconds")
+    parser.add_argument("--start-time", type=int, default=1800, help="Start of the cut window in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        serve_dir = os.path.join(workdir, "serve")
+        os.makedirs(serve_dir)
+        make_episode(serve_dir, args.episode_minutes)
+
+        handler = lambda *a, **kw: RangeRequestHandler(*a, directory=serve_dir, **kw)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/episode.m4a"
+
+        try:
+            print(f"{'path':<10}{'bytes':>16}{'seconds':>12}")
+            for section_download in (False, True):
+                sent, elapsed = run_case(url, section_download, args.duration, args.start_time, workdir)
+                name = "section" if section_download else "full"
+                print(f"{name:<10}{sent:>16,}{elapsed:>12.2f}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark image generation throughput against the fake Stability server.
+
+Starts ``fake_stability_server`` in-process with a fixed latency, generates
+the same scenes at several concurrency levels and reports wall time and
+images per second. Runs offline; no API key or credits are used.
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to sys.path to allow importing the package
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from fake_stability_server import make_server
+from podcast_to_reels.image_generator import generate_images, StabilityBackend
+from podcast_to_reels.scene_splitter import Scene
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent image generation")
+    parser.add_argument("--scenes", type=int, default=12, help="Number of scenes (default: 12)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Server seconds per image (default: 0.5)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Concurrency levels to compare")
+    parser.add_argument("--binary", action="store_true", help="Request raw image bytes instead of base64 JSON")
+    parser.add_argument("--size", type=int, nargs=2, default=[540, 960], help="Image width and height")
+    args = parser.parse_args()
+
+    server = make_server(latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    scenes = [Scene(f"scene {i}", i * 5, (i + 1) * 5, prompt=f"illustration number {i}") for i in range(args.scenes)]
+
+    print(f"{args.scenes} images, {args.latency}s server latency, {'binary' if args.binary else 'JSON'} responses")
+    try:
+        for workers in args.workers:
+            backend = StabilityBackend(api_key="benchmark", api_host=host, width=args.size[0], height=args.size[1],
+                                       binary=args.binary, max_workers=workers)
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                image_paths = generate_images(scenes, output_dir=output_dir, max_workers=workers, backend=backend)
+                seconds = time.perf_counter() - start
+            backend.close()
+            print(f"workers={workers:<3d} {len(image_paths):3d} images  {seconds:7.2f}s  "
+                  f"{len(image_paths) / seconds:6.2f} images/s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
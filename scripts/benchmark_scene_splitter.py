@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark scene chunking on synthetic multi-hour transcripts.
+
+Builds a transcript of the requested length with segment and word
+timestamps, then times the single-pass ``chunk_transcript`` against the
+previous loop, which re-split the growing scene string for every word.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to sys.path to allow importing the package
+sys.path.append(str(Path(__file__).parent.parent))
+
+from podcast_to_reels.scene_splitter import chunk_transcript
+
+VOCABULARY = (
+    "the universe is expanding faster than we expected and dark energy may explain why "
+    "neurons fire in patterns that look like waves across the cortex while we sleep"
+).split()
+
+
+def make_transcript(hours, words_per_second=2.5, segment_seconds=4.0, seed=0):
+    """Generate a transcript with segments and word timestamps."""
+    rng = random.Random(seed)
+    segments = []
+    words = []
+    start = 0.0
+    total = hours * 3600
+    while start < total:
+        end = min(total, start + segment_seconds)
+        count = max(1, int((end - start) * words_per_second))
+        step = (end - start) / count
+        segment_words = [rng.choice(VOCABULARY) for _ in range(count)]
+        for i, word in enumerate(segment_words):
+            words.append({"word": word, "start": start + i * step, "end": start + (i + 1) * step})
+        segments.append({"id": len(segments), "start": start, "end": end, "text": " ".join(segment_words)})
+        start = end
+    return {"segments": segments, "words": words}
+
+
+def legacy_chunk(segments, max_words_per_scene):
+    """The previous chunking loop, kept for comparison."""
+    scenes = []
+    current_scene_text = ""
+    current_scene_start = None
+    for segment in segments:
+        segment_text = segment.get("text", "").strip()
+        segment_start = segment.get("start", 0)
+        segment_end = segment.get("end", segment_start + 5)
+        if not segment_text:
+            continue
+        if current_scene_start is None:
+            current_scene_start = segment_start
+        for word in segment_text.split():
+            if len(current_scene_text.split()) >= max_words_per_scene:
+                scenes.append((current_scene_text.strip(), current_scene_start, segment_end))
+                current_scene_text = word + " "
+                current_scene_start = segment_start
+            else:
+                current_scene_text += word + " "
+    if current_scene_text.strip():
+        scenes.append((current_scene_text.strip(), current_scene_start, segments[-1].get("end")))
+    return scenes
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=float, default=3, help="Length of the synthetic transcript")
+    parser.add_argument("--max-words", type=int, nargs="+", default=[20, 200, 2000],
+                        help="Values of max_words_per_scene to benchmark")
+    args = parser.parse_args()
+
+    transcript = make_transcript(args.hours)
+    segments_only = {"segments": transcript["segments"]}
+    print(f"{len(transcript['segments']):,} segments, {len(transcript['words']):,} words")
+
+    print(f"{'max words':>10}{'scenes':>10}{'legacy s':>12}{'segments s':>12}{'words s':>12}")
+    for max_words in args.max_words:
+        legacy, legacy_time = timed(legacy_chunk, transcript["segments"], max_words)
+        _, segment_time = timed(chunk_transcript, segments_only, max_words)
+        scenes, word_time = timed(chunk_transcript, transcript, max_words)
+        print(f"{max_words:>10}{len(scenes):>10}{legacy_time:>12.3f}{segment_time:>12.3f}{word_time:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
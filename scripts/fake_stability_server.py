@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Stability text-to-image endpoint, for load tests.
+
+Answers ``POST /v2beta/stable-diffusion/text-to-image`` with a procedural
+image after a configurable delay, as base64 JSON or raw bytes depending on
+the ``Accept`` header. It can also inject server errors and answer ``429``
+with ``Retry-After`` once too many requests are in flight. Point the
+pipeline at it with ``STABILITY_API_HOST=http://127.0.0.1:<port>``.
+"""
+import argparse
+import base64
+import io
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the parent directory to sys.path to allow importing the package
+sys.path.append(str(Path(__file__).parent.parent))
+
+from podcast_to_reels.image_generator.backends import ProceduralBackend
+
+ENDPOINT = "/v2beta/stable-diffusion/text-to-image"
+
+
+class FakeStabilityHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour is configured on the server object."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path != ENDPOINT:
+            self.send_body(404, b'{"message": "not found"}', "application/json")
+            return
+
+        with server.lock:
+            server.requests += 1
+            if server.max_in_flight and server.in_flight >= server.max_in_flight:
+                server.rate_limited += 1
+                limited = True
+            else:
+                server.in_flight += 1
+                limited = False
+        if limited:
+            self.send_body(429, b'{"message": "rate limited"}', "application/json",
+                           {"Retry-After": str(server.retry_after)})
+            return
+
+        try:
+            time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+            if random.random() < server.error_rate:
+                self.send_body(500, b'{"message": "injected error"}', "application/json")
+                return
+
+            backend = ProceduralBackend(payload.get("width", 1080), payload.get("height", 1920))
+            buffer = io.BytesIO()
+            backend.render(payload.get("prompt", ""), payload.get("seed")).save(buffer, format="PNG",
+                                                                               compress_level=1)
+            image = buffer.getvalue()
+
+            if self.headers.get("Accept", "").startswith("image/"):
+                self.send_body(200, image, "image/png", {"finish-reason": "SUCCESS"})
+            else:
+                body = json.dumps({"artifacts": [
+                    {"base64": base64.b64encode(image).decode("ascii"), "finishReason": "SUCCESS"}
+                ]}).encode("utf-8")
+                self.send_body(200, body, "application/json")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def make_server(host="127.0.0.1", port=0, latency=1.0, jitter=0.0, error_rate=0.0, max_in_flight=0,
+                retry_after=1.0):
+    """
+    Build the fake server; call ``serve_forever`` to start it.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind, or 0 for any free port
+        latency (float): Seconds each image takes
+        jitter (float): Random extra or less latency in seconds
+        error_rate (float): Share of requests answered with a 500
+        max_in_flight (int): Requests served at once before answering 429, or 0 for no limit
+        retry_after (float): ``Retry-After`` seconds sent with a 429
+
+    Returns:
+        ThreadingHTTPServer: The server, with request counters as attributes
+    """
+    server = ThreadingHTTPServer((host, port), FakeStabilityHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.max_in_flight = max_in_flight
+    server.retry_after = retry_after
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.requests = 0
+    server.rate_limited = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per image (default: 1.0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency spread in seconds (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 500 (default: 0)")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Concurrent requests before answering 429 (default: unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of a 429 (default: 1)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.max_in_flight,
+                         args.retry_after)
+    print(f"Fake Stability API on http://{args.host}:{server.server_address[1]} "
+          f"(set STABILITY_API_HOST to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Main script to run the podcast-to-reels pipeline.
 """
 import argparse
+import json
 import os
 import sys
 from pathlib import Path
@@ -10,11 +11,15 @@ from pathlib import Path
 # Add the parent directory to sys.path to allow importing the package
 sys.path.append(str(Path(__file__).parent.parent))
 
-from podcast_to_reels.downloader import download_audio
-from podcast_to_reels.transcriber import transcribe_audio
-from podcast_to_reels.scene_splitter import split_scenes
-from podcast_to_reels.image_generator import generate_images
+from podcast_to_reels.downloader import download_audio, download_batch, DownloadCache
+from podcast_to_reels.transcriber import transcribe_audio, preprocess_audio, get_backend
+from podcast_to_reels.scene_splitter import split_scenes, iter_split_scenes, PromptCache, PromptIndex
+from podcast_to_reels.image_generator import (
+    generate_images, generate_images_stream, prefit_images, get_backend as get_image_backend
+)
 from podcast_to_reels.video_composer import compose_video
+from podcast_to_reels.highlight_finder import find_highlights, slice_transcript, extract_highlight
+from podcast_to_reels.utils.cache import FileCache, make_key
 
 
 def parse_arguments():
@@ -24,8 +29,7 @@ def parse_arguments():
     )
     parser.add_argument(
         "--url", 
-        required=True, 
-        help="YouTube URL of the podcast"
+        help="YouTube URL of the podcast (required unless a subcommand is given)"
     )
     parser.add_argument(
         "--duration",
@@ -39,40 +43,383 @@ def parse_arguments():
         default=0,
         help="Start time of the clip in seconds (default: 0)"
     )
+    parser.add_argument(
+        "--highlights",
+        type=int,
+        default=None,
+        help="Download the whole episode and render its K best --duration windows instead of --start-time"
+    )
+    parser.add_argument(
+        "--highlight-energy",
+        action="store_true",
+        help="Also score highlight windows by audio loudness"
+    )
     parser.add_argument(
         "--output", 
         default="output/reel.mp4", 
         help="Output file path (default: output/reel.mp4)"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--audio-format",
+        choices=["mp3", "native"],
+        default="mp3",
+        help="Transcode audio to mp3, or keep the source codec without re-encoding (default: mp3)"
+    )
+    parser.add_argument(
+        "--transcriber",
+        choices=["openai", "local", "fake"],
+        default="openai",
+        help="Transcription backend: OpenAI API, local CPU model, or offline fake for benchmarks (default: openai)"
+    )
+    parser.add_argument(
+        "--word-timestamps",
+        action="store_true",
+        help="Request word-level timestamps so scene cuts land on exact word times"
+    )
+    parser.add_argument(
+        "--no-preprocess",
+        action="store_true",
+        help="Upload the downloaded audio as is instead of mono 16 kHz Opus"
+    )
+    parser.add_argument(
+        "--strip-silence",
+        action="store_true",
+        help="Cut pauses and music beds out of the upload; timestamps still match the original audio"
+    )
+    parser.add_argument(
+        "--chunked-transcription",
+        action="store_true",
+        help="Split the audio into chunks transcribed concurrently (lifts the 25 MB upload limit)"
+    )
+    parser.add_argument(
+        "--scene-mode",
+        choices=["words", "semantic"],
+        default="words",
+        help="Cut scenes every 20 words, or merge transcript segments by topic (default: words)"
+    )
+    parser.add_argument(
+        "--dedupe-threshold",
+        type=float,
+        default=None,
+        help="Share one prompt and image between scenes at least this similar, e.g. 0.85 (default: off)"
+    )
+    parser.add_argument(
+        "--prompt-batch-size",
+        type=int,
+        default=8,
+        help="Number of scenes whose image prompts are generated in one request (default: 8)"
+    )
+    parser.add_argument(
+        "--prompt-concurrency",
+        type=int,
+        default=4,
+        help="Number of prompt requests in flight; scenes that still fail are skipped (default: 4)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Start generating images as soon as their prompts are ready instead of after all prompts"
+    )
+    parser.add_argument(
+        "--image-backend",
+        choices=["stability", "procedural"],
+        default="stability",
+        help="Image engine: Stability API, or offline procedural cards for drafts and benchmarks (default: stability)"
+    )
+    parser.add_argument(
+        "--quality",
+        choices=["full", "draft"],
+        default="full",
+        help="Image quality; draft renders half-size images with fewer steps and upscales them (default: full)"
+    )
+    parser.add_argument(
+        "--image-concurrency",
+        type=int,
+        default=4,
+        help="Number of image requests in flight over one keep-alive connection pool (default: 4)"
+    )
+    parser.add_argument(
+        "--binary-images",
+        action="store_true",
+        help="Request raw image bytes and stream them to disk instead of base64 JSON"
+    )
+    parser.add_argument(
+        "--image-fit",
+        choices=["crop", "letterbox", "stretch"],
+        default="letterbox",
+        help="How images are fitted to the 1080x1920 frame before composition (default: letterbox)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory for persistent caches shared across runs (default: disabled)"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=5120,
+        help="Byte budget per cache in megabytes (default: 5120)"
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser(
+        "download-batch",
+        help="Download full episodes from videos, playlists or channels"
+    )
+    batch_parser.add_argument(
+        "sources",
+        nargs="*",
+        help="Video, playlist or channel URLs"
+    )
+    batch_parser.add_argument(
+        "--from-file",
+        default=None,
+        help="File with one URL per line to add to the batch"
+    )
+    batch_parser.add_argument(
+        "--output-dir",
+        default="output/batch",
+        help="Directory for downloaded episodes (default: output/batch)"
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of concurrent downloads (default: 4)"
+    )
+    batch_parser.add_argument(
+        "--archive",
+        default=None,
+        help="Archive of downloaded video IDs used to skip known episodes (default: archive.txt in --output-dir)"
+    )
+
+    args = parser.parse_args()
+    if args.command is None and not args.url:
+        parser.error("--url is required")
+    return args
+
+
+def make_download_cache(args):
+    """Build the download cache configured on the command line, if any."""
+    if not args.cache_dir:
+        return None
+    return DownloadCache(
+        os.path.join(args.cache_dir, "downloads"),
+        max_bytes=args.cache_max_mb * 1024 * 1024
+    )
+
+
+def make_cache(args, name):
+    """Build one of the persistent caches configured on the command line, if any."""
+    if not args.cache_dir:
+        return None
+    return FileCache(os.path.join(args.cache_dir, name), max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def make_prompt_cache(args):
+    """Build the image prompt cache configured on the command line, if any."""
+    if not args.cache_dir:
+        return None
+    return PromptCache(os.path.join(args.cache_dir, "prompts.sqlite3"))
+
+
+def make_prompt_index(args, download):
+    """Build the cross-run prompt index of the episode's show, if deduplication and caching are on."""
+    if not args.cache_dir or args.dedupe_threshold is None:
+        return None
+    show = download.metadata.get("channel_id") or download.metadata.get("uploader_id") or "default"
+    return PromptIndex(
+        os.path.join(args.cache_dir, "prompt-index", f"{make_key(show)[:16]}.sqlite3"),
+        threshold=args.dedupe_threshold
+    )
+
+
+def make_transcription_backend(args):
+    """Build the transcription backend configured on the command line."""
+    options = {}
+    if args.word_timestamps:
+        if args.transcriber == "openai":
+            options["timestamp_granularities"] = ("segment", "word")
+        elif args.transcriber == "local":
+            options["word_timestamps"] = True
+    return get_backend(args.transcriber, **options)
+
+
+def render_reel(args, audio_path, transcript_path, output_path, prompt_cache=None, prompt_index=None,
+                work_dir="output", image_cache=None):
+    """Split a transcript into scenes, illustrate them and compose the reel."""
+    split_options = dict(
+        output_dir=work_dir,
+        mode=args.scene_mode,
+        batch_size=args.prompt_batch_size,
+        max_concurrency=args.prompt_concurrency,
+        cache=prompt_cache,
+        dedupe_threshold=args.dedupe_threshold,
+        prompt_index=prompt_index
+    )
+    image_options = dict(
+        output_dir=os.path.join(work_dir, "images"),
+        max_workers=args.image_concurrency,
+        cache=image_cache
+    )
+    image_backend = make_image_backend(args)
+    try:
+        if args.stream:
+            # Steps 3 and 4 overlap: each scene is illustrated as soon as its prompt is ready
+            scenes = {}
+            
+            def collect(scene_items):
+                for index, scene in scene_items:
+                    scenes[index] = scene
+                    yield index, scene
+            
+            image_paths = generate_images_stream(collect(iter_split_scenes(transcript_path, **split_options)),
+                                                 backend=image_backend, **image_options)
+            scenes = [scenes[index] for index in sorted(scenes)]
+            print(f"Generated {len(scenes)} scene prompts")
+        else:
+            # Step 3: Split transcript into scenes and generate prompts
+            scenes = split_scenes(transcript_path, **split_options)
+            print(f"Generated {len(scenes)} scene prompts")
+            
+            # Step 4: Generate images for each scene
+            image_paths = generate_images(scenes, backend=image_backend, **image_options)
+    finally:
+        image_backend.close()
+    print(f"Generated {len(image_paths)} images")
+    
+    # Fit every image to the frame once instead of scaling frames while rendering
+    image_paths = prefit_images(image_paths, mode=args.image_fit, cache=image_cache)
+    
+    # Step 5: Compose final video
+    return compose_video(audio_path, image_paths, scenes, output_path, prefit=True)
+
+
+def render_highlights(args, audio_path, transcript_path, prompt_cache=None, prompt_index=None, image_cache=None):
+    """Render a reel from each of the best windows of a full episode."""
+    highlights = find_highlights(
+        transcript_path,
+        k=args.highlights,
+        window_seconds=args.duration,
+        audio_path=audio_path if args.highlight_energy else None
+    )
+    with open(transcript_path, "r") as f:
+        transcript_data = json.load(f)
+    
+    output_stem, output_ext = os.path.splitext(args.output)
+    for rank, highlight in enumerate(highlights, start=1):
+        work_dir = os.path.join(os.path.dirname(args.output) or ".", f"highlight_{rank:02d}")
+        print(f"Highlight {rank}: {highlight.start_time:.0f}s-{highlight.end_time:.0f}s (score {highlight.score:.2f})")
+        
+        clip_audio = extract_highlight(audio_path, highlight, work_dir)
+        clip_transcript = os.path.join(work_dir, "transcript.json")
+        with open(clip_transcript, "w") as f:
+            json.dump(slice_transcript(transcript_data, highlight.start_time, highlight.end_time), f, indent=2)
+        
+        output_path = render_reel(args, clip_audio, clip_transcript, f"{output_stem}_{rank:02d}{output_ext}",
+                                  prompt_cache, prompt_index, work_dir, image_cache)
+        print(f"Video reel created at: {output_path}")
+
+
+def make_image_backend(args):
+    """Build the image backend configured on the command line."""
+    if args.image_backend == "stability":
+        return get_image_backend("stability", max_workers=args.image_concurrency, binary=args.binary_images,
+                                 quality=args.quality)
+    return get_image_backend(args.image_backend, quality=args.quality)
+
+
+def run_download_batch(args):
+    """Download every episode of the given sources."""
+    sources = list(args.sources)
+    if args.from_file:
+        with open(args.from_file) as f:
+            sources += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not sources:
+        sys.exit("No sources given for download-batch")
+
+    report = download_batch(
+        sources,
+        output_dir=args.output_dir,
+        max_workers=args.workers,
+        archive_path=args.archive or os.path.join(args.output_dir, "archive.txt"),
+        cache=make_download_cache(args),
+        audio_format=args.audio_format
+    )
+
+    for item in report.items:
+        if item.status == "downloaded":
+            print(f"[ok]      {item.video_id}  {item.size / 1024 ** 2:8.1f} MB  "
+                  f"{item.throughput / 1024 ** 2:6.2f} MB/s  {item.title}")
+        elif item.status == "skipped":
+            print(f"[skip]    {item.video_id}")
+        else:
+            print(f"[failed]  {item.video_id or item.url}  {item.error}")
+    print(f"{len(report.downloaded)} downloaded, {len(report.skipped)} skipped, {len(report.failed)} failed")
+    if report.failed:
+        sys.exit(1)
 
 
 def main():
     """Run the podcast-to-reels pipeline."""
     args = parse_arguments()
     
+    if args.command == "download-batch":
+        run_download_batch(args)
+        return
+    
     print(f"Starting podcast-to-reels pipeline for URL: {args.url}")
     print(f"Target duration: {args.duration} seconds")
     
-    # Step 1: Download audio from YouTube
-    audio_path = download_audio(args.url, args.duration, args.start_time)
-    print(f"Audio downloaded to: {audio_path}")
+    # Step 1: Download audio from YouTube; highlights need the whole episode
+    download = download_audio(
+        args.url,
+        None if args.highlights else args.duration,
+        0 if args.highlights else args.start_time,
+        cache=make_download_cache(args),
+        audio_format=args.audio_format
+    )
+    audio_path = download.path
+    print(f"Audio downloaded to: {audio_path} ({download.title})")
     
     # Step 2: Transcribe audio
-    transcript_path = transcribe_audio(audio_path)
+    transcription_audio = audio_path
+    if not args.no_preprocess:
+        preprocessed = preprocess_audio(audio_path)
+        transcription_audio = preprocessed.path
+        print(f"Preprocessed audio for upload: {preprocessed.reduction:.0%} smaller, "
+              f"~{preprocessed.upload_seconds_saved:.1f}s upload saved")
+    
+    transcript_cache = make_cache(args, "transcripts")
+    transcript_path = transcribe_audio(
+        transcription_audio,
+        chunked=args.chunked_transcription,
+        cache=transcript_cache,
+        vad=args.strip_silence,
+        backend=make_transcription_backend(args)
+    )
     print(f"Transcription saved to: {transcript_path}")
     
-    # Step 3: Split transcript into scenes and generate prompts
-    scenes = split_scenes(transcript_path)
-    print(f"Generated {len(scenes)} scene prompts")
+    # Steps 3-5: Render one reel, or one per highlight of the episode
+    prompt_cache = make_prompt_cache(args)
+    prompt_index = make_prompt_index(args, download)
+    image_cache = make_cache(args, "images")
+    if args.highlights:
+        render_highlights(args, audio_path, transcript_path, prompt_cache, prompt_index, image_cache)
+    else:
+        output_path = render_reel(args, audio_path, transcript_path, args.output, prompt_cache, prompt_index,
+                                  image_cache=image_cache)
+        print(f"Video reel created at: {output_path}")
     
-    # Step 4: Generate images for each scene
-    image_paths = generate_images(scenes)
-    print(f"Generated {len(image_paths)} images")
-    
-    # Step 5: Compose final video
-    output_path = compose_video(audio_path, image_paths, scenes, args.output)
-    print(f"Video reel created at: {output_path}")
+    if transcript_cache is not None:
+        stats = transcript_cache.stats()
+        print(f"Transcript cache: {stats['hits']} hits, {stats['misses']} misses, {stats['bytes'] / 1024 ** 2:.1f} MB")
+    if prompt_cache is not None:
+        stats = prompt_cache.stats()
+        print(f"Prompt cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    if image_cache is not None:
+        stats = image_cache.stats()
+        print(f"Image cache: {stats['hits']} hits, {stats['misses']} misses, {stats['bytes'] / 1024 ** 2:.1f} MB")
     
     print("Pipeline completed successfully!")
 
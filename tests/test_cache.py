@@ -0,0 +1,70 @@
+"""
+Unit tests for the shared file cache.
+"""
+
+import os
+import time
+import hashlib
+from podcast_to_reels.utils.cache import FileCache, make_key, hash_file
+
+
+class TestFileCache:
+
+    def test_make_key_is_stable(self):
+        assert make_key("a", 1, {"x": 2}) == make_key("a", 1, {"x": 2})
+        assert make_key("a", 1) != make_key("a", 2)
+
+    def test_hash_file(self, tmp_path):
+        path = tmp_path / "audio.mp3"
+        path.write_bytes(b"x" * (3 * 1024 * 1024 + 7))
+
+        assert hash_file(str(path)) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def test_put_and_get(self, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"))
+        src = tmp_path / "source.mp3"
+        src.write_bytes(b"audio")
+
+        assert cache.get("k", ".mp3") is None
+        path = cache.put("k", str(src), ".mp3")
+
+        assert cache.get("k", ".mp3") == path
+        assert open(path, "rb").read() == b"audio"
+        assert src.exists()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_put_move(self, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"))
+        src = tmp_path / "source.mp3"
+        src.write_bytes(b"audio")
+
+        cache.put("k", str(src), ".mp3", move=True)
+
+        assert not src.exists()
+        assert cache.get("k", ".mp3") is not None
+
+    def test_lru_eviction(self, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"), max_bytes=25)
+        cache.put_bytes("a", b"x" * 10)
+        cache.put_bytes("b", b"x" * 10)
+
+        # Make "a" the most recently used entry
+        past = time.time() - 60
+        os.utime(cache.path_for("b"), (past, past))
+        os.utime(cache.path_for("a"), (past - 60, past - 60))
+        cache.get("a")
+
+        cache.put_bytes("c", b"x" * 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["bytes"] == 20
+
+    def test_no_temp_files_left(self, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"))
+        cache.put_bytes("a", b"data", ".json")
+
+        assert os.listdir(cache.cache_dir) == ["a.json"]
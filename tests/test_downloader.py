@@ -3,55 +3,270 @@ Unit tests for the downloader module.
 """
 
 import os
+import json
+import subprocess
 import pytest
 from unittest.mock import patch, MagicMock
-from podcast_to_reels.downloader.downloader import download_audio
+from podcast_to_reels.downloader.downloader import download_audio, DownloadResult
+from podcast_to_reels.downloader.cache import DownloadCache
+from podcast_to_reels.downloader.batch import download_batch
+
+
+def fake_yt_dlp(duration, video_id="dQw4w9WgXcQ", title="Test Episode", ext="mp3"):
+    """Build a subprocess.run side effect that mimics yt-dlp and ffmpeg."""
+    def run(cmd, **kwargs):
+        if cmd[0] == "yt-dlp":
+            template = cmd[cmd.index("-o") + 1]
+            filepath = template.replace("%(ext)s", ext)
+            with open(filepath, "wb") as f:
+                f.write(b"audio")
+            metadata = {
+                "id": video_id,
+                "title": title,
+                "duration": duration,
+                "formats": [{"format_id": "251", "acodec": "opus"}],
+                "filepath": filepath
+            }
+            return MagicMock(stdout="[info] progress\n" + json.dumps(metadata) + "\n")
+        return MagicMock(stdout="")
+    return run
+
+
+def yt_dlp_calls(mock_run):
+    return [c[0][0] for c in mock_run.call_args_list if c[0][0][0] == "yt-dlp"]
+
+
+def ffmpeg_calls(mock_run):
+    return [c[0][0] for c in mock_run.call_args_list if c[0][0][0] == "ffmpeg"]
+
 
 class TestDownloader:
-    
-    @patch('podcast_to_reels.downloader.downloader.subprocess.check_output')
+
     @patch('podcast_to_reels.downloader.downloader.subprocess.run')
-    def test_download_audio_short_video(self, mock_run, mock_check_output):
+    def test_download_audio_short_video(self, mock_run, tmp_path):
         # Mock video duration to be less than requested duration
-        mock_check_output.return_value = "30\n"
-        
+        mock_run.side_effect = fake_yt_dlp(30)
+
         # Call the function
-        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60)
-        
-        # Check that the correct commands were called
-        assert mock_check_output.call_count == 1
-        assert mock_run.call_count == 1
-        
+        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, output_dir=str(tmp_path))
+
+        # A single yt-dlp invocation and no trimming
+        assert len(yt_dlp_calls(mock_run)) == 1
+        assert len(ffmpeg_calls(mock_run)) == 0
+
         # Check that the output path is correct
-        assert result == os.path.join("output", "audio.mp3")
-    
-    @patch('podcast_to_reels.downloader.downloader.subprocess.check_output')
+        assert result.path == os.path.join(str(tmp_path), "audio.mp3")
+        assert os.path.exists(result.path)
+
     @patch('podcast_to_reels.downloader.downloader.subprocess.run')
-    @patch('podcast_to_reels.downloader.downloader.tempfile.NamedTemporaryFile')
-    def test_download_audio_long_video(self, mock_temp_file, mock_run, mock_check_output):
+    def test_download_audio_long_video(self, mock_run, tmp_path):
         # Mock video duration to be more than requested duration
-        mock_check_output.return_value = "120\n"
-        
-        # Mock temporary file
-        mock_temp = MagicMock()
-        mock_temp.name = "/tmp/temp_audio.mp3"
-        mock_temp_file.return_value = mock_temp
-        
+        mock_run.side_effect = fake_yt_dlp(120)
+
         # Call the function
-        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60)
-        
-        # Check that the correct commands were called
-        assert mock_check_output.call_count == 1
-        assert mock_run.call_count == 2  # Download and trim
-        
+        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, output_dir=str(tmp_path))
+
+        # Download and trim, with no separate duration probe
+        assert len(yt_dlp_calls(mock_run)) == 1
+        assert len(ffmpeg_calls(mock_run)) == 1
+        assert "--skip-download" not in yt_dlp_calls(mock_run)[0]
+
         # Check that the output path is correct
-        assert result == os.path.join("output", "audio.mp3")
-    
-    @patch('podcast_to_reels.downloader.downloader.subprocess.check_output')
-    def test_download_audio_error(self, mock_check_output):
+        assert result.path == os.path.join(str(tmp_path), "audio.mp3")
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_returns_metadata(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(30, video_id="abc123", title="Black Holes")
+
+        result = download_audio("https://youtu.be/abc123", output_dir=str(tmp_path))
+
+        assert isinstance(result, DownloadResult)
+        assert result.video_id == "abc123"
+        assert result.title == "Black Holes"
+        assert result.duration == 30
+        assert result.formats[0]["format_id"] == "251"
+        assert os.fspath(result) == result.path
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_error(self, mock_run):
         # Mock subprocess to raise an exception
-        mock_check_output.side_effect = Exception("Command failed")
-        
+        mock_run.side_effect = Exception("Command failed")
+
         # Check that the function raises an exception
         with pytest.raises(Exception):
             download_audio("https://youtu.be/invalid_url")
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_section_download(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(7200)
+
+        download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600, section_pad=2,
+                       output_dir=str(tmp_path))
+
+        # Only the padded window is requested from the source
+        download_cmd = yt_dlp_calls(mock_run)[0]
+        assert "--download-sections" in download_cmd
+        assert download_cmd[download_cmd.index("--download-sections") + 1] == "*598-662"
+
+        # The trim offset is relative to the start of the downloaded section
+        trim_cmd = ffmpeg_calls(mock_run)[0]
+        assert trim_cmd[trim_cmd.index("-ss") + 1] == "2"
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_section_fallback(self, mock_run, tmp_path):
+        downloads = fake_yt_dlp(7200)
+
+        # Section download fails, full download and trim succeed
+        def run(cmd, **kwargs):
+            if "--download-sections" in cmd:
+                raise subprocess.CalledProcessError(1, "yt-dlp")
+            return downloads(cmd, **kwargs)
+        mock_run.side_effect = run
+
+        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600,
+                                output_dir=str(tmp_path))
+
+        assert mock_run.call_count == 3
+        full_cmd = yt_dlp_calls(mock_run)[1]
+        assert "--download-sections" not in full_cmd
+        trim_cmd = ffmpeg_calls(mock_run)[0]
+        assert trim_cmd[trim_cmd.index("-ss") + 1] == "600"
+        assert result.path == os.path.join(str(tmp_path), "audio.mp3")
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_cache_reuses_source(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(7200)
+        cache = DownloadCache(str(tmp_path / "cache"))
+        output_dir = str(tmp_path / "out")
+
+        first = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600,
+                               output_dir=output_dir, filename="first.mp3", cache=cache)
+        second = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=1200,
+                                output_dir=output_dir, filename="second.mp3", cache=cache)
+
+        # The source is fetched once, in full, and both windows are cut from it
+        assert len(yt_dlp_calls(mock_run)) == 1
+        assert "--download-sections" not in yt_dlp_calls(mock_run)[0]
+        trims = ffmpeg_calls(mock_run)
+        assert len(trims) == 2
+        assert trims[0][trims[0].index("-i") + 1] == trims[1][trims[1].index("-i") + 1]
+        assert trims[1][trims[1].index("-ss") + 1] == "1200"
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert second.video_id == first.video_id == "dQw4w9WgXcQ"
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_stream_copy_trim(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(7200)
+
+        download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600, output_dir=str(tmp_path))
+
+        # Input-side seeking and no second lossy encode
+        trim_cmd = ffmpeg_calls(mock_run)[0]
+        assert trim_cmd.index("-ss") < trim_cmd.index("-i")
+        assert trim_cmd[trim_cmd.index("-c:a") + 1] == "copy"
+        assert "libmp3lame" not in trim_cmd
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_exact_cuts(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(7200)
+
+        download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600, output_dir=str(tmp_path),
+                       exact_cuts=True)
+
+        trim_cmd = ffmpeg_calls(mock_run)[0]
+        assert trim_cmd[trim_cmd.index("-c:a") + 1] == "libmp3lame"
+
+    @patch('podcast_to_reels.downloader.downloader.subprocess.run')
+    def test_download_audio_native_codec(self, mock_run, tmp_path):
+        mock_run.side_effect = fake_yt_dlp(7200, ext="opus")
+
+        result = download_audio("https://youtu.be/dQw4w9WgXcQ", duration=60, start_time=600,
+                                output_dir=str(tmp_path), audio_format="native")
+
+        # The source codec is kept and only remuxed into an Ogg container
+        download_cmd = yt_dlp_calls(mock_run)[0]
+        assert download_cmd[download_cmd.index("--audio-format") + 1] == "best"
+        trim_cmd = ffmpeg_calls(mock_run)[0]
+        assert trim_cmd[trim_cmd.index("-c:a") + 1] == "copy"
+        assert result.path == os.path.join(str(tmp_path), "audio.ogg")
+
+    def test_download_audio_invalid_format(self):
+        with pytest.raises(ValueError, match="Unsupported audio format"):
+            download_audio("https://youtu.be/dQw4w9WgXcQ", audio_format="flac")
+
+
+class TestBatchDownloader:
+
+    @staticmethod
+    def fake_listing(entries):
+        def run(cmd, **kwargs):
+            if "--flat-playlist" in cmd:
+                source = cmd[-1]
+                if source not in entries:
+                    raise subprocess.CalledProcessError(1, "yt-dlp")
+                lines = [f"{video_id}\thttps://youtu.be/{video_id}" for video_id in entries[source]]
+                return MagicMock(stdout="\n".join(lines) + "\n")
+            raise AssertionError(f"Unexpected command: {cmd}")
+        return run
+
+    @patch('podcast_to_reels.downloader.batch.download_audio')
+    @patch('podcast_to_reels.downloader.batch.subprocess.run')
+    def test_download_batch_with_archive(self, mock_run, mock_download, tmp_path):
+        mock_run.side_effect = self.fake_listing({"https://youtube.com/@show": ["a", "b", "c"]})
+
+        def download(url, output_dir, **kwargs):
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(output_dir, "audio.mp3")
+            with open(path, "wb") as f:
+                f.write(b"x" * 1024)
+            return DownloadResult(path, video_id=url.rsplit("/", 1)[1], title="Episode")
+        mock_download.side_effect = download
+
+        archive = str(tmp_path / "archive.txt")
+        with open(archive, "w") as f:
+            f.write("a\n")
+
+        report = download_batch(["https://youtube.com/@show"], output_dir=str(tmp_path), archive_path=archive)
+
+        # Archived episodes are skipped and whole episodes are requested
+        assert sorted(item.video_id for item in report.downloaded) == ["b", "c"]
+        assert [item.video_id for item in report.skipped] == ["a"]
+        assert all(call.kwargs["duration"] is None for call in mock_download.call_args_list)
+        assert all(item.size == 1024 for item in report.downloaded)
+        with open(archive) as f:
+            assert sorted(f.read().split()) == ["a", "b", "c"]
+
+        # A re-run only lists the channel again
+        mock_download.reset_mock()
+        report = download_batch(["https://youtube.com/@show"], output_dir=str(tmp_path), archive_path=archive)
+        assert mock_download.call_count == 0
+        assert len(report.skipped) == 3
+
+    @patch('podcast_to_reels.downloader.batch.download_audio')
+    @patch('podcast_to_reels.downloader.batch.subprocess.run')
+    def test_download_batch_failures_do_not_stop_batch(self, mock_run, mock_download, tmp_path):
+        mock_run.side_effect = self.fake_listing({"https://youtu.be/a": ["a"], "https://youtu.be/b": ["b"]})
+
+        def download(url, output_dir, **kwargs):
+            if url.endswith("/a"):
+                raise RuntimeError("Video unavailable")
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(output_dir, "audio.mp3")
+            open(path, "wb").close()
+            return DownloadResult(path, video_id="b")
+        mock_download.side_effect = download
+
+        archive = str(tmp_path / "archive.txt")
+        report = download_batch(
+            ["https://youtu.be/a", "https://youtu.be/b", "https://youtu.be/missing"],
+            output_dir=str(tmp_path),
+            archive_path=archive,
+            max_workers=2
+        )
+
+        assert [item.video_id for item in report.downloaded] == ["b"]
+        failed = {item.url: item.error for item in report.failed}
+        assert failed["https://youtu.be/a"] == "Video unavailable"
+        assert "https://youtu.be/missing" in failed
+        with open(archive) as f:
+            assert f.read().split() == ["b"]
@@ -0,0 +1,122 @@
+"""
+Unit tests for the highlight finder module.
+"""
+
+import json
+import itertools
+import numpy as np
+import pytest
+from unittest.mock import patch
+from podcast_to_reels.highlight_finder.highlight_finder import (
+    find_highlights,
+    window_features,
+    slice_transcript,
+    _top_windows
+)
+
+
+def episode(topic_seconds=(100, 160), total_seconds=300):
+    """One-second segments, on topic inside ``topic_seconds`` and small talk elsewhere."""
+    return {"segments": [
+        {
+            "text": "quantum entanglement experiment" if topic_seconds[0] <= i < topic_seconds[1] else "the weather",
+            "start": i,
+            "end": i + 1
+        }
+        for i in range(total_seconds)
+    ]}
+
+
+class TestHighlightFinder:
+
+    def test_window_features(self):
+        starts, ends, features = window_features(episode(), window_seconds=30, keywords=["quantum"])
+
+        assert len(starts) == 300 - 30 + 1
+        np.testing.assert_allclose(ends - starts, 30)
+        # Windows inside the topic have one keyword in every three words
+        assert features["keywords"][100] == pytest.approx(1 / 3)
+        assert features["keywords"][0] == 0
+        assert features["speech_rate"][100] == pytest.approx(3.0)
+        assert features["speech_rate"][0] == pytest.approx(2.0)
+
+    def test_window_features_of_text_only_file(self, tmp_path):
+        path = tmp_path / "transcript.json"
+        path.write_text(json.dumps({"text": "quantum entanglement experiment"}))
+
+        starts, ends, features = window_features(str(path), window_seconds=30, keywords=["quantum"])
+
+        # The words are spread over the default 60 second segment, at 0, 20 and 40 seconds
+        assert len(starts) == 60 - 30 + 1
+        assert features["keywords"][0] == pytest.approx(1 / 2)
+
+    def test_speaker_turns(self):
+        transcript = {"segments": [
+            {"text": "hi", "start": 0, "end": 1, "speaker": "A"},
+            {"text": "hello", "start": 1, "end": 2, "speaker": "B"},
+            {"text": "so", "start": 2, "end": 3, "speaker": "B"},
+            {"text": "right", "start": 3, "end": 4, "speaker": "A"}
+        ]}
+
+        _, _, features = window_features(transcript, window_seconds=4)
+        assert features["turns"].tolist() == [2]
+
+    def test_top_windows_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        scores = rng.normal(size=40)
+
+        for window, k in [(5, 1), (5, 3), (7, 4), (13, 3)]:
+            best = max(
+                (combo for combo in itertools.combinations(range(40), k)
+                 if all(b - a >= window for a, b in zip(combo, combo[1:]))),
+                key=lambda combo: scores[list(combo)].sum()
+            )
+            assert _top_windows(scores, window, k) == list(best)
+
+    def test_top_windows_stops_when_no_room_is_left(self):
+        # Ten window starts of length four leave room for three windows
+        assert _top_windows(np.ones(10), 4, 5) == [1, 5, 9]
+
+    def test_find_highlights(self):
+        highlights = find_highlights(episode(), k=2, window_seconds=30)
+
+        assert len(highlights) == 2
+        assert sorted((h.start_time, h.end_time) for h in highlights) == [(100.0, 130.0), (130.0, 160.0)]
+        assert highlights[0].score >= highlights[1].score
+        assert highlights[0].to_dict()["features"]["keywords"] > 0
+
+    def test_find_highlights_scores_audio_energy(self):
+        # Silence everywhere except a loud burst between 200 and 230 seconds
+        samples = np.zeros(300 * 2000, dtype=np.float32)
+        samples[200 * 2000:230 * 2000] = 0.5
+        transcript = {"segments": [{"text": "same words here", "start": i, "end": i + 1} for i in range(300)]}
+
+        with patch("podcast_to_reels.highlight_finder.highlight_finder.decode_pcm", return_value=samples):
+            highlights = find_highlights(transcript, k=1, window_seconds=30, audio_path="episode.mp3")
+
+        assert highlights[0].start_time == 200.0
+        assert "energy" in highlights[0].features
+
+    def test_find_highlights_rejects_zero(self):
+        with pytest.raises(ValueError, match="k must be at least 1"):
+            find_highlights(episode(), k=0)
+
+    def test_slice_transcript(self):
+        transcript = {
+            "text": "full text",
+            "language": "en",
+            "segments": [
+                {"id": 0, "text": " before", "start": 0.0, "end": 9.0},
+                {"id": 1, "text": " across", "start": 9.0, "end": 12.0},
+                {"id": 2, "text": " inside", "start": 12.0, "end": 14.0},
+                {"id": 3, "text": " after", "start": 20.0, "end": 25.0}
+            ],
+            "words": [{"word": " across", "start": 9.5, "end": 10.5}, {"word": " after", "start": 21, "end": 22}]
+        }
+
+        sliced = slice_transcript(transcript, 10.0, 20.0)
+        assert sliced["text"] == "across inside"
+        assert sliced["language"] == "en"
+        assert sliced["duration"] == 10.0
+        assert [(s["id"], s["start"], s["end"]) for s in sliced["segments"]] == [(0, 0.0, 2.0), (1, 2.0, 4.0)]
+        assert sliced["words"] == [{"word": " across", "start": 0.0, "end": 0.5}]
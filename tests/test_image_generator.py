@@ -3,9 +3,20 @@ Unit tests for the image generator module.
 """
 
 import os
+import time
+import threading
+import base64
 import pytest
+import requests
+import numpy as np
+from email.utils import formatdate
 from unittest.mock import patch, MagicMock
-from podcast_to_reels.image_generator.image_generator import generate_images
+from podcast_to_reels.image_generator.image_generator import generate_images, generate_images_stream
+from podcast_to_reels.image_generator.backends import _retry_after, ProceduralBackend, get_backend
+from podcast_to_reels.image_generator.postprocess import prefit_images, fit_image, upscale_bilinear
+from podcast_to_reels.image_generator.backends import StabilityBackend
+from podcast_to_reels.utils.cache import FileCache
+from PIL import Image
 from podcast_to_reels.scene_splitter.scene_splitter import Scene
 
 class TestImageGenerator:
@@ -18,8 +29,9 @@ class TestImageGenerator:
             Scene(text="Scene 2", start_time=5, end_time=10, prompt="A colorful DNA double helix")
         ]
     
-    @patch('podcast_to_reels.image_generator.image_generator.requests.post')
-    def test_generate_images_success(self, mock_post, sample_scenes, tmp_path):
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_success(self, mock_session, sample_scenes, tmp_path):
+        mock_post = mock_session.return_value.post
         # Mock successful API response
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -54,8 +66,9 @@ class TestImageGenerator:
             with pytest.raises(ValueError, match="STABILITY_API_KEY environment variable not set"):
                 generate_images(sample_scenes)
     
-    @patch('podcast_to_reels.image_generator.image_generator.requests.post')
-    def test_generate_images_server_error_with_retry(self, mock_post, sample_scenes, tmp_path):
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_server_error_with_retry(self, mock_session, sample_scenes, tmp_path):
+        mock_post = mock_session.return_value.post
         # Mock responses: first a 500 error, then a success
         error_response = MagicMock()
         error_response.status_code = 500
@@ -87,8 +100,9 @@ class TestImageGenerator:
             assert len(image_paths) == 1
             assert os.path.exists(image_paths[0])
     
-    @patch('podcast_to_reels.image_generator.image_generator.requests.post')
-    def test_generate_images_max_retries_exceeded(self, mock_post, sample_scenes):
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_max_retries_exceeded(self, mock_session, sample_scenes):
+        mock_post = mock_session.return_value.post
         # Mock responses: all 500 errors
         error_response = MagicMock()
         error_response.status_code = 500
@@ -106,3 +120,336 @@ class TestImageGenerator:
             
             # Check that no images were returned
             assert len(image_paths) == 0
+
+    @patch('podcast_to_reels.image_generator.backends.time.sleep')
+    def test_backoff_only_between_attempts(self, mock_sleep):
+        session = MagicMock()
+        session.post.return_value = MagicMock(status_code=500)
+        backend = StabilityBackend(api_key="test_key", session=session, backoff_base=1.0, max_retries=2)
+
+        assert not backend.generate("a glowing atom", "unused.png")
+
+        # Three attempts, two waits: about backoff_base, then twice that
+        assert session.post.call_count == 3
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert len(delays) == 2
+        assert 0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_reuses_duplicate_scenes(self, mock_session, sample_scenes, tmp_path):
+        mock_post = mock_session.return_value.post
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "artifacts": [{"base64": "SGVsbG8gV29ybGQ=", "finishReason": "SUCCESS"}]
+        }
+        mock_post.return_value = mock_response
+        scenes = sample_scenes + [
+            Scene(text="Scene 1 again", start_time=10, end_time=15, prompt="A scientific illustration of atoms",
+                  duplicate_of=0)
+        ]
+        
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            image_paths = generate_images(scenes, output_dir=str(tmp_path))
+        
+        assert mock_post.call_count == 2
+        assert image_paths == [str(tmp_path / "scene_001.png"), str(tmp_path / "scene_002.png"),
+                               str(tmp_path / "scene_001.png")]
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_concurrently_keeps_order(self, mock_session, tmp_path):
+        # Later scenes answer first
+        def post(url, headers, json):
+            number = int(json["prompt"].split()[1])
+            time.sleep(0.05 * (5 - number))
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"artifacts": [
+                {"base64": base64.b64encode(f"image {number}".encode()).decode(), "finishReason": "SUCCESS"}
+            ]}
+            return response
+        mock_session.return_value.post.side_effect = post
+        scenes = [Scene(text=f"Scene {n}", start_time=n, end_time=n + 1, prompt=f"prompt {n}") for n in range(5)]
+
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            image_paths = generate_images(scenes, output_dir=str(tmp_path), max_workers=5)
+
+        # One pooled session serves every request
+        assert mock_session.call_count == 1
+        assert image_paths == [str(tmp_path / f"scene_{n + 1:03d}.png") for n in range(5)]
+        assert [open(path, "rb").read() for path in image_paths] == [f"image {n}".encode() for n in range(5)]
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_honours_retry_after(self, mock_session, sample_scenes, tmp_path):
+        limited = MagicMock(status_code=429, headers={"Retry-After": "0.2"})
+        success = MagicMock(status_code=200)
+        success.json.return_value = {"artifacts": [{"base64": "SGVsbG8gV29ybGQ=", "finishReason": "SUCCESS"}]}
+        mock_session.return_value.post.side_effect = [limited, limited, success]
+
+        started = time.monotonic()
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            image_paths = generate_images([sample_scenes[0]], output_dir=str(tmp_path))
+
+        # Rate limits wait as long as asked and do not use up the retries
+        assert time.monotonic() - started >= 0.4
+        assert mock_session.return_value.post.call_count == 3
+        assert len(image_paths) == 1
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_does_not_retry_client_errors(self, mock_session, sample_scenes, tmp_path):
+        rejected = MagicMock(status_code=400)
+        rejected.raise_for_status.side_effect = requests.exceptions.HTTPError("400 Bad Request")
+        mock_session.return_value.post.return_value = rejected
+
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            image_paths = generate_images(sample_scenes, output_dir=str(tmp_path), backoff_base=0.01)
+
+        assert mock_session.return_value.post.call_count == 2
+        assert image_paths == []
+
+    def test_retry_after(self):
+        assert _retry_after(MagicMock(headers={"Retry-After": "3"})) == 3.0
+        assert _retry_after(MagicMock(headers={})) is None
+        assert _retry_after(MagicMock(headers={"Retry-After": "soon"})) is None
+        assert 8 < _retry_after(MagicMock(headers={"Retry-After": formatdate(time.time() + 10, usegmt=True)})) <= 10
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_serves_cache_hits(self, mock_session, sample_scenes, tmp_path):
+        success = MagicMock(status_code=200)
+        success.json.return_value = {"artifacts": [{"base64": "SGVsbG8gV29ybGQ=", "finishReason": "SUCCESS"}]}
+        mock_session.return_value.post.return_value = success
+        cache = FileCache(str(tmp_path / "cache"))
+
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            first = generate_images(sample_scenes, output_dir=str(tmp_path / "run1"), cache=cache)
+        assert mock_session.return_value.post.call_count == 2
+
+        # A second run needs neither the API nor a key
+        with patch.dict(os.environ, {"STABILITY_API_KEY": ""}):
+            second = generate_images(sample_scenes, output_dir=str(tmp_path / "run2"), cache=cache)
+        assert mock_session.return_value.post.call_count == 2
+        assert [os.path.basename(path) for path in second] == [os.path.basename(path) for path in first]
+        assert all(open(path, "rb").read() == b"Hello World" for path in second)
+        assert cache.stats()["hits"] == 2
+        # Hits are hard links to the cached entry where the filesystem allows it
+        assert os.stat(second[0]).st_nlink >= 2
+
+        # A different seed is a different request
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            generate_images(sample_scenes[:1], output_dir=str(tmp_path / "run3"), cache=cache, seed=42)
+        assert mock_session.return_value.post.call_count == 3
+        assert mock_session.return_value.post.call_args.kwargs["json"]["seed"] == 42
+
+    def test_generate_images_cache_miss_needs_api_key(self, sample_scenes, tmp_path):
+        with patch.dict(os.environ, {"STABILITY_API_KEY": ""}):
+            with pytest.raises(ValueError, match="STABILITY_API_KEY environment variable not set"):
+                generate_images(sample_scenes, output_dir=str(tmp_path), cache=FileCache(str(tmp_path / "cache")))
+
+    @patch('podcast_to_reels.image_generator.backends.requests.Session')
+    def test_generate_images_streams_binary_responses(self, mock_session, sample_scenes, tmp_path):
+        filtered = MagicMock(status_code=200, headers={"content-type": "image/png", "finish-reason": "CONTENT_FILTERED"})
+        success = MagicMock(status_code=200, headers={"content-type": "image/png", "finish-reason": "SUCCESS"})
+        success.iter_content.return_value = iter([b"\x89PNG", b"chunk one", b"chunk two"])
+        mock_session.return_value.post.side_effect = [filtered, success]
+
+        with patch.dict(os.environ, {"STABILITY_API_KEY": "test_key"}):
+            image_paths = generate_images([sample_scenes[0]], output_dir=str(tmp_path), binary=True,
+                                          backoff_base=0.01)
+
+        call = mock_session.return_value.post.call_args
+        assert call.kwargs["stream"] is True
+        assert call.kwargs["headers"]["Accept"] == "image/*"
+        assert mock_session.return_value.post.call_count == 2
+        assert open(image_paths[0], "rb").read() == b"\x89PNGchunk onechunk two"
+        success.json.assert_not_called()
+        # Nothing is left behind but the image itself
+        assert os.listdir(tmp_path) == ["scene_001.png"]
+
+
+class TestPrefitImages:
+
+    @pytest.fixture
+    def square_images(self, tmp_path):
+        paths = []
+        for n, colour in enumerate(["red", "blue", "green"]):
+            path = tmp_path / f"scene_{n + 1:03d}.png"
+            Image.new("RGB", (512, 512), colour).save(path)
+            paths.append(str(path))
+        return paths
+
+    @pytest.mark.parametrize("mode, corner, centre", [
+        ("letterbox", (0, 0, 0), (255, 0, 0)),
+        ("crop", (255, 0, 0), (255, 0, 0)),
+        ("stretch", (255, 0, 0), (255, 0, 0))
+    ])
+    def test_fit_image(self, square_images, tmp_path, mode, corner, centre):
+        output_path = fit_image(square_images[0], str(tmp_path / "fitted.png"), (108, 192), mode)
+
+        with Image.open(output_path) as image:
+            assert image.size == (108, 192)
+            assert image.getpixel((0, 0)) == corner
+            assert image.getpixel((54, 96)) == centre
+
+    def test_fit_image_rejects_unknown_mode(self, square_images, tmp_path):
+        with pytest.raises(ValueError, match="Unknown fit mode"):
+            fit_image(square_images[0], str(tmp_path / "fitted.png"), mode="zoom")
+
+    def test_prefit_images_in_process_pool(self, square_images, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"))
+        # A repeated path, as for duplicate scenes, is fitted once
+        image_paths = square_images + [square_images[0]]
+
+        fitted = prefit_images(image_paths, size=(108, 192), cache=cache, max_workers=2)
+
+        assert len(fitted) == 4
+        assert fitted[0] == fitted[3]
+        assert len(set(fitted)) == 3
+        for path, colour in zip(fitted, [(255, 0, 0), (0, 0, 255), (0, 128, 0)]):
+            with Image.open(path) as image:
+                assert image.size == (108, 192)
+                assert image.getpixel((54, 96)) == colour
+        assert cache.stats()["entries"] == 3
+
+        # Another run directory is served from the cache without fitting again
+        with patch("podcast_to_reels.image_generator.postprocess.fit_image") as mock_fit:
+            again = prefit_images(image_paths, size=(108, 192), cache=cache, output_dir=str(tmp_path / "run2"))
+        mock_fit.assert_not_called()
+        assert [os.path.basename(path) for path in again] == [os.path.basename(path) for path in fitted]
+
+
+class TestImageBackends:
+
+    def test_procedural_backend_is_deterministic(self, tmp_path):
+        backend = ProceduralBackend(width=90, height=160)
+
+        first = backend.render("a glowing atom", seed=1)
+        assert first.size == (90, 160)
+        assert first.tobytes() == backend.render("a glowing atom", seed=1).tobytes()
+        assert first.tobytes() != backend.render("a glowing atom", seed=2).tobytes()
+        assert backend.cache_key("a glowing atom") != ProceduralBackend(width=180, height=320).cache_key("a glowing atom")
+
+    def test_generate_images_with_procedural_backend(self, tmp_path):
+        scenes = [Scene(text=f"Scene {n}", start_time=n, end_time=n + 1, prompt=f"prompt {n}") for n in range(3)]
+        cache = FileCache(str(tmp_path / "cache"))
+
+        # No API key is needed for an offline backend
+        with patch.dict(os.environ, {"STABILITY_API_KEY": ""}):
+            image_paths = generate_images(scenes, output_dir=str(tmp_path / "images"), cache=cache,
+                                          backend=get_backend("procedural", width=90, height=160))
+
+        assert [os.path.basename(path) for path in image_paths] == ["scene_001.png", "scene_002.png", "scene_003.png"]
+        for path in image_paths:
+            with Image.open(path) as image:
+                assert image.size == (90, 160)
+        assert cache.stats()["entries"] == 3
+
+    def test_get_backend_rejects_unknown_names(self):
+        with pytest.raises(ValueError, match="Unknown image backend"):
+            get_backend("dall-e")
+
+
+class TestDraftQuality:
+
+    def test_upscale_bilinear(self):
+        pixels = np.array([[[0, 0, 0], [200, 100, 50]]], dtype=np.uint8)
+
+        upscaled = upscale_bilinear(pixels, (4, 2))
+        assert upscaled.shape == (2, 4, 3)
+        # Rows are copies; columns ramp between the two source pixels
+        assert (upscaled[0] == upscaled[1]).all()
+        assert upscaled[0, :, 0].tolist() == [0, 50, 150, 200]
+
+        # Agrees with Pillow's bilinear filter on a random image
+        random_pixels = np.random.default_rng(0).integers(0, 256, size=(24, 16, 3), dtype=np.uint8)
+        expected = np.asarray(Image.fromarray(random_pixels).resize((48, 96), Image.Resampling.BILINEAR))
+        assert np.abs(upscale_bilinear(random_pixels, (48, 96)).astype(int) - expected).max() <= 1
+
+    def test_stability_draft_requests_smaller_images(self):
+        full = StabilityBackend(api_key="test_key")
+        draft = StabilityBackend(api_key="test_key", quality="draft")
+
+        payload = draft.payload("a glowing atom")
+        assert (payload["width"], payload["height"], payload["steps"]) == (540, 960, 12)
+        assert full.payload("a glowing atom")["steps"] == 30
+        assert draft.cache_key("a glowing atom") != full.cache_key("a glowing atom")
+
+    def test_draft_images_are_upscaled_and_promoted_separately(self, tmp_path):
+        scenes = [Scene(text=f"Scene {n}", start_time=n, end_time=n + 1, prompt=f"prompt {n}") for n in range(2)]
+        cache = FileCache(str(tmp_path / "cache"))
+
+        drafts = generate_images(scenes, output_dir=str(tmp_path / "draft"), cache=cache,
+                                 backend=ProceduralBackend(width=90, height=160, quality="draft"))
+        for path in drafts:
+            with Image.open(path) as image:
+                assert image.size == (90, 160)
+
+        # Promoting to full quality renders every image again, then nothing once cached
+        full = ProceduralBackend(width=90, height=160)
+        with patch.object(full, "generate", wraps=full.generate) as mock_generate:
+            generate_images(scenes, output_dir=str(tmp_path / "full"), cache=cache, backend=full)
+            generate_images(scenes, output_dir=str(tmp_path / "full2"), cache=cache, backend=full)
+        assert mock_generate.call_count == 2
+        assert cache.stats()["entries"] == 4
+
+    def test_unknown_quality(self):
+        with pytest.raises(ValueError, match="Unknown image quality"):
+            ProceduralBackend(quality="ultra")
+
+
+class TestStreamingImages:
+
+    def test_images_start_before_the_input_ends_and_keep_scene_order(self, tmp_path):
+        scenes = [Scene(text=f"Scene {n}", start_time=n, end_time=n + 1, prompt=f"prompt {n}") for n in range(3)]
+        scenes.append(Scene(text="Scene 0", start_time=3, end_time=4, prompt="prompt 0", duplicate_of=0))
+        backend = ProceduralBackend(width=90, height=160)
+        started = threading.Event()
+        render = backend.generate
+
+        def generate(*args, **kwargs):
+            started.set()
+            return render(*args, **kwargs)
+
+        backend.generate = generate
+
+        def scene_items():
+            yield 2, scenes[2]
+            # The first image is under way while the producer is still busy
+            assert started.wait(5)
+            yield 3, scenes[3]
+            yield 0, scenes[0]
+            yield 1, scenes[1]
+
+        image_paths = generate_images_stream(scene_items(), output_dir=str(tmp_path / "images"), backend=backend)
+
+        assert [os.path.basename(path) for path in image_paths] == [
+            "scene_001.png", "scene_002.png", "scene_003.png", "scene_001.png"
+        ]
+
+    def test_slow_images_hold_back_the_producer(self, tmp_path):
+        scenes = [Scene(text=f"Scene {n}", start_time=n, end_time=n + 1, prompt=f"prompt {n}") for n in range(10)]
+        backend = ProceduralBackend(width=90, height=160)
+        release = threading.Event()
+        render = backend.generate
+
+        def generate(*args, **kwargs):
+            release.wait(5)
+            return render(*args, **kwargs)
+
+        backend.generate = generate
+        read = []
+
+        def scene_items():
+            for index, scene in enumerate(scenes):
+                read.append(index)
+                yield index, scene
+
+        worker = threading.Thread(target=generate_images_stream, args=(scene_items(),),
+                                  kwargs={"output_dir": str(tmp_path / "images"), "backend": backend,
+                                          "max_workers": 1})
+        worker.start()
+        time.sleep(0.2)
+        # Two images pending for the single worker, and the scene waiting for a slot
+        assert len(read) == 3
+        release.set()
+        worker.join(10)
+        assert len(read) == 10
+
@@ -0,0 +1,49 @@
+"""
+Unit tests for streaming JSON reading and writing.
+"""
+
+import json
+import pytest
+from unittest.mock import patch
+from podcast_to_reels.utils.jsonstream import iter_json_array, read_json_value, write_json_array
+
+
+class TestJsonStream:
+
+    @pytest.fixture
+    def transcript_path(self, tmp_path):
+        path = tmp_path / "transcript.json"
+        with open(path, "w") as f:
+            json.dump({
+                "text": "hello world, again",
+                "segments": [{"text": "hello [world]", "start": 0.125, "end": 123456.789}] * 50,
+                "words": [{"word": "hello", "start": 0, "end": 1e-3}],
+                "duration": 123456.789
+            }, f)
+        return str(path)
+
+    def test_iter_json_array_across_small_reads(self, transcript_path):
+        # A tiny read size splits strings and numbers across buffer refills
+        with patch("podcast_to_reels.utils.jsonstream.READ_CHUNK", 7):
+            segments = list(iter_json_array(transcript_path, "segments"))
+            words = list(iter_json_array(transcript_path, "words"))
+            duration = read_json_value(transcript_path, "duration")
+
+        assert segments == [{"text": "hello [world]", "start": 0.125, "end": 123456.789}] * 50
+        assert words == [{"word": "hello", "start": 0, "end": 1e-3}]
+        assert duration == 123456.789
+
+    def test_missing_key(self, transcript_path):
+        with pytest.raises(KeyError):
+            list(iter_json_array(transcript_path, "chapters"))
+        with pytest.raises(KeyError):
+            read_json_value(transcript_path, "language")
+
+    def test_write_json_array_matches_json_dump(self, tmp_path):
+        items = [{"text": "a", "prompt": None, "nested": {"x": [1, 2]}}, {"text": "b"}]
+
+        for data in (items, []):
+            path = tmp_path / "out.json"
+            assert write_json_array(str(path), iter(data)) == len(data)
+            assert path.read_text() == json.dumps(data, indent=2)
+            assert list(iter_json_array(str(path))) == data
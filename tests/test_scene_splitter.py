@@ -4,9 +4,19 @@ Unit tests for the scene splitter module.
 
 import os
 import json
+import time
+import asyncio
+import openai
 import pytest
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from unittest.mock import patch, MagicMock
-from podcast_to_reels.scene_splitter.scene_splitter import split_scenes, Scene
+from podcast_to_reels.scene_splitter.scene_splitter import split_scenes, iter_split_scenes, chunk_transcript, Scene
+from podcast_to_reels.scene_splitter.prompt_engine import AsyncPromptEngine, TokenBucket
+from podcast_to_reels.scene_splitter.prompt_cache import PromptCache
+from podcast_to_reels.scene_splitter.dedupe import find_duplicates, PromptIndex
+from podcast_to_reels.scene_splitter.semantic import hashed_tfidf, gap_similarities, segment_by_topic
+from podcast_to_reels.scene_splitter.scene_table import SceneTable, read_scenes, write_scenes
 
 class TestSceneSplitter:
     
@@ -88,3 +98,583 @@ class TestSceneSplitter:
             # Check that the function raises an exception
             with pytest.raises(Exception):
                 split_scenes(sample_transcript_path)
+
+
+class TestChunkTranscript:
+
+    def test_boundaries_interpolated_within_segments(self):
+        transcript = {"segments": [
+            {"text": "one two three four", "start": 0, "end": 4},
+            {"text": "   ", "start": 4, "end": 5},
+            {"text": "five six", "start": 6, "end": 8}
+        ]}
+
+        scenes = chunk_transcript(transcript, max_words_per_scene=3)
+
+        assert [scene.text for scene in scenes] == ["one two three", "four five six"]
+        assert (scenes[0].start_time, scenes[0].end_time) == (0, 3)
+        assert (scenes[1].start_time, scenes[1].end_time) == (3, 8)
+
+    def test_boundaries_on_word_timestamps(self):
+        transcript = {
+            "segments": [{"text": "one two three four five", "start": 0, "end": 10}],
+            "words": [
+                {"word": "one", "start": 0.0, "end": 0.4},
+                {"word": "two", "start": 0.5, "end": 0.9},
+                {"word": "three", "start": 4.2, "end": 4.6},
+                {"word": "four", "start": 7.0, "end": 7.3},
+                {"word": "five", "start": 9.1, "end": 9.6}
+            ]
+        }
+
+        scenes = chunk_transcript(transcript, max_words_per_scene=2)
+
+        assert [scene.text for scene in scenes] == ["one two", "three four", "five"]
+        assert [(scene.start_time, scene.end_time) for scene in scenes] == [(0.0, 0.9), (4.2, 7.3), (9.1, 9.6)]
+
+    def test_text_fallback(self):
+        scenes = chunk_transcript({"text": "just some text"}, max_words_per_scene=20)
+
+        assert len(scenes) == 1
+        assert (scenes[0].start_time, scenes[0].end_time) == (0, 60)
+
+    def test_no_segments_or_text(self):
+        with pytest.raises(ValueError, match="Invalid transcript format"):
+            chunk_transcript({})
+
+    def test_text_fallback_from_file(self, tmp_path):
+        path = tmp_path / "transcript.json"
+        path.write_text(json.dumps({"text": "just some text"}))
+
+        scenes = chunk_transcript(str(path), max_words_per_scene=20)
+
+        assert [scene.text for scene in scenes] == ["just some text"]
+        assert (scenes[0].start_time, scenes[0].end_time) == (0, 60)
+
+    def test_no_segments_or_text_in_file(self, tmp_path):
+        path = tmp_path / "transcript.json"
+        path.write_text(json.dumps({"foo": 1}))
+
+        with pytest.raises(ValueError, match="Invalid transcript format"):
+            chunk_transcript(str(path))
+
+
+def chat_response(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+class TestBatchedPrompts:
+
+    @pytest.fixture
+    def long_transcript_path(self, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        words = " ".join(f"word{i}" for i in range(50))
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": [{"text": words, "start": 0, "end": 25}]}, f)
+        return str(transcript_path)
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_one_request_per_batch(self, mock_openai, long_transcript_path, tmp_path):
+        def create(messages, **kwargs):
+            texts = json.loads(messages[1]["content"].split(": ", 1)[1])
+            return chat_response(json.dumps({"prompts": [f"prompt for {text.split()[0]}" for text in texts]}))
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.side_effect = create
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(long_transcript_path, max_words_per_scene=5, output_dir=str(tmp_path), batch_size=4)
+
+        assert len(scenes) == 10
+        assert mock_client.chat.completions.create.call_count == 3
+        assert [scene.prompt for scene in scenes] == [f"prompt for word{i * 5}" for i in range(10)]
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_malformed_batch_is_split(self, mock_openai, long_transcript_path, tmp_path):
+        def create(messages, **kwargs):
+            if "response_format" not in kwargs:
+                return chat_response("single prompt")
+            texts = json.loads(messages[1]["content"].split(": ", 1)[1])
+            if len(texts) > 2:
+                # Too few prompts for a large batch
+                return chat_response(json.dumps({"prompts": ["only one"]}))
+            if len(texts) == 2 and texts[0].startswith("word0 "):
+                return chat_response('{"prompts": ["truncated')
+            return chat_response(json.dumps({"prompts": ["batched prompt"] * len(texts)}))
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.side_effect = create
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(long_transcript_path, max_words_per_scene=10, output_dir=str(tmp_path), batch_size=5)
+
+        # 5 -> 2 + 3 -> (1 + 1) + (1 + 2)
+        assert [scene.prompt for scene in scenes] == [
+            "single prompt", "single prompt", "single prompt", "batched prompt", "batched prompt"
+        ]
+
+
+class FakeAsyncClient:
+    """Async OpenAI stand-in that records concurrency and fails chosen scenes."""
+    def __init__(self, fail_texts=(), rate_limited=0, delay=0.01):
+        self.fail_texts = set(fail_texts)
+        self.rate_limited = rate_limited
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = MagicMock()
+        self.chat.completions.create = self.create
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.rate_limited:
+                self.rate_limited -= 1
+                response = MagicMock(status_code=429, headers={"retry-after": "0"})
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+            text = messages[1]["content"].split("'")[1]
+            if text in self.fail_texts:
+                raise RuntimeError(f"bad scene {text}")
+            return chat_response(f"prompt for {text}")
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncPromptEngine:
+
+    def test_bounded_concurrency_and_order(self):
+        client = FakeAsyncClient()
+        engine = AsyncPromptEngine(client=client, max_concurrency=3)
+
+        results = engine.generate([f"scene {i}" for i in range(10)])
+
+        assert results.ok
+        assert results.prompts == [f"prompt for scene {i}" for i in range(10)]
+        assert client.max_in_flight == 3
+
+    def test_partial_results(self):
+        client = FakeAsyncClient(fail_texts={"scene 2", "scene 5"})
+        engine = AsyncPromptEngine(client=client, max_concurrency=4)
+
+        results = engine.generate([f"scene {i}" for i in range(6)])
+
+        assert [failure.index for failure in results.failures] == [2, 5]
+        assert results.prompts[2] is None and results.prompts[5] is None
+        assert results.prompts[0] == "prompt for scene 0"
+        # Non-retryable errors are not retried
+        assert client.calls == 6
+
+    def test_retries_rate_limits(self):
+        client = FakeAsyncClient(rate_limited=2)
+        engine = AsyncPromptEngine(client=client, max_concurrency=1, max_retries=2)
+
+        results = engine.generate(["scene 0"])
+
+        assert results.prompts == ["prompt for scene 0"]
+        assert client.calls == 3
+
+    def test_gives_up_after_max_retries(self):
+        client = FakeAsyncClient(rate_limited=5)
+        engine = AsyncPromptEngine(client=client, max_concurrency=1, max_retries=1)
+
+        results = engine.generate(["scene 0"])
+
+        assert isinstance(results.failures[0].error, openai.RateLimitError)
+        assert client.calls == 2
+
+    def test_reports_each_batch_as_it_finishes(self):
+        engine = AsyncPromptEngine(client=FakeAsyncClient(), max_concurrency=2)
+        batches = []
+
+        results = engine.generate([f"scene {i}" for i in range(5)], batch_size=2, on_batch=batches.append)
+
+        assert sorted(len(batch) for batch in batches) == [1, 2, 2]
+        assert sorted(index for batch in batches for index, _, _ in batch) == list(range(5))
+        assert all(prompt == results.prompts[index] for batch in batches for index, prompt, _ in batch)
+
+    def test_blocking_callback_does_not_stall_requests(self):
+        client = FakeAsyncClient()
+        engine = AsyncPromptEngine(client=client, max_concurrency=1)
+        calls_seen = []
+
+        def on_batch(outcome):
+            if not calls_seen:
+                # Block the first hand-over until every request has been sent
+                deadline = time.monotonic() + 5
+                while client.calls < 4 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            calls_seen.append(client.calls)
+
+        results = engine.generate([f"scene {i}" for i in range(4)], on_batch=on_batch)
+
+        assert results.ok
+        assert calls_seen[0] == 4
+
+    def test_token_bucket_waits_for_refill(self):
+        async def drain_and_wait():
+            bucket = TokenBucket(per_minute=6000)
+            await bucket.acquire(6000)
+            started = time.monotonic()
+            await bucket.acquire(10)
+            return time.monotonic() - started
+
+        assert asyncio.run(drain_and_wait()) == pytest.approx(0.1, abs=0.05)
+
+    @patch('podcast_to_reels.scene_splitter.prompt_engine.openai.AsyncOpenAI')
+    def test_split_scenes_keeps_partial_results(self, mock_async_openai, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": [{"text": "This is a test transcript for the scene splitter", "start": 0, "end": 9}]}, f)
+        client = FakeAsyncClient(fail_texts={"for the scene splitter"})
+        client.close = MagicMock(side_effect=lambda: asyncio.sleep(0))
+        mock_async_openai.return_value = client
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(str(transcript_path), max_words_per_scene=5, output_dir=str(tmp_path),
+                                  max_concurrency=4)
+
+        assert [scene.prompt for scene in scenes] == ["prompt for This is a test transcript", None]
+
+
+def fill_prompt_index(path, worker):
+    index = PromptIndex(path)
+    for i in range(20):
+        index.add([f"scene {worker} {i}"], [f"prompt {worker} {i}"])
+        index.lookup([f"scene {(worker + 1) % 4} {i}"])
+
+
+def fill_prompt_cache(path, worker):
+    cache = PromptCache(path)
+    for i in range(50):
+        cache.put(f"scene {worker} {i}", f"prompt {worker} {i}")
+        cache.get(f"scene {(worker + 1) % 4} {i}")
+    return cache.stats()["entries"]
+
+
+class TestPromptCache:
+
+    def test_hits_and_normalization(self, tmp_path):
+        cache = PromptCache(tmp_path / "prompts.sqlite3")
+        cache.put("Black holes  evaporate", "a glowing black hole")
+
+        assert cache.get("black holes evaporate ") == "a glowing black hole"
+        assert cache.get("black holes grow") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_key_depends_on_settings(self, tmp_path):
+        path = tmp_path / "prompts.sqlite3"
+        PromptCache(path).put("black holes", "a glowing black hole")
+
+        assert PromptCache(path, model="gpt-4o").get("black holes") is None
+        assert PromptCache(path, max_tokens=50).get("black holes") is None
+        assert PromptCache(path).get("black holes") == "a glowing black hole"
+
+    def test_ttl(self, tmp_path):
+        cache = PromptCache(tmp_path / "prompts.sqlite3", ttl_seconds=60)
+        cache.put("black holes", "a glowing black hole")
+        with patch('podcast_to_reels.scene_splitter.prompt_cache.time.time', return_value=time.time() + 120):
+            assert cache.get("black holes") is None
+            assert cache.evict() == 1
+
+    def test_size_eviction_keeps_recent_entries(self, tmp_path):
+        cache = PromptCache(tmp_path / "prompts.sqlite3", max_entries=3)
+        with patch('podcast_to_reels.scene_splitter.prompt_cache.time.time') as mock_time:
+            for i in range(3):
+                mock_time.return_value = 1000.0 + i
+                cache.put(f"scene {i}", f"prompt {i}")
+            mock_time.return_value = 1010.0
+            cache.get("scene 0")
+            mock_time.return_value = 1020.0
+            cache.put("scene 3", "prompt 3")
+
+            assert cache.get("scene 1") is None
+            assert cache.get("scene 0") == "prompt 0"
+            assert cache.stats()["entries"] == 3
+            assert cache.stats()["evictions"] == 1
+
+    def test_concurrent_processes(self, tmp_path):
+        path = str(tmp_path / "prompts.sqlite3")
+        PromptCache(path)
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(fill_prompt_cache, [path] * 4, range(4)))
+
+        cache = PromptCache(path)
+        assert cache.stats()["entries"] == 200
+        assert cache.get("scene 3 49") == "prompt 3 49"
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_split_scenes_uses_cache(self, mock_openai, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": [{"text": "one two three four five six", "start": 0, "end": 6}]}, f)
+        mock_client = mock_openai.return_value
+        mock_client.chat.completions.create.return_value = chat_response("Test image prompt")
+        cache = PromptCache(tmp_path / "prompts.sqlite3")
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            split_scenes(str(transcript_path), max_words_per_scene=3, output_dir=str(tmp_path), cache=cache)
+        assert mock_client.chat.completions.create.call_count == 2
+
+        # A second run needs neither the API nor a key
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            scenes = split_scenes(str(transcript_path), max_words_per_scene=3, output_dir=str(tmp_path), cache=cache)
+        assert mock_client.chat.completions.create.call_count == 2
+        assert [scene.prompt for scene in scenes] == ["Test image prompt"] * 2
+        assert cache.stats()["hits"] == 2
+
+
+TOPIC_SEGMENTS = [
+    {"text": "Black holes bend light around the event horizon.", "start": 0, "end": 4},
+    {"text": "Light near a black hole horizon never escapes.", "start": 4, "end": 8},
+    {"text": "The horizon of a black hole hides its singularity.", "start": 8, "end": 12},
+    {"text": "Coral reefs bleach when ocean water gets too warm.", "start": 12, "end": 16},
+    {"text": "Warm ocean water drives algae out of the coral.", "start": 16, "end": 20},
+    {"text": "Bleached coral reefs can recover if the ocean cools.", "start": 20, "end": 24},
+]
+
+
+class TestSemanticSegmentation:
+
+    def test_vectors_are_normalized_and_stable(self):
+        vectors = hashed_tfidf(["black holes bend light", "", "black holes bend light"])
+
+        assert vectors.shape == (3, 2048)
+        assert np.linalg.norm(vectors[0]) == pytest.approx(1.0)
+        assert not vectors[1].any()
+        assert np.array_equal(vectors[0], vectors[2])
+
+    def test_similarity_drops_at_topic_change(self):
+        similarities = gap_similarities(hashed_tfidf([segment["text"] for segment in TOPIC_SEGMENTS]))
+
+        assert len(similarities) == 5
+        assert int(np.argmin(similarities)) == 2
+
+    def test_segments_merged_by_topic(self):
+        assert segment_by_topic(TOPIC_SEGMENTS, min_seconds=5, max_seconds=30) == [(0, 3), (3, 6)]
+
+    def test_max_duration_forces_cut(self):
+        ranges = segment_by_topic(TOPIC_SEGMENTS, min_seconds=5, max_seconds=8, threshold=0.0)
+
+        assert ranges == [(0, 2), (2, 4), (4, 6)]
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_split_scenes_semantic_mode(self, mock_openai, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": TOPIC_SEGMENTS}, f)
+        mock_openai.return_value.chat.completions.create.return_value = chat_response("Test image prompt")
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(str(transcript_path), output_dir=str(tmp_path), mode="semantic",
+                                  min_scene_seconds=5, max_scene_seconds=30)
+
+        assert [(scene.start_time, scene.end_time) for scene in scenes] == [(0, 12), (12, 24)]
+        assert scenes[1].text.startswith("Coral reefs bleach")
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError, match="Unknown scene mode"):
+            split_scenes(str(tmp_path / "transcript.json"), mode="nope")
+
+
+class TestSceneDeduplication:
+
+    def test_find_duplicates(self):
+        texts = [
+            "Dark matter holds galaxies together",
+            "Coral reefs bleach in warm water",
+            "dark matter holds the galaxies together",
+            "",
+            ""
+        ]
+
+        assert find_duplicates(texts, threshold=0.6) == [None, None, 0, None, None]
+
+    def test_prompt_index_persists(self, tmp_path):
+        path = tmp_path / "show.sqlite3"
+        index = PromptIndex(path, threshold=0.6)
+        index.add(["Dark matter holds galaxies together"], ["a galaxy in a web of dark matter"])
+
+        reloaded = PromptIndex(path, threshold=0.6)
+        assert len(reloaded) == 1
+        assert reloaded.lookup(["dark matter holds the galaxies together", "coral reefs"]) == [
+            "a galaxy in a web of dark matter", None
+        ]
+
+    def test_prompt_index_evicts_least_recently_matched(self, tmp_path):
+        index = PromptIndex(tmp_path / "show.sqlite3", threshold=0.6, max_entries=2)
+        with patch('podcast_to_reels.scene_splitter.dedupe.time.time') as mock_time:
+            mock_time.return_value = 1000.0
+            index.add(["dark matter holds galaxies together", "coral reefs bleach in warm water"],
+                      ["a galaxy web", "a bleached reef"])
+            mock_time.return_value = 1010.0
+            assert index.lookup(["dark matter holds galaxies together"]) == ["a galaxy web"]
+            mock_time.return_value = 1020.0
+            index.add(["volcanoes erupt under the sea"], ["an undersea eruption"])
+
+        assert len(index) == 2
+        assert index.lookup(["coral reefs bleach in warm water", "dark matter holds galaxies together"]) == [
+            None, "a galaxy web"
+        ]
+
+    def test_prompt_index_merges_concurrent_runs(self, tmp_path):
+        path = str(tmp_path / "show.sqlite3")
+        first = PromptIndex(path)
+        second = PromptIndex(path)
+        first.add(["dark matter holds galaxies together"], ["a galaxy web"])
+        second.add(["coral reefs bleach in warm water"], ["a bleached reef"])
+
+        # Neither run overwrites the scenes the other one added
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(fill_prompt_index, [path] * 4, range(4)))
+        assert len(PromptIndex(path)) == 2 + 4 * 20
+        assert PromptIndex(path).lookup(["coral reefs bleach in warm water"]) == ["a bleached reef"]
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_split_scenes_shares_prompts(self, mock_openai, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": [
+                {"text": "dark matter holds all galaxies together", "start": 0, "end": 5},
+                {"text": "coral reefs bleach in warm water", "start": 5, "end": 10},
+                {"text": "dark matter holds all galaxies together", "start": 10, "end": 15},
+                {"text": "the ocean warms and reefs bleach", "start": 15, "end": 20}
+            ]}, f)
+        prompts = {"dark": "a galaxy web", "coral": "a bleached reef", "the": "a bleached reef"}
+        mock_openai.return_value.chat.completions.create.side_effect = (
+            lambda messages, **kwargs: chat_response(prompts[messages[1]["content"].split("'")[1].split()[0]])
+        )
+        index = PromptIndex(tmp_path / "show.sqlite3")
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(str(transcript_path), max_words_per_scene=6, output_dir=str(tmp_path),
+                                  dedupe_threshold=0.85, prompt_index=index)
+
+        # Scene 3 repeats scene 1's text; scene 4 gets the same prompt as scene 2
+        assert mock_openai.return_value.chat.completions.create.call_count == 3
+        assert [scene.duplicate_of for scene in scenes] == [None, None, 0, 1]
+        assert [scene.prompt for scene in scenes] == ["a galaxy web", "a bleached reef", "a galaxy web", "a bleached reef"]
+        assert len(PromptIndex(tmp_path / "show.sqlite3")) == 3
+
+
+class TestSceneTable:
+
+    @pytest.fixture
+    def scenes(self):
+        return [
+            Scene(text="Über die Quanten", start_time=0.0, end_time=4.5, prompt="a glowing atom"),
+            Scene(text="no prompt yet", start_time=4.5, end_time=9.0),
+            Scene(text="", start_time=9.0, end_time=9.5, prompt=""),
+            Scene(text="Über die Quanten", start_time=9.5, end_time=14.0, prompt="a glowing atom", duplicate_of=0)
+        ]
+
+    def test_scene_uses_slots(self):
+        scene = Scene(text="a", start_time=0, end_time=1)
+
+        assert not hasattr(scene, "__dict__")
+
+    @pytest.mark.parametrize("filename", ["scenes.scenes", "scenes.json"])
+    def test_roundtrip(self, scenes, tmp_path, filename):
+        path = str(tmp_path / filename)
+        write_scenes(scenes, path)
+
+        table = read_scenes(path)
+        assert len(table) == len(scenes)
+        assert [scene.to_dict() for scene in table] == [scene.to_dict() for scene in scenes]
+        assert table[-1].duplicate_of == 0
+        assert table.prompt(1) is None
+        np.testing.assert_allclose(table.durations, [4.5, 4.5, 0.5, 4.5])
+
+    def test_binary_table_is_memory_mapped(self, scenes, tmp_path):
+        path = str(tmp_path / "scenes.scenes")
+        SceneTable.from_scenes(scenes).save(path)
+
+        table = SceneTable.load(path)
+        assert isinstance(table.start_times.base, np.memmap) or isinstance(table.start_times, np.memmap)
+        assert table.text(0) == "Über die Quanten"
+        assert [scene.to_dict() for scene in SceneTable.load(path, mmap=False)] == [s.to_dict() for s in scenes]
+
+    def test_load_rejects_other_files(self, tmp_path):
+        path = tmp_path / "scenes.scenes"
+        path.write_bytes(b"not a scene table at all, just bytes")
+
+        with pytest.raises(ValueError, match="Not a scene table"):
+            SceneTable.load(str(path))
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_split_scenes_streams_words_to_binary_output(self, mock_openai, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        words = [{"word": f" w{i}", "start": i * 0.5, "end": i * 0.5 + 0.4} for i in range(10)]
+        with open(transcript_path, "w") as f:
+            json.dump({"text": "ignored", "segments": [{"text": "ignored", "start": 0, "end": 5}],
+                       "words": words}, f)
+        mock_openai.return_value.chat.completions.create.return_value = chat_response("a prompt")
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(str(transcript_path), max_words_per_scene=4, output_dir=str(tmp_path),
+                                  filename="scenes.scenes")
+
+        table = read_scenes(str(tmp_path / "scenes.scenes"))
+        assert [scene.to_dict() for scene in table] == [scene.to_dict() for scene in scenes]
+        assert [scene.text for scene in table] == ["w0 w1 w2 w3", "w4 w5 w6 w7", "w8 w9"]
+        assert table[1].start_time == 2.0
+
+
+class TestStreamingSplit:
+
+    @pytest.fixture
+    def transcript_path(self, tmp_path):
+        path = tmp_path / "transcript.json"
+        with open(path, "w") as f:
+            json.dump({"segments": [
+                {"text": "dark matter holds all galaxies together", "start": 0, "end": 5},
+                {"text": "coral reefs bleach in warm water", "start": 5, "end": 10},
+                {"text": "dark matter holds all galaxies together", "start": 10, "end": 15},
+                {"text": "the ocean warms and reefs bleach", "start": 15, "end": 20}
+            ]}, f)
+        return str(path)
+
+    @patch('podcast_to_reels.scene_splitter.scene_splitter.openai.OpenAI')
+    def test_deduplicated_scenes_are_released_in_order(self, mock_openai, transcript_path, tmp_path):
+        prompts = {"dark": "a galaxy web", "coral": "a bleached reef", "the": "a bleached reef"}
+        mock_openai.return_value.chat.completions.create.side_effect = (
+            lambda messages, **kwargs: chat_response(prompts[messages[1]["content"].split("'")[1].split()[0]])
+        )
+        released = []
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(transcript_path, max_words_per_scene=6, output_dir=str(tmp_path),
+                                  dedupe_threshold=0.85,
+                                  on_scene=lambda index, scene: released.append((index, scene.duplicate_of)))
+
+        # Every scene is final when released: the same duplicates as the finished list
+        assert released == [(0, None), (1, None), (2, 0), (3, 1)]
+        assert [scene.duplicate_of for scene in scenes] == [None, None, 0, 1]
+
+    @patch('podcast_to_reels.scene_splitter.prompt_engine.openai.AsyncOpenAI')
+    def test_iter_split_scenes_yields_every_scene(self, mock_async_openai, transcript_path, tmp_path):
+        client = FakeAsyncClient()
+        client.close = MagicMock(side_effect=lambda: asyncio.sleep(0))
+        mock_async_openai.return_value = client
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            items = list(iter_split_scenes(transcript_path, queue_size=1, max_words_per_scene=6,
+                                           output_dir=str(tmp_path), max_concurrency=4))
+
+        assert sorted(index for index, _ in items) == [0, 1, 2, 3]
+        written = read_scenes(str(tmp_path / "scenes.json"))
+        for index, scene in items:
+            assert scene.to_dict() == written[index].to_dict()
+            assert scene.prompt == f"prompt for {scene.text}"
+
+    def test_iter_split_scenes_raises_errors_of_the_splitter(self, transcript_path, tmp_path):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+                list(iter_split_scenes(transcript_path, output_dir=str(tmp_path)))
+
@@ -0,0 +1,55 @@
+"""
+Unit tests for the bounded hand-off between pipeline stages.
+"""
+
+import time
+import threading
+import pytest
+from podcast_to_reels.utils.stage import iter_stage, StageClosed
+
+
+class TestIterStage:
+
+    def test_items_arrive_in_order(self):
+        assert list(iter_stage(lambda emit: [emit(n) for n in range(20)], maxsize=2)) == list(range(20))
+
+    def test_producer_waits_for_a_slow_consumer(self):
+        emitted = []
+
+        def produce(emit):
+            for n in range(10):
+                emit(n)
+                emitted.append(n)
+
+        items = iter_stage(produce, maxsize=2)
+        assert next(items) == 0
+        time.sleep(0.2)
+        # One item taken, two queued and one blocked in emit
+        assert len(emitted) <= 3
+        assert list(items) == list(range(1, 10))
+
+    def test_producer_errors_follow_earlier_items(self):
+        def produce(emit):
+            emit("first")
+            raise RuntimeError("prompt generation failed")
+
+        items = iter_stage(produce)
+        assert next(items) == "first"
+        with pytest.raises(RuntimeError, match="prompt generation failed"):
+            next(items)
+
+    def test_closing_the_consumer_stops_the_producer(self):
+        stopped = threading.Event()
+
+        def produce(emit):
+            try:
+                for n in range(100):
+                    emit(n)
+            except StageClosed:
+                stopped.set()
+                raise
+
+        items = iter_stage(produce, maxsize=1)
+        assert next(items) == 0
+        items.close()
+        assert stopped.wait(5)
@@ -3,10 +3,20 @@ Unit tests for the transcriber module.
 """
 
 import os
+import sys
 import json
+import io
+import subprocess
 import pytest
+import numpy as np
 from unittest.mock import patch, MagicMock
 from podcast_to_reels.transcriber.transcriber import transcribe_audio
+from podcast_to_reels.transcriber.preprocess import preprocess_audio
+from podcast_to_reels.transcriber.backends import FakeBackend, OpenAIBackend, get_backend
+from podcast_to_reels.transcriber.chunking import AudioChunk, find_split_points, stitch_transcripts
+from podcast_to_reels.transcriber.vad import OffsetMap, find_speech_spans, remap_transcript
+from podcast_to_reels.utils.cache import FileCache
+from podcast_to_reels.utils.audio import stream_frame_energy, frame_energy
 
 class TestTranscriber:
     
@@ -76,3 +86,385 @@ class TestTranscriber:
             # Check that the function raises an exception
             with pytest.raises(FileNotFoundError):
                 transcribe_audio("nonexistent_file.mp3")
+
+
+class TestChunkedTranscription:
+
+    @patch('podcast_to_reels.utils.audio.subprocess.Popen')
+    def test_stream_frame_energy_matches_whole_file(self, mock_popen):
+        # 2.5 s of noise plus a partial frame, read in 1 s blocks
+        pcm = (np.random.default_rng(0).normal(0, 0.2, 40010) * 32767).astype(np.int16)
+        process = mock_popen.return_value.__enter__.return_value
+        process.stdout = io.BufferedReader(io.BytesIO(pcm.tobytes()))
+        process.returncode = 0
+
+        energy, sample_count = stream_frame_energy("episode.mp3", block_seconds=1)
+
+        assert sample_count == 40010
+        np.testing.assert_allclose(energy, frame_energy(pcm.astype(np.float32) / 32768.0), rtol=1e-5)
+
+    def test_find_split_points_prefers_quiet_frames(self):
+        # 100 s of loud audio with a quiet gap around 45 s
+        energy = np.ones(5000, dtype=np.float32)
+        energy[2240:2260] = 0.01
+
+        splits = find_split_points(energy, total_seconds=100, target_seconds=50, search_seconds=10)
+
+        assert len(splits) == 2
+        assert 44.8 <= splits[0] <= 45.2
+        assert splits[1] - splits[0] == pytest.approx(50)
+
+    def test_stitch_transcripts_shifts_and_dedupes(self):
+        chunks = [
+            AudioChunk(start=0, end=32, own_start=0, own_end=30),
+            AudioChunk(start=28, end=60, own_start=30, own_end=60)
+        ]
+        transcripts = [
+            {
+                "language": "english",
+                "segments": [
+                    {"text": " Black holes bend light.", "start": 0, "end": 10},
+                    {"text": " Nothing escapes them", "start": 24, "end": 30.5},
+                    {"text": " at all.", "start": 30.5, "end": 32}
+                ],
+                "words": [{"word": "Black", "start": 0, "end": 1}, {"word": "all", "start": 31.5, "end": 32}]
+            },
+            {
+                "segments": [
+                    {"text": " them at all. Even light.", "start": 1, "end": 6},
+                    {"text": " Stars orbit them.", "start": 10, "end": 20}
+                ],
+                "words": [{"word": "Even", "start": 4, "end": 5}]
+            }
+        ]
+
+        stitched = stitch_transcripts(chunks, transcripts)
+
+        assert [s["text"] for s in stitched["segments"]] == [
+            "Black holes bend light.",
+            "Nothing escapes them",
+            "at all. Even light.",
+            "Stars orbit them."
+        ]
+        assert [s["start"] for s in stitched["segments"]] == [0, 24, 29, 38]
+        assert [s["id"] for s in stitched["segments"]] == [0, 1, 2, 3]
+        assert [w["word"] for w in stitched["words"]] == ["Black", "Even"]
+        assert stitched["words"][1]["start"] == 32
+        assert stitched["language"] == "english"
+        assert stitched["duration"] == 60
+
+    @patch('podcast_to_reels.transcriber.chunking.subprocess.run')
+    @patch('podcast_to_reels.transcriber.chunking.stream_frame_energy')
+    @patch('podcast_to_reels.transcriber.transcriber.openai.OpenAI')
+    def test_transcribe_audio_chunked(self, mock_openai, mock_energy, mock_run, tmp_path):
+        # 30 minutes of audio in a file larger than the upload limit
+        mock_energy.return_value = (np.full(30 * 60 * 50, 0.5, dtype=np.float32), 30 * 60 * 16000)
+        audio_path = tmp_path / "audio.mp3"
+        with open(audio_path, "wb") as f:
+            f.truncate(30 * 1024 * 1024)
+
+        def extract(cmd, **kwargs):
+            open(cmd[-1], "wb").close()
+        mock_run.side_effect = extract
+
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create.return_value = {
+            "text": "Hello",
+            "segments": [{"text": " Hello", "start": 5, "end": 7}]
+        }
+        mock_openai.return_value = mock_client
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            result = transcribe_audio(str(audio_path), output_dir=str(tmp_path), chunked=True,
+                                      max_chunk_seconds=600)
+
+        # Three 10 minute chunks, each sent separately
+        assert mock_client.audio.transcriptions.create.call_count == 3
+        with open(result) as f:
+            transcript = json.load(f)
+        assert [s["start"] for s in transcript["segments"]] == [5, 603, 1203]
+
+    def test_transcribe_audio_too_large(self, tmp_path):
+        audio_path = tmp_path / "audio.mp3"
+        with open(audio_path, "wb") as f:
+            f.truncate(26 * 1024 * 1024)
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            with pytest.raises(ValueError, match="chunked=True"):
+                transcribe_audio(str(audio_path), output_dir=str(tmp_path))
+
+
+class TestTranscriptCache:
+
+    @patch('podcast_to_reels.transcriber.transcriber.openai.OpenAI')
+    def test_cache_hit_skips_api(self, mock_openai, tmp_path):
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create.return_value = {
+            "text": "Cached",
+            "segments": [{"text": "Cached", "start": 0, "end": 2}]
+        }
+        mock_openai.return_value = mock_client
+        cache = FileCache(str(tmp_path / "cache"))
+
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x00\x01")
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            first = transcribe_audio(str(audio_path), output_dir=str(tmp_path / "a"), cache=cache)
+
+        # A hit needs neither the API nor an API key
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            second = transcribe_audio(str(audio_path), output_dir=str(tmp_path / "b"), cache=cache)
+
+        assert mock_client.audio.transcriptions.create.call_count == 1
+        assert mock_openai.call_count == 1
+        with open(first) as f1, open(second) as f2:
+            assert json.load(f1) == json.load(f2)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @patch('podcast_to_reels.transcriber.transcriber.openai.OpenAI')
+    def test_cache_key_follows_audio_content(self, mock_openai, tmp_path):
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create.return_value = {"text": "", "segments": []}
+        mock_openai.return_value = mock_client
+        cache = FileCache(str(tmp_path / "cache"))
+
+        audio_path = tmp_path / "audio.mp3"
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            audio_path.write_bytes(b"\x00")
+            transcribe_audio(str(audio_path), output_dir=str(tmp_path), cache=cache)
+            audio_path.write_bytes(b"\x01")
+            transcribe_audio(str(audio_path), output_dir=str(tmp_path), cache=cache)
+
+        assert mock_client.audio.transcriptions.create.call_count == 2
+
+
+class TestTranscriptionBackends:
+
+    SEGMENT_KEYS = {"id", "start", "end", "text"}
+
+    def test_fake_backend_is_deterministic(self, tmp_path):
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x07" * 16000 * 12)
+        backend = FakeBackend()
+
+        first = backend.transcribe(str(audio_path))
+        second = backend.transcribe(str(audio_path))
+
+        assert first == second
+        assert first["duration"] == 12
+        assert [s["start"] for s in first["segments"]] == [0, 5, 10]
+        assert all(set(s) == self.SEGMENT_KEYS for s in first["segments"])
+        assert first["words"][-1]["end"] == pytest.approx(12)
+
+    @patch('podcast_to_reels.utils.audio.subprocess.run')
+    def test_fake_backend_covers_the_probed_duration(self, mock_run, tmp_path):
+        # 60 s of low-bitrate Opus is far smaller than 60 s at 16000 bytes per second
+        audio_path = tmp_path / "audio.ogg"
+        audio_path.write_bytes(b"\x07" * 3000 * 60)
+        mock_run.return_value = MagicMock(stdout="60.000000\n")
+
+        transcript = FakeBackend().transcribe(str(audio_path))
+
+        assert mock_run.call_args.args[0][0] == "ffprobe"
+        assert transcript["duration"] == 60
+        assert transcript["segments"][-1]["end"] == 60
+        assert FakeBackend(duration=42).transcribe(str(audio_path))["duration"] == 42
+
+    def test_transcribe_audio_with_fake_backend(self, tmp_path):
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x00" * 16000)
+
+        # No API key is needed for an offline backend
+        with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            result = transcribe_audio(str(audio_path), output_dir=str(tmp_path), backend=FakeBackend())
+
+        with open(result) as f:
+            transcript = json.load(f)
+        assert transcript["segments"]
+        assert transcript["text"]
+
+    @patch('podcast_to_reels.transcriber.transcriber.openai.OpenAI')
+    def test_openai_backend_normalizes_segments(self, mock_openai, tmp_path):
+        mock_client = MagicMock()
+        mock_client.audio.transcriptions.create.return_value = {
+            "text": "Hi there",
+            "language": "english",
+            "segments": [{"id": 9, "seek": 0, "text": " Hi there", "start": 0, "end": 1.5, "tokens": [1, 2]}]
+        }
+        mock_openai.return_value = mock_client
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x00")
+
+        transcript = OpenAIBackend(api_key="test_key").transcribe(str(audio_path))
+
+        assert transcript["segments"] == [{"id": 0, "start": 0.0, "end": 1.5, "text": " Hi there"}]
+        assert transcript["language"] == "english"
+
+    def test_local_backend(self, tmp_path):
+        word = MagicMock(word=" Hello", start=0.0, end=0.5)
+        segment = MagicMock(start=0.0, end=1.0, text=" Hello world", words=[word])
+        model = MagicMock()
+        model.transcribe.return_value = (iter([segment]), MagicMock(language="en", duration=1.0))
+        faster_whisper = MagicMock()
+        faster_whisper.WhisperModel.return_value = model
+
+        with patch.dict(sys.modules, {"faster_whisper": faster_whisper}):
+            backend = get_backend("local", model_size="tiny", cpu_threads=2, word_timestamps=True)
+        transcript = backend.transcribe(str(tmp_path / "audio.mp3"))
+
+        faster_whisper.WhisperModel.assert_called_once_with(
+            "tiny", device="cpu", compute_type="int8", cpu_threads=2, num_workers=1
+        )
+        assert transcript["segments"] == [{"id": 0, "start": 0.0, "end": 1.0, "text": "Hello world"}]
+        assert transcript["words"] == [{"word": "Hello", "start": 0.0, "end": 0.5}]
+
+    def test_local_backend_requires_faster_whisper(self):
+        with patch.dict(sys.modules, {"faster_whisper": None}):
+            with pytest.raises(ImportError, match="faster-whisper"):
+                get_backend("local")
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown transcription backend"):
+            get_backend("nope")
+
+
+class TestPreprocess:
+
+    @patch('podcast_to_reels.transcriber.preprocess.subprocess.run')
+    def test_preprocess_audio(self, mock_run, tmp_path):
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x00" * 1_000_000)
+
+        def encode(cmd, **kwargs):
+            with open(cmd[-1], "wb") as f:
+                f.write(b"\x00" * 100_000)
+        mock_run.side_effect = encode
+
+        result = preprocess_audio(str(audio_path), upload_mbps=8)
+
+        cmd = mock_run.call_args[0][0]
+        assert cmd[cmd.index("-ac") + 1] == "1"
+        assert cmd[cmd.index("-ar") + 1] == "16000"
+        assert cmd[cmd.index("-c:a") + 1] == "libopus"
+        assert result.path == str(tmp_path / "audio.speech-16k-24k.ogg")
+        assert os.path.exists(result.path)
+        assert result.reduction == pytest.approx(0.9)
+        assert result.upload_seconds_saved == pytest.approx(0.9)
+
+        # The processed file is reused while it is newer than the source
+        again = preprocess_audio(str(audio_path))
+        assert mock_run.call_count == 1
+        assert again.reused
+
+    @patch('podcast_to_reels.transcriber.preprocess.subprocess.run')
+    def test_preprocess_audio_failure_leaves_no_output(self, mock_run, tmp_path):
+        audio_path = tmp_path / "audio.mp3"
+        audio_path.write_bytes(b"\x00")
+
+        def fail(cmd, **kwargs):
+            open(cmd[-1], "wb").close()
+            raise subprocess.CalledProcessError(1, "ffmpeg")
+        mock_run.side_effect = fail
+
+        with pytest.raises(RuntimeError, match="Failed to preprocess"):
+            preprocess_audio(str(audio_path))
+        assert os.listdir(tmp_path) == ["audio.mp3"]
+
+
+def speech_and_silence(pattern, sample_rate=16000):
+    """Build samples from (seconds, is_speech) pairs: noise for speech, near-silence otherwise."""
+    rng = np.random.default_rng(0)
+    parts = [
+        rng.normal(0, 0.2 if speech else 0.0005, int(seconds * sample_rate)).astype(np.float32)
+        for seconds, speech in pattern
+    ]
+    return np.concatenate(parts)
+
+
+class TestSilenceStripping:
+
+    def test_find_speech_spans(self):
+        samples = speech_and_silence([(1, False), (2, True), (0.3, False), (1, True), (3, False), (2, True)])
+
+        spans = find_speech_spans(samples, pad_seconds=0.1)
+
+        # The short pause is kept, the long silences are cut
+        assert len(spans) == 2
+        assert spans[0][0] == pytest.approx(0.9, abs=0.05)
+        assert spans[0][1] == pytest.approx(4.4, abs=0.05)
+        assert spans[1][0] == pytest.approx(7.2, abs=0.05)
+        assert spans[1][1] == pytest.approx(9.3, abs=0.05)
+
+    def test_offset_map(self):
+        offset_map = OffsetMap.from_spans([(1.0, 4.0), (10.0, 12.0)], original_duration=15.0)
+
+        assert offset_map.stripped_duration == 5.0
+        assert offset_map.to_original(0.0) == 1.0
+        assert offset_map.to_original(4.0) == 11.0
+        np.testing.assert_allclose(offset_map.to_original([0.5, 3.0, 5.0]), [1.5, 10.0, 12.0])
+        # An end time on the join belongs to the earlier span
+        assert offset_map.to_original(3.0, side="left") == 4.0
+
+    def test_remap_transcript(self):
+        offset_map = OffsetMap.from_spans([(1.0, 4.0), (10.0, 12.0)], original_duration=15.0)
+        transcript = {
+            "text": "a b",
+            "segments": [{"id": 0, "start": 0.0, "end": 3.0, "text": "a"},
+                         {"id": 1, "start": 3.0, "end": 5.0, "text": "b"}],
+            "words": [{"word": "a", "start": 0.5, "end": 1.0}, {"word": "b", "start": 3.5, "end": 4.0}],
+            "duration": 5.0
+        }
+
+        remapped = remap_transcript(transcript, offset_map)
+
+        assert [(s["start"], s["end"]) for s in remapped["segments"]] == [(1.0, 4.0), (10.0, 12.0)]
+        assert [(w["start"], w["end"]) for w in remapped["words"]] == [(1.5, 2.0), (10.5, 11.0)]
+        assert remapped["duration"] == 15.0
+
+    @patch("podcast_to_reels.transcriber.vad.subprocess.run")
+    @patch("podcast_to_reels.transcriber.vad.subprocess.Popen")
+    @patch("podcast_to_reels.transcriber.vad.iter_pcm_blocks")
+    @patch("podcast_to_reels.utils.audio.iter_pcm_blocks")
+    def test_transcribe_with_vad(self, mock_energy_blocks, mock_blocks, mock_popen, mock_run, tmp_path):
+        audio_path = tmp_path / "audio.ogg"
+        audio_path.write_bytes(b"\x00" * 1000)
+        pcm = (speech_and_silence([(5, False), (10, True), (5, False)]) * 32767).astype(np.int16)
+
+        def blocks(path, sample_rate=16000, block_samples=None):
+            # Odd block size so speech spans straddle block boundaries
+            block_samples = block_samples or 7001
+            return iter([pcm[i:i + block_samples] for i in range(0, len(pcm), block_samples)])
+        mock_energy_blocks.side_effect = blocks
+        mock_blocks.side_effect = blocks
+
+        written = []
+        encoder = mock_popen.return_value.__enter__.return_value
+        encoder.stdin.write.side_effect = written.append
+        encoder.returncode = 0
+        def open_encoder(cmd, **kwargs):
+            with open(cmd[-1], "wb") as f:
+                f.write(b"\x01" * 1000)
+            return mock_popen.return_value
+        mock_popen.side_effect = open_encoder
+        def probe(cmd, **kwargs):
+            # The fake upload is not real audio; the backend falls back to its size
+            raise subprocess.CalledProcessError(1, cmd)
+        mock_run.side_effect = probe
+
+        output_path = transcribe_audio(
+            str(audio_path), output_dir=str(tmp_path), vad=True,
+            backend=FakeBackend(seconds_per_segment=5.0, bytes_per_second=100)
+        )
+
+        # Only the speech (plus padding) is uploaded
+        kept = np.frombuffer(b"".join(written), dtype=np.int16)
+        assert len(kept) / 16000 == pytest.approx(10.4, abs=0.1)
+        # The kept samples are the original samples of the speech span
+        (start, end), = find_speech_spans(pcm.astype(np.float32) / 32768.0)
+        np.testing.assert_array_equal(kept, pcm[int(start * 16000):int(end * 16000)])
+        with open(output_path) as f:
+            transcript = json.load(f)
+        # Timestamps are back on the original timeline
+        assert transcript["segments"][0]["start"] == pytest.approx(4.8, abs=0.05)
+        assert transcript["duration"] == pytest.approx(20.0)
@@ -3,10 +3,12 @@ Unit tests for the video composer module.
 """
 
 import os
+import json
 import pytest
 from unittest.mock import patch, MagicMock
 from podcast_to_reels.video_composer.video_composer import compose_video
-from podcast_to_reels.scene_splitter.scene_splitter import Scene
+from podcast_to_reels.scene_splitter.scene_splitter import Scene, split_scenes
+from podcast_to_reels.image_generator import generate_images, ProceduralBackend
 
 class TestVideoComposer:
     
@@ -89,3 +91,72 @@ class TestVideoComposer:
         # Check that the function raises an exception
         with pytest.raises(Exception):
             compose_video(sample_audio_path, sample_image_paths, sample_scenes)
+
+    @patch('podcast_to_reels.video_composer.video_composer.AudioFileClip')
+    @patch('podcast_to_reels.video_composer.video_composer.ImageClip')
+    @patch('podcast_to_reels.video_composer.video_composer.CompositeVideoClip')
+    @patch('podcast_to_reels.video_composer.video_composer.TextClip')
+    def test_compose_video_prefit_skips_resize(self, mock_text_clip, mock_composite_clip, mock_image_clip,
+                                               mock_audio_clip, sample_scenes, sample_image_paths,
+                                               sample_audio_path, tmp_path):
+        mock_audio_clip.return_value.duration = 10.0
+        
+        compose_video(sample_audio_path, sample_image_paths, sample_scenes, str(tmp_path / "output.mp4"), prefit=True)
+        
+        mock_image_clip.return_value.resize.assert_not_called()
+        assert mock_composite_clip.return_value.write_videofile.call_count == 1
+
+
+class FailingPromptClient:
+    """Async OpenAI stand-in that fails the prompt of one scene."""
+    def __init__(self, fail_text):
+        self.fail_text = fail_text
+        self.chat = MagicMock()
+        self.chat.completions.create = self.create
+
+    async def create(self, messages, **kwargs):
+        text = messages[1]["content"].split("'")[1]
+        if text == self.fail_text:
+            raise RuntimeError(f"bad scene {text}")
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = f"prompt for {text}"
+        return response
+
+    async def close(self):
+        pass
+
+
+class TestSceneImageAlignment:
+
+    @patch('podcast_to_reels.video_composer.video_composer.AudioFileClip')
+    @patch('podcast_to_reels.video_composer.video_composer.ImageClip')
+    @patch('podcast_to_reels.video_composer.video_composer.CompositeVideoClip')
+    @patch('podcast_to_reels.video_composer.video_composer.TextClip')
+    @patch('podcast_to_reels.scene_splitter.prompt_engine.openai.AsyncOpenAI')
+    def test_failed_prompt_mid_list_keeps_images_on_their_scenes(self, mock_async_openai, mock_text_clip,
+                                                                 mock_composite_clip, mock_image_clip,
+                                                                 mock_audio_clip, tmp_path):
+        transcript_path = tmp_path / "transcript.json"
+        with open(transcript_path, "w") as f:
+            json.dump({"segments": [
+                {"text": "black holes bend", "start": 0, "end": 5},
+                {"text": "coral reefs bleach", "start": 5, "end": 10},
+                {"text": "neurons fire fast", "start": 10, "end": 15},
+                {"text": "quantum bits superpose", "start": 15, "end": 20}
+            ]}, f)
+        mock_async_openai.return_value = FailingPromptClient("coral reefs bleach")
+        mock_audio_clip.return_value.duration = 20.0
+
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
+            scenes = split_scenes(str(transcript_path), max_words_per_scene=3, output_dir=str(tmp_path),
+                                  max_concurrency=4)
+        image_paths = generate_images(scenes, output_dir=str(tmp_path / "images"),
+                                      backend=ProceduralBackend(width=90, height=160))
+        compose_video(str(tmp_path / "audio.mp3"), image_paths, scenes, str(tmp_path / "reel.mp4"))
+
+        # Scene 2 has no prompt and holds scene 1's image; scenes 3 and 4 keep their own
+        assert scenes[1].prompt is None
+        shown = [os.path.basename(call.args[0]) for call in mock_image_clip.call_args_list]
+        assert shown == ["scene_001.png", "scene_001.png", "scene_003.png", "scene_004.png"]
+
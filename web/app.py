@@ -29,8 +29,9 @@ def index():
 
         messages = []
 
-        audio = download_audio(url, duration=duration, start_time=start)
-        messages.append('Audio downloaded')
+        download = download_audio(url, duration=duration, start_time=start)
+        audio = download.path
+        messages.append(f'Audio downloaded: {download.title}' if download.title else 'Audio downloaded')
 
         transcript_path = transcribe_audio(audio)
         messages.append('Audio transcribed')